@@ -0,0 +1,147 @@
+"""
+Node-count benchmark of the branch and bound strategies of Problem 4.
+
+Every combination of node selection rule and branching rule is run on
+problem4.dat and on random product mix instances with fractional
+relaxations (synthetic.write_product_mix_data). For each run it reports
+the nodes explored, the LP solves (strong branching solves more LPs than
+it explores nodes) and the wall time. The node LPs are solved with the
+NumPy solver of dense_lp.py by default, so the suite needs no AMPL
+license; --oracle ampl goes through AMPL instead.
+
+    python benchmarks/bench_branching.py --products 10 20 40 --seeds 1 2 3
+    python benchmarks/bench_branching.py --output branching.json
+
+Runs that hit --max-nodes are marked with "*"; their counts are lower
+bounds. The summary ranks the strategies by total nodes explored.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROBLEM4_DIR = os.path.join(HERE, os.pardir, "problem4_python")
+
+
+def make_oracle(name, data_file, solver):
+    """The relaxation oracle of one instance."""
+    if name == "dense":
+        from dense_lp import DenseRelaxation
+
+        return DenseRelaxation(data_file)
+
+    from branch_and_bound import AmplRelaxation
+
+    model_file = os.path.join(PROBLEM4_DIR, "relaxation.mod")
+    return AmplRelaxation(model_file, data_file, {"solver": solver})
+
+
+def run_strategy(oracle, select, branching, max_nodes):
+    """Runs one search and returns its counts."""
+    from branch_and_bound import branch_and_bound
+
+    t0 = time.perf_counter()
+    search = branch_and_bound(oracle, select=select, branching=branching, max_nodes=max_nodes)
+    seconds = time.perf_counter() - t0
+    return {
+        "nodes": len(search.nodes),
+        "lp_solves": search.lp_solves,
+        "seconds": seconds,
+        "objective": search.incumbent.result.objective if search.incumbent else None,
+        "limit_reached": search.limit_reached,
+    }
+
+
+def format_results(results):
+    """Builds the per-instance table and the ranking of the strategies."""
+    header = f"{'Instance':<18} | {'Selection':<13} | {'Branching':<15} | {'Nodes':>8} | {'LP solves':>9} | {'Time (s)':>8} | Best Z"
+    lines = [header, "-" * len(header)]
+    totals = {}
+    for instance, runs in results.items():
+        for strategy, entry in runs.items():
+            select, branching = strategy.split("/")
+            mark = "*" if entry["limit_reached"] else " "
+            z = f"{entry['objective']:,.2f}" if entry["objective"] is not None else "-"
+            lines.append(
+                f"{instance:<18} | {select:<13} | {branching:<15} | {entry['nodes']:>7}{mark} | "
+                f"{entry['lp_solves']:>9} | {entry['seconds']:>8.3f} | {z}"
+            )
+            total = totals.setdefault(strategy, [0, 0, 0.0, 0])
+            total[0] += entry["nodes"]
+            total[1] += entry["lp_solves"]
+            total[2] += entry["seconds"]
+            total[3] += entry["limit_reached"]
+        lines.append("-" * len(header))
+
+    lines.append("")
+    lines.append(f"{'Strategy':<31} | {'Nodes':>8} | {'LP solves':>9} | {'Time (s)':>8} | Limit hit")
+    for strategy, (nodes, lp_solves, seconds, limits) in sorted(totals.items(), key=lambda t: (t[1][3], t[1][0])):
+        lines.append(f"{strategy:<31} | {nodes:>8} | {lp_solves:>9} | {seconds:>8.3f} | {limits}")
+    return lines
+
+
+def main():
+    sys.path[:0] = [HERE, PROBLEM4_DIR]
+    from branch_and_bound import BRANCHING, NODE_SELECTION
+    from synthetic import write_product_mix_data
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--select", nargs="+", choices=NODE_SELECTION, default=list(NODE_SELECTION))
+    parser.add_argument("--branching", nargs="+", choices=BRANCHING, default=list(BRANCHING))
+    parser.add_argument("--products", type=int, nargs="+", default=[10, 20, 40], help="sizes of the random instances")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3], help="one random instance per size and seed")
+    parser.add_argument("--max-nodes", type=int, default=20000, help="node limit per run (default 20000)")
+    parser.add_argument("--oracle", choices=["dense", "ampl"], default="dense")
+    parser.add_argument("--solver", default="highs", help="AMPL solver with --oracle ampl")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        instances = {"problem4.dat": os.path.join(PROBLEM4_DIR, "problem4.dat")}
+        for n, seed in itertools.product(args.products, args.seeds):
+            data_file = os.path.join(workdir, f"mix{n}_{seed}.dat")
+            write_product_mix_data(data_file, n, seed=seed, fractional=True)
+            instances[f"{n} products #{seed}"] = data_file
+
+        for instance, data_file in instances.items():
+            print(f"Running {instance}...")
+            oracle = make_oracle(args.oracle, data_file, args.solver)
+            try:
+                results[instance] = {
+                    f"{select}/{branching}": run_strategy(oracle, select, branching, args.max_nodes)
+                    for select, branching in itertools.product(args.select, args.branching)
+                }
+            finally:
+                oracle.close()
+
+    print()
+    for line in format_results(results):
+        print(line)
+
+    if args.output:
+        report = {
+            "metadata": {
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "oracle": args.oracle,
+                "max_nodes": args.max_nodes,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Before/after benchmark of AMPL result extraction on scaled networks.
+
+"before" is the per-entity ``get_values().to_dict()`` pattern followed by
+a loop over tuple-keyed dicts, as the problem3 scripts used to do.
+"after" is ampl_extract.get_frame, fetching x, i, j and c in one call and
+keeping only the arcs that carry flow.
+
+    python benchmarks/bench_extract.py --scales 1 10 100 1000 --solver highs
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from amplpy import AMPL
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir, "common_python"))
+from ampl_extract import get_frame, label_codes
+from synthetic import write_network_data
+
+MODEL_FILE = os.path.join(HERE, os.pardir, "problem3_python", "MCFP_3_1.mod")
+BASE_NODES = 27  # size of the bundled MCFP_3_1.dat network
+
+
+def solved_instance(n_nodes, solver, workdir):
+    """Solves a multi-source flow on a synthetic network and returns the AMPL object."""
+    data_file = os.path.join(workdir, f"network_{n_nodes}.dat")
+    stations = write_network_data(data_file, n_nodes, n_stations=max(2, n_nodes // 20), balance=True)
+
+    ampl = AMPL()
+    ampl.option["solver"] = solver
+    ampl.option["solver_msg"] = 0
+    ampl.read(MODEL_FILE)
+    ampl.read_data(data_file)
+
+    # Half of the stations send one unit each to the other half
+    half = len(stations) // 2
+    b = {n: 1 for n in stations[:half]}
+    b.update({n: -1 for n in stations[half : 2 * half]})
+    ampl.param["b"] = b
+    ampl.solve()
+    return ampl
+
+
+def extract_before(ampl):
+    x = ampl.get_variable("x").get_values().to_dict()
+    param_i = ampl.get_parameter("i").get_values().to_dict()
+    param_j = ampl.get_parameter("j").get_values().to_dict()
+    param_c = ampl.get_parameter("c").get_values().to_dict()
+
+    tails, heads, flows, costs = [], [], [], []
+    for arc_id, flow in x.items():
+        if abs(flow) > 1e-9:
+            tails.append(param_i[arc_id])
+            heads.append(param_j[arc_id])
+            flows.append(flow)
+            costs.append(param_c[arc_id])
+    return len(flows)
+
+
+def extract_after(ampl):
+    flows = get_frame(ampl, "x", "i", "j", "c", nonzero="x")
+    (tails, heads), labels = label_codes(flows["i"], flows["j"])
+    return len(flows)
+
+
+def best_of(fn, ampl, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(ampl)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--solver", default="highs")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Scale':<6} | {'Arcs':<8} | {'Before (s)':<10} | {'After (s)':<10} | Speedup")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            ampl = solved_instance(BASE_NODES * scale, args.solver, workdir)
+            n_arcs = ampl.get_set("ARCS").size()
+            before = best_of(extract_before, ampl, args.repeat)
+            after = best_of(extract_after, ampl, args.repeat)
+            print(
+                f"{scale:<6} | {n_arcs:<8} | {before:<10.4f} | {after:<10.4f} | {before / after:.1f}x"
+            )
+            ampl.close()
+
+
+if __name__ == "__main__":
+    main()
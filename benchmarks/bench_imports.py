@@ -0,0 +1,195 @@
+"""
+Cold-start import benchmark of the problem scripts.
+
+Each script module is imported in a fresh interpreter under
+``python -X importtime`` from its own directory, as the Makefile runs it.
+The report gives the cumulative import time of the module (fastest of
+--repeat runs), the slowest modules it pulls in, and the heavy packages
+loaded at import. amplpy, matplotlib, networkx and pandas should only load
+once a run actually solves or draws, so any of them showing up here is
+reported as a failure.
+
+    python benchmarks/bench_imports.py --output imports.json
+    python benchmarks/bench_imports.py --baseline imports.json
+
+With --baseline, modules whose import got slower by more than --threshold
+(relative) and --min-diff (milliseconds) are reported too. The exit status
+is 1 when a module fails to import, loads a heavy package or regressed, so
+the check can gate a change.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, os.pardir)
+
+# Script module -> directory it runs from
+MODULES = {
+    "problem1": "problem1_python",
+    "problem2": "problem2_python",
+    "problem3_1": "problem3_python",
+    "problem3_2": "problem3_python",
+    "problem4": "problem4_python",
+    "visualize_tree": "problem4_python",
+}
+
+# Packages that must not be imported when a script is loaded
+HEAVY = ("amplpy", "matplotlib", "networkx", "pandas")
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module, directory):
+    """
+    Imports module in a fresh interpreter under -X importtime.
+
+    Returns:
+        list: (module, cumulative microseconds, nesting depth) per imported
+              module, in the order -X importtime reports them (children
+              before their parent).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.join(ROOT, directory),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return [
+        (match.group(4), int(match.group(2)), len(match.group(3)))
+        for match in IMPORT_LINE.finditer(result.stderr)
+    ]
+
+
+def _direct_imports(entries, position):
+    """The entries imported directly by the one at position."""
+    depth = entries[position][2]
+    children = []
+    for name, us, d in reversed(entries[:position]):
+        if d <= depth:
+            break
+        if d == depth + 2:
+            children.append((name, us))
+    return children
+
+
+def run_module(module, directory, repeat, top):
+    """Measures one module repeat times and keeps the fastest run."""
+    best = None
+    for _ in range(repeat):
+        entries = measure(module, directory)
+        position = [name for name, _, _ in entries].index(module)
+        if best is None or entries[position][1] < best[1][position][1]:
+            best = position, entries
+    position, entries = best
+    # Direct imports only; nested ones are part of their cumulative time
+    slowest = sorted(_direct_imports(entries, position), key=lambda t: -t[1])[:top]
+    heavy = sorted({name.split(".")[0] for name, _, _ in entries if name.split(".")[0] in HEAVY})
+    return {
+        "milliseconds": entries[position][1] / 1000,
+        "modules": len(entries),
+        "slowest": [[name, us / 1000] for name, us in slowest],
+        "heavy": heavy,
+    }
+
+
+def compare(results, baseline, threshold, min_diff):
+    """(module, baseline ms, new ms) for every module that got slower."""
+    regressions = []
+    for module, entry in results.items():
+        before = baseline.get(module, {}).get("milliseconds")
+        if before is None or "milliseconds" not in entry:
+            continue
+        after = entry["milliseconds"]
+        if after > before * (1 + threshold) and after - before > min_diff:
+            regressions.append((module, before, after))
+    return regressions
+
+
+def format_results(results):
+    """Builds the per-module table."""
+    header = f"{'Module':<15} | {'Import (ms)':>11} | {'Modules':>7} | Slowest dependencies"
+    lines = [header, "-" * len(header)]
+    for module, entry in results.items():
+        if "error" in entry:
+            lines.append(f"{module:<15} | {entry['error']}")
+            continue
+        slowest = ", ".join(f"{name} {ms:.1f}" for name, ms in entry["slowest"])
+        lines.append(f"{module:<15} | {entry['milliseconds']:>11.1f} | {entry['modules']:>7} | {slowest}")
+        if entry["heavy"]:
+            lines.append(f"{'':<15} | HEAVY IMPORTS: {', '.join(entry['heavy'])}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", choices=list(MODULES), default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module; the fastest is kept")
+    parser.add_argument("--top", type=int, default=3, help="slowest dependencies listed per module")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown reported (default 0.25)")
+    parser.add_argument("--min-diff", type=float, default=20, help="absolute slowdown in ms reported (default 20)")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        print(f"Importing {module}...")
+        try:
+            results[module] = run_module(module, MODULES[module], args.repeat, args.top)
+        except RuntimeError as e:
+            results[module] = {"error": str(e)}
+
+    print()
+    for line in format_results(results):
+        print(line)
+
+    if args.output:
+        report = {
+            "metadata": {
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    status = 0
+    failed = [module for module, entry in results.items() if "error" in entry]
+    if failed:
+        print(f"\nFailed to import: {', '.join(failed)}")
+        status = 1
+
+    heavy = [module for module, entry in results.items() if entry.get("heavy")]
+    if heavy:
+        print(f"\nHeavy packages imported at load time by: {', '.join(heavy)}")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold, args.min_diff)
+        print(f"\nCompared with {args.baseline} ({baseline['metadata']['created']}):")
+        if not regressions:
+            print("No regressions.")
+        for module, before, after in regressions:
+            print(f"  REGRESSION {module}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""
+Stage-level benchmark of every problem pipeline.
+
+Each pipeline is timed stage by stage (AMPL startup, model read, data
+read, solve, result extraction, post-processing and rendering) on the
+bundled data and on synthetic instances scaled up from it. HiGHS is the
+default solver so the suite runs offline without a Gurobi license, and
+the solve cache is bypassed so every run really solves.
+
+    python benchmarks/bench_stages.py --output bench.json
+    python benchmarks/bench_stages.py --baseline bench.json
+
+With --baseline, stages that got slower by more than --threshold
+(relative) and --min-diff (seconds), and pipelines that now fail but ran
+in the baseline, are reported and the exit status is 1, so the
+comparison can gate a change.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, os.pardir)
+PROBLEM_DIRS = {
+    1: os.path.join(ROOT, "problem1_python"),
+    2: os.path.join(ROOT, "problem2_python"),
+    3: os.path.join(ROOT, "problem3_python"),
+    4: os.path.join(ROOT, "problem4_python"),
+}
+
+STAGES = ["startup", "read_model", "read_data", "solve", "extract", "postprocess", "render"]
+
+# Largest scale run by default: the MIPs and the tree drawing grow much
+# faster than the LPs. --no-limits runs every scale anyway.
+SCALE_LIMITS = {
+    "problem1": 1000,
+    "problem2": 10,
+    "problem3_1": 1000,
+    "problem3_2": 100,
+    "problem4": 1000,
+    "draw_tree": 10,
+}
+
+BASE_NODES = 27  # size of the bundled problem 3 networks
+BASE_ENGINES = 5  # engines in problem2.dat
+BASE_PRODUCTS = 3  # products in problem4.dat
+BASE_TREE_NODES = 40  # nodes of the bundled search tree
+
+
+class StageTimer:
+    """Accumulates wall-clock time per stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - t0
+
+
+def load_ampl(timer, model_file, data_file, options):
+    """Starts AMPL and reads the model and data, timing each step."""
+    from amplpy import AMPL
+
+    with timer.stage("startup"):
+        ampl = AMPL()
+        for name, value in options.items():
+            ampl.option[name] = value
+        ampl.option["solver_msg"] = 0
+    with timer.stage("read_model"):
+        ampl.read(model_file)
+    with timer.stage("read_data"):
+        ampl.read_data(data_file)
+    return ampl
+
+
+# --- Pipelines ---
+# Each takes the scale, a scratch directory and a StageTimer, runs one
+# instance and returns a dict describing its size.
+
+def run_problem1(scale, workdir, timer):
+    import problem1
+    from synthetic import write_supplier_data
+
+    data_file = os.path.join(PROBLEM_DIRS[1], "problem1.dat")
+    if scale > 1:
+        data_file = os.path.join(workdir, f"problem1_{scale}.dat")
+        write_supplier_data(data_file, scale)
+
+    ampl = load_ampl(timer, os.path.join(PROBLEM_DIRS[1], "problem1.mod"), data_file, problem1.AMPL_OPTIONS)
+    with timer.stage("solve"):
+        ampl.solve()
+    with timer.stage("extract"):
+        record = problem1._extract_record(ampl)
+    with timer.stage("postprocess"):
+        problem1.format_results(record)
+    ampl.close()
+    return {"demand": 1000 * scale}
+
+
+def run_problem2(scale, workdir, timer):
+    import problem2
+    from synthetic import write_engine_data
+
+    n_engines = BASE_ENGINES * scale
+    data_file = os.path.join(PROBLEM_DIRS[2], "problem2.dat")
+    if scale > 1:
+        data_file = os.path.join(workdir, f"problem2_{scale}.dat")
+        write_engine_data(data_file, n_engines, seed=scale)
+
+    ampl = load_ampl(timer, os.path.join(PROBLEM_DIRS[2], "problem2.mod"), data_file, problem2.AMPL_OPTIONS)
+    with timer.stage("solve"):
+        ampl.solve()
+    with timer.stage("extract"):
+        record = problem2._extract_record(ampl)
+    with timer.stage("postprocess"):
+        sequence, _ = problem2.sequence_from_record(record)
+        s, p, t, _ = problem2.extract_data(record)
+    with timer.stage("render"):
+        problem2.plot_gantt(sequence, s, p, t, os.path.join(workdir, "gantt.pdf"), "Optimal Production Schedule")
+    ampl.close()
+    return {"engines": n_engines}
+
+
+def run_problem3_1(scale, workdir, timer):
+    import problem3_1
+    from synthetic import write_network_data
+
+    if scale > 1:
+        data_file = os.path.join(workdir, f"MCFP_3_1_{scale}.dat")
+        stations = write_network_data(data_file, BASE_NODES * scale, seed=scale, balance=True)
+        crew, power = stations[0], stations[1]
+    else:
+        data_file = os.path.join(PROBLEM_DIRS[3], "MCFP_3_1.dat")
+        crew, power = 1, "3p"
+
+    ampl = load_ampl(timer, os.path.join(PROBLEM_DIRS[3], "MCFP_3_1.mod"), data_file, problem3_1.AMPL_OPTIONS)
+    with timer.stage("read_data"):
+        ampl.param["b"] = {crew: 1, power: -1}
+    with timer.stage("solve"):
+        ampl.solve()
+    with timer.stage("extract"):
+        record = problem3_1._extract_record(ampl)
+    with timer.stage("postprocess"):
+        result = problem3_1.route_from_record(record, crew, power)
+        problem3_1.format_table([result])
+    n_arcs = ampl.get_set("ARCS").size()
+    ampl.close()
+    return {"nodes": BASE_NODES * scale, "arcs": n_arcs}
+
+
+def run_problem3_2(scale, workdir, timer):
+    import problem3_2
+    from synthetic import write_network_data
+
+    data_file = os.path.join(PROBLEM_DIRS[3], "MCFP_3_2.dat")
+    if scale > 1:
+        data_file = os.path.join(workdir, f"MCFP_3_2_{scale}.dat")
+        write_network_data(data_file, BASE_NODES * scale, seed=scale)
+
+    ampl = load_ampl(timer, os.path.join(PROBLEM_DIRS[3], "MCFP_3_2.mod"), data_file, problem3_2.AMPL_OPTIONS)
+    with timer.stage("read_data"):
+        ampl.param["number_of_crews"] = 2
+    with timer.stage("solve"):
+        ampl.solve()
+    with timer.stage("extract"):
+        record = problem3_2._extract_record(ampl)
+    with timer.stage("postprocess"):
+        problem3_2.paths_from_record(record)
+    n_arcs = ampl.get_set("ARCS").size()
+    ampl.close()
+    return {"nodes": BASE_NODES * scale, "arcs": n_arcs}
+
+
+def run_problem4(scale, workdir, timer):
+    import problem4
+    from synthetic import write_product_mix_data
+
+    data_file = os.path.join(PROBLEM_DIRS[4], "problem4.dat")
+    if scale > 1:
+        data_file = os.path.join(workdir, f"problem4_{scale}.dat")
+        write_product_mix_data(data_file, BASE_PRODUCTS * scale, seed=scale)
+
+    ampl = load_ampl(timer, os.path.join(PROBLEM_DIRS[4], "integer.mod"), data_file, problem4.AMPL_OPTIONS)
+    with timer.stage("solve"):
+        ampl.solve()
+    with timer.stage("extract"):
+        record = problem4._extract_record(ampl)
+    with timer.stage("postprocess"):
+        problem4.format_record(record)
+    ampl.close()
+    return {"products": BASE_PRODUCTS * scale}
+
+
+def synthetic_tree(n_nodes, seed=0):
+    """
+    Builds a random branch-and-bound tree of n_nodes BranchNodes, parents
+    before children, with a mix of fractional, integer and infeasible nodes.
+    """
+    from visualize_tree import BranchNode
+
+    rng = random.Random(seed)
+    root = BranchNode(
+        node_id="relaxation",
+        branch_constraint="Relaxation",
+        z_value=6.5e6,
+        x_values={"WingRib": 105.26, "WingSpar": 168.42},
+    )
+    nodes = [root]
+    frontier = [root]
+    while len(nodes) < n_nodes and frontier:
+        parent = frontier.pop(rng.randrange(len(frontier)))
+        bound = rng.randint(0, 200)
+        for sense in ("<=", ">="):
+            if len(nodes) == n_nodes:
+                break
+            node = BranchNode(
+                node_id=f"node{len(nodes)}",
+                parent_id=parent.node_id,
+                branch_constraint=f"x['{rng.choice(['WingRib', 'WingSpar', 'FuselagePanel'])}'] {sense} {bound}",
+            )
+            outcome = rng.random()
+            if outcome < 0.15:
+                node.pruned_reason = "Infeasible"
+            else:
+                node.z_value = parent.z_value - rng.uniform(0, 5000)
+                node.x_values = {"WingRib": rng.uniform(0, 200), "WingSpar": rng.uniform(0, 200)}
+                if outcome < 0.35:
+                    node.is_integer_solution = True
+                    node.is_dominated = rng.random() < 0.5
+                    node.pruned_reason = "Optimal Solution"
+                else:
+                    frontier.append(node)
+            nodes.append(node)
+    return nodes
+
+
+def run_draw_tree(scale, workdir, timer):
+    import visualize_tree
+
+    with timer.stage("postprocess"):
+        if scale > 1:
+            nodes = synthetic_tree(BASE_TREE_NODES * scale, seed=scale)
+        else:
+            nodes = visualize_tree.bundled_nodes()
+    with timer.stage("render"):
+        visualize_tree.draw_tree(nodes, os.path.join(workdir, "tree.pdf"))
+    return {"nodes": len(nodes)}
+
+
+PIPELINES = {
+    "problem1": run_problem1,
+    "problem2": run_problem2,
+    "problem3_1": run_problem3_1,
+    "problem3_2": run_problem3_2,
+    "problem4": run_problem4,
+    "draw_tree": run_draw_tree,
+}
+
+
+def run_pipeline(name, scale, repeat, workdir):
+    """
+    Runs one pipeline repeat times and keeps the fastest time of every
+    stage. A failure is recorded instead of stopping the whole suite.
+    """
+    best = {}
+    size = {}
+    for _ in range(repeat):
+        timer = StageTimer()
+        try:
+            size = PIPELINES[name](scale, workdir, timer)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        for stage, seconds in timer.seconds.items():
+            best[stage] = min(seconds, best.get(stage, float("inf")))
+
+    stages = {s: best[s] for s in STAGES if s in best}
+    return {"size": size, "stages": stages, "total": sum(stages.values())}
+
+
+def compare(results, baseline, threshold, min_diff):
+    """
+    Lists the stages that got slower than in the baseline.
+
+    A stage counts as a regression when it is both more than threshold
+    times slower and more than min_diff seconds slower, so that noise on
+    millisecond stages is not reported.
+
+    Returns:
+        list: (pipeline, scale, stage, baseline seconds, new seconds) tuples.
+    """
+    regressions = []
+    for name, by_scale in results.items():
+        for scale, entry in by_scale.items():
+            old = baseline.get(name, {}).get(scale, {}).get("stages")
+            if old is None or "stages" not in entry:
+                continue
+            for stage, seconds in entry["stages"].items():
+                if stage not in old:
+                    continue
+                before = old[stage]
+                if seconds > before * (1 + threshold) and seconds - before > min_diff:
+                    regressions.append((name, scale, stage, before, seconds))
+    return regressions
+
+
+def broken(results, baseline):
+    """
+    Lists the pipelines that failed but have stage timings in the baseline.
+
+    Returns:
+        list: (pipeline, scale, error message) tuples.
+    """
+    failures = []
+    for name, by_scale in results.items():
+        for scale, entry in by_scale.items():
+            if "error" in entry and "stages" in baseline.get(name, {}).get(scale, {}):
+                failures.append((name, scale, entry["error"]))
+    return failures
+
+
+def format_results(results):
+    """Builds the per-stage timing table, in milliseconds."""
+    header = f"{'Pipeline':<11} | {'Scale':<5} | " + " | ".join(f"{s[:9]:>9}" for s in STAGES) + " | Total"
+    lines = [header, "-" * len(header)]
+    for name, by_scale in results.items():
+        for scale, entry in by_scale.items():
+            if "error" in entry:
+                lines.append(f"{name:<11} | {scale:<5} | {entry['error']}")
+                continue
+            cells = [
+                f"{entry['stages'][s] * 1000:>9.1f}" if s in entry["stages"] else f"{'-':>9}"
+                for s in STAGES
+            ]
+            lines.append(f"{name:<11} | {scale:<5} | " + " | ".join(cells) + f" | {entry['total'] * 1000:.1f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--solver", default="highs", help="AMPL solver, e.g. highs or cbc")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per instance; the fastest is kept")
+    parser.add_argument("--no-limits", action="store_true", help="run scales above SCALE_LIMITS too")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown reported (default 0.25)")
+    parser.add_argument("--min-diff", type=float, default=0.05, help="absolute slowdown in seconds reported (default 0.05)")
+    args = parser.parse_args()
+
+    # Both are read when the problem scripts are imported
+    os.environ["AMPLHW_SOLVER"] = args.solver
+    os.environ["AMPLHW_NO_CACHE"] = "1"
+    os.environ.pop("AMPLHW_OUTPUT", None)
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+    sys.path[:0] = [HERE] + list(PROBLEM_DIRS.values())
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.pipelines:
+            results[name] = {}
+            for scale in args.scales:
+                if scale > SCALE_LIMITS[name] and not args.no_limits:
+                    print(f"Skipping {name} at scale {scale} (limit {SCALE_LIMITS[name]}, see --no-limits)")
+                    continue
+                print(f"Running {name} at scale {scale}...")
+                results[name][str(scale)] = run_pipeline(name, scale, args.repeat, workdir)
+
+    print()
+    for line in format_results(results):
+        print(line)
+
+    if args.output:
+        report = {
+            "metadata": {
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "solver": args.solver,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold, args.min_diff)
+        failures = broken(results, baseline["results"])
+        print(f"\nCompared with {args.baseline} ({baseline['metadata']['created']}, solver {baseline['metadata']['solver']}):")
+        if not regressions and not failures:
+            print("No regressions.")
+            return 0
+        for name, scale, error in failures:
+            print(f"  FAILED {name} x{scale}: {error}")
+        for name, scale, stage, before, after in regressions:
+            print(f"  REGRESSION {name} x{scale} {stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+MTZ against iterative DFJ subtour cuts for the Problem 2 sequencing MIP.
+
+For every engine count a random instance is written with
+synthetic.write_engine_data and solved twice: once as problem2.mod is
+written (MTZ constraints and the continuous visit order v) and once with
+problem2.solve_with_subtour_cuts, which drops the MTZ rows and adds DFJ
+cuts for the subtours of each solution until one sequence is left. The
+table reports the solve time, the rounds and cuts of the DFJ mode and
+whether both objectives agree.
+
+    python benchmarks/bench_subtours.py --engines 5 10 15 20 --seeds 1 2
+    python benchmarks/bench_subtours.py --output subtours.json
+
+HiGHS is the default solver so the suite runs without a Gurobi license.
+MTZ is skipped above --mtz-max engines, where it takes too long.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROBLEM2_DIR = os.path.join(HERE, os.pardir, "problem2_python")
+MODEL_FILE = os.path.join(PROBLEM2_DIR, "problem2.mod")
+
+
+def load_ampl(data_file, solver):
+    """Starts AMPL with problem2.mod and the data read."""
+    from amplpy import AMPL
+
+    ampl = AMPL()
+    ampl.option["solver"] = solver
+    ampl.option["solver_msg"] = 0
+    ampl.read(MODEL_FILE)
+    ampl.read_data(data_file)
+    return ampl
+
+
+def run_mtz(data_file, solver):
+    """Solves the MTZ model as written."""
+    ampl = load_ampl(data_file, solver)
+    try:
+        t0 = time.perf_counter()
+        ampl.solve()
+        seconds = time.perf_counter() - t0
+        solved = ampl.get_value("solve_result") == "solved"
+        return {"seconds": seconds, "objective": ampl.get_objective("Time").value() if solved else None}
+    finally:
+        ampl.close()
+
+
+def run_dfj(data_file, solver):
+    """Solves with iterative subtour cuts."""
+    import problem2
+
+    ampl = load_ampl(data_file, solver)
+    try:
+        t0 = time.perf_counter()
+        rounds, tour = problem2.solve_with_subtour_cuts(ampl)
+        seconds = time.perf_counter() - t0
+        return {
+            "seconds": seconds,
+            "objective": ampl.get_objective("Time").value() if tour else None,
+            "rounds": len(rounds),
+            "cuts": sum(r.cuts for r in rounds),
+        }
+    finally:
+        ampl.close()
+
+
+def format_results(results):
+    """Builds the per-instance comparison table."""
+    header = f"{'Engines':>7} | {'Seed':>4} | {'MTZ (s)':>8} | {'DFJ (s)':>8} | {'Rounds':>6} | {'Cuts':>5} | Objective"
+    lines = [header, "-" * len(header)]
+    for entry in results:
+        mtz, dfj = entry.get("mtz"), entry["dfj"]
+        mtz_seconds = f"{mtz['seconds']:>8.3f}" if mtz else f"{'-':>8}"
+        if dfj["objective"] is None:
+            objective = "DFJ failed"
+        elif mtz is None:
+            objective = f"{dfj['objective']:,.2f}"
+        elif mtz["objective"] is not None and abs(mtz["objective"] - dfj["objective"]) < 1e-6:
+            objective = f"{dfj['objective']:,.2f} (both)"
+        else:
+            objective = f"MISMATCH: MTZ {mtz['objective']}, DFJ {dfj['objective']}"
+        lines.append(
+            f"{entry['engines']:>7} | {entry['seed']:>4} | {mtz_seconds} | {dfj['seconds']:>8.3f} | "
+            f"{dfj['rounds']:>6} | {dfj['cuts']:>5} | {objective}"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engines", type=int, nargs="+", default=[5, 8, 10, 12, 15, 20])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3], help="one random instance per size and seed")
+    parser.add_argument("--solver", default="highs", help="AMPL solver, e.g. highs or gurobi")
+    parser.add_argument("--mtz-max", type=int, default=15, help="largest engine count solved with MTZ (default 15)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    # Read when problem2 is imported
+    os.environ["AMPLHW_SOLVER"] = args.solver
+    os.environ.pop("AMPLHW_OUTPUT", None)
+    sys.path[:0] = [HERE, PROBLEM2_DIR]
+    from synthetic import write_engine_data
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n, seed in itertools.product(args.engines, args.seeds):
+            data_file = os.path.join(workdir, f"engines{n}_{seed}.dat")
+            write_engine_data(data_file, n, seed=seed)
+            print(f"Running {n} engines, seed {seed}...")
+            entry = {"engines": n, "seed": seed, "dfj": run_dfj(data_file, args.solver)}
+            if n <= args.mtz_max:
+                entry["mtz"] = run_mtz(data_file, args.solver)
+            results.append(entry)
+
+    print()
+    for line in format_results(results):
+        print(line)
+
+    if args.output:
+        report = {
+            "metadata": {
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "solver": args.solver,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
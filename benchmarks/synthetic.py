@@ -0,0 +1,142 @@
+"""
+Synthetic instances for the benchmarks, scaled up from the bundled data.
+
+Every generator writes an AMPL .dat file in the same layout as the
+corresponding file in the problem directories, so the original .mod
+files can be used unchanged.
+"""
+
+import random
+
+
+def write_network_data(filename, n_nodes, out_degree=3, n_stations=6, seed=0, balance=False):
+    """
+    Writes a road network in the layout of MCFP_3_2.dat (or MCFP_3_1.dat
+    with balance=True).
+
+    Nodes 1..n_nodes are joined in a ring so the network stays strongly
+    connected, plus out_degree - 1 random arcs per node. The last
+    n_stations nodes of a random permutation are power stations.
+
+    Returns:
+        list: The power station nodes.
+    """
+    rng = random.Random(seed)
+    arcs = []
+    for u in range(1, n_nodes + 1):
+        heads = {u % n_nodes + 1}
+        while len(heads) < min(out_degree, n_nodes - 1):
+            v = rng.randint(1, n_nodes)
+            if v != u:
+                heads.add(v)
+        for v in sorted(heads):
+            arcs.append((u, v, rng.randint(1, 16) / 2))
+
+    nodes = list(range(1, n_nodes + 1))
+    stations = rng.sample(nodes, n_stations)
+
+    with open(filename, "w") as f:
+        if not balance:
+            f.write(f"set POWERSTATIONS := {', '.join(map(str, stations))};\n\n")
+        f.write("param: ARCS:\tc\tlb\tub\ti\tj:=\n")
+        for a, (u, v, c) in enumerate(arcs, start=1):
+            f.write(f"\t{a}\t{c:g}\t0\t100\t{u}\t{v}\n")
+        f.write(";\n\n")
+        if balance:
+            f.write("param: NODES: b:=\n")
+            f.write("".join(f"{n}\t0\n" for n in nodes))
+            f.write(";\n")
+        else:
+            f.write("set NODES :=\n")
+            f.write(",\n".join(map(str, nodes)))
+            f.write(";\n")
+
+    return stations
+
+
+def write_supplier_data(filename, scale):
+    """
+    Writes the supplier selection data of problem1.dat with the demand and
+    every tier quantity multiplied by scale.
+
+    problem1.mod refers to suppliers A, B and C by name, so only the
+    quantities can grow, not the number of suppliers.
+    """
+    quantities = {("A", 1): 200, ("A", 2): 500, ("B", 1): None, ("B", 2): 0, ("C", 1): 150, ("C", 2): 400}
+    costs = {("A", 1): 60, ("A", 2): 50, ("B", 1): 55, ("B", 2): 0, ("C", 1): 75, ("C", 2): 38}
+
+    with open(filename, "w") as f:
+        f.write("set Suppliers := A B C;\nset Tiers := 1 2;\n\n")
+        f.write(f"param demand {1000 * scale};\n")
+        f.write("param Tier_Quantities :=\n")
+        for (s, t), q in quantities.items():
+            f.write(f"  [{s},{t}] {'Infinity' if q is None else q * scale}\n")
+        f.write(";\nparam Tier_Costs :=\n")
+        for (s, t), c in costs.items():
+            f.write(f"  [{s},{t}] {c}\n")
+        f.write(";\n")
+
+
+def write_engine_data(filename, n_engines, seed=0):
+    """
+    Writes an engine sequencing instance in the layout of problem2.dat.
+
+    Engine 0 is the dummy start/end engine: it has no processing time and
+    every switchover back to it is free. Switchover times are drawn from
+    the range of the bundled data.
+    """
+    rng = random.Random(seed)
+    engines = list(range(n_engines + 1))
+
+    with open(filename, "w") as f:
+        f.write(f"set E := {' '.join(map(str, engines))};\n")
+        f.write("set T := C M None;\n\n")
+        f.write(f"param s: {' '.join(map(str, engines))}:=\n")
+        for i in engines:
+            row = [0 if j in (0, i) else rng.randint(3, 12) for j in engines]
+            f.write(f"{i}  {' '.join(map(str, row))}\n")
+        f.write(";\n\nparam p:=\n0 0\n")
+        f.write("".join(f"{e} {rng.choice((5, 8, 10))}\n" for e in engines[1:]))
+        f.write(";\n\nparam t:=\n0 None\n")
+        f.write("".join(f"{e} {rng.choice('CM')}\n" for e in engines[1:]))
+        f.write(";\n")
+
+
+def write_product_mix_data(filename, n_products, seed=0, fractional=False):
+    """
+    Writes a product mix instance in the layout of problem4.dat.
+
+    Prices and resource use per unit are drawn around the bundled values;
+    the hour and aluminum limits grow with the number of products so the
+    production plan keeps a similar size per product.
+
+    With fractional=True the resource use is drawn on a finer grid and the
+    limits are moved off round numbers, so that the LP relaxation is not
+    already integral and branch and bound has a tree to explore.
+    """
+    rng = random.Random(seed)
+    products = [f"Product{k}" for k in range(1, n_products + 1)]
+    scale = max(1, n_products // 3)
+
+    prices = [rng.randint(20000, 32000) for _ in products]
+    if fractional:
+        hours = [f"{rng.randint(3, 17) / 7:.4f}" for _ in products]
+        alum = [f"{rng.randint(5, 31) / 3:.4f}" for _ in products]
+        max_alum = f"{600 * scale + rng.randint(1, 99) / 10:g}"
+        max_hour = f"{200 * scale + rng.randint(1, 99) / 10:g}"
+    else:
+        hours = [f"{rng.randint(2, 10) / 10:g}" for _ in products]
+        alum = [f"{rng.randint(3, 7) / 2:g}" for _ in products]
+        max_alum, max_hour = 600 * scale, 200 * scale
+
+    with open(filename, "w") as f:
+        f.write(f"set P := {' '.join(products)};\n\n")
+        f.write("param sellValue:=\n")
+        f.write("".join(f"{p} {v}\n" for p, v in zip(products, prices)))
+        f.write(";\n\nparam hours:=\n")
+        f.write("".join(f"{p} {h}\n" for p, h in zip(products, hours)))
+        f.write(";\n\nparam alum:=\n")
+        f.write("".join(f"{p} {a}\n" for p, a in zip(products, alum)))
+        f.write(";\n\n")
+        f.write(f"param maxAlum {max_alum};\n")
+        f.write(f"param maxHour {max_hour};\n")
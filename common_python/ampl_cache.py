@@ -0,0 +1,248 @@
+"""
+Content-addressed on-disk cache of AMPL solve results.
+
+A solve is identified by a hash of the model text, the data text, the
+parameter overrides and the AMPL options (solver name included). The
+cache stores the solve status, the objective value and the extracted
+entity values, so a repeated run can be replayed without starting AMPL.
+
+Environment variables:
+    AMPLHW_NO_CACHE      Set to bypass the cache entirely.
+    AMPLHW_CACHE_DIR     Cache directory (default: .ampl_cache at the repo root).
+    AMPLHW_CACHE_MAX_MB  Size bound; least recently used entries are evicted
+                         beyond it (default: 64).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from tracing import span
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, ".ampl_cache"
+)
+DEFAULT_MAX_MB = 64
+
+# Bumped whenever the layout of stored records changes
+RECORD_FORMAT = 2
+
+# Solve results worth replaying; anything else (failure, limit, ...) may
+# succeed on a later run, e.g. once a license is available
+CACHED_STATUSES = ("solved", "infeasible")
+
+
+@dataclass
+class SolveRecord:
+    status: str
+    objective: Optional[float]
+    values: Dict[str, Any] = field(default_factory=dict)  # entity name -> values
+
+
+def _canonical(obj):
+    """Turns nested overrides/options into something json.dumps can sort."""
+    if isinstance(obj, dict):
+        return sorted([repr(k), _canonical(v)] for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    return obj
+
+
+def cache_key(model_file, data_file, overrides=None, options=None):
+    """
+    Hashes everything that determines a solve result.
+
+    Args:
+        model_file (str): Path to the AMPL model file.
+        data_file (str): Path to the AMPL data file.
+        overrides (dict, optional): Parameter values set after reading the data.
+        options (dict, optional): AMPL options, including the solver name.
+
+    Returns:
+        str: Hex digest identifying the solve.
+    """
+    h = hashlib.sha256(f"record-format-{RECORD_FORMAT}".encode())
+    for path in (model_file, data_file):
+        with open(path, "rb") as f:
+            h.update(f.read())
+        h.update(b"\0")
+    h.update(json.dumps(_canonical(overrides or {})).encode())
+    h.update(b"\0")
+    h.update(json.dumps(_canonical(options or {})).encode())
+    return h.hexdigest()
+
+
+def _encode_values(values):
+    # Entity dicts are keyed by scalars or tuples, which JSON objects cannot hold
+    encoded = {}
+    for name, entity in values.items():
+        if isinstance(entity, dict):
+            encoded[name] = {
+                "items": [
+                    [list(k) if isinstance(k, tuple) else k, v]
+                    for k, v in entity.items()
+                ]
+            }
+        elif hasattr(entity, "columns"):  # DataFrame from ampl_extract.get_frame
+            encoded[name] = {
+                "index": [list(k) if isinstance(k, tuple) else k for k in entity.index],
+                "columns": {c: entity[c].tolist() for c in entity.columns},
+            }
+        else:
+            encoded[name] = {"list": entity}
+    return encoded
+
+
+def _decode_values(encoded):
+    values = {}
+    for name, entity in encoded.items():
+        if "items" in entity:
+            values[name] = {
+                tuple(k) if isinstance(k, list) else k: v for k, v in entity["items"]
+            }
+        elif "columns" in entity:
+            import pandas as pd
+
+            index = entity["index"]
+            if index and isinstance(index[0], list):
+                index = pd.MultiIndex.from_tuples([tuple(k) for k in index])
+            values[name] = pd.DataFrame(entity["columns"], index=index)
+        else:
+            values[name] = entity["list"]
+    return values
+
+
+def _json_default(obj):
+    # NumPy scalars that json cannot serialize on its own
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def record_to_dict(record):
+    """A SolveRecord as plain JSON-serializable data."""
+    return {
+        "status": record.status,
+        "objective": record.objective,
+        "values": _encode_values(record.values),
+    }
+
+
+def record_from_dict(data):
+    """The SolveRecord stored by record_to_dict."""
+    return SolveRecord(data["status"], data["objective"], _decode_values(data["values"]))
+
+
+class SolveCache:
+    """Directory of JSON solve records with size-bounded LRU eviction."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the stored SolveRecord, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            # Touching the entry marks it as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return record_from_dict(data)
+
+    def put(self, key, record):
+        """Stores a record atomically, then evicts old entries if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        data = record_to_dict(record)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, default=_json_default)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the size bound holds."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def default_cache():
+    """Returns the cache configured by the environment, or None if bypassed."""
+    if os.getenv("AMPLHW_NO_CACHE"):
+        return None
+    directory = os.getenv("AMPLHW_CACHE_DIR", DEFAULT_CACHE_DIR)
+    max_mb = float(os.getenv("AMPLHW_CACHE_MAX_MB", DEFAULT_MAX_MB))
+    return SolveCache(directory, int(max_mb * 2**20))
+
+
+def cached_solve(key, solve):
+    """
+    Replays the record stored under key, or calls solve() and stores its
+    SolveRecord when its status is in CACHED_STATUSES. A key of None always
+    solves.
+    """
+    cache = default_cache() if key is not None else None
+    if cache is not None:
+        record = cache.get(key)
+        if record is not None:
+            print(f"Using cached solve result {key[:12]}.")
+            return record
+
+    record = solve()
+    if cache is not None and record.status in CACHED_STATUSES:
+        cache.put(key, record)
+    return record
+
+
+def record_from_ampl(ampl, objective, entities=(), sets=(), frames=None):
+    """
+    Builds a SolveRecord from a solved AMPL instance.
+
+    Args:
+        ampl (AMPL): The solved AMPL instance.
+        objective (str): Name of the objective to read.
+        entities (iterable): Variables or parameters stored as dicts.
+        sets (iterable): Sets stored as lists of members.
+        frames (dict, optional): Record name -> (entity names, nonzero
+            column or None), stored as DataFrames fetched in one call each
+            (see ampl_extract.get_frame).
+    """
+    with span("extract") as s:
+        values = {name: ampl.get_entity(name).get_values().to_dict() for name in entities}
+        for name in sets:
+            values[name] = ampl.get_set(name).get_values().to_list()
+        if frames:
+            from ampl_extract import get_frame
+
+            for name, (columns, nonzero) in frames.items():
+                values[name] = get_frame(ampl, *columns, nonzero=nonzero)
+        s.count(**{name: len(v) for name, v in values.items()})
+        return SolveRecord(
+            status=ampl.get_value("solve_result"),
+            objective=ampl.get_objective(objective).value(),
+            values=values,
+        )
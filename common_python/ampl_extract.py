@@ -0,0 +1,67 @@
+"""
+Bulk columnar extraction of AMPL results.
+
+Instead of one ``get_values().to_dict()`` call per entity followed by
+Python loops over tuple-keyed dicts, entities that share an indexing set
+are fetched with a single getData call into a pandas DataFrame, filtered
+with NumPy masks and handed on as arrays with integer codes.
+"""
+
+import numpy as np
+
+
+def safe_str(val):
+    """Converts AMPL values to normalized strings (removing .0 for integers)."""
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val)
+
+
+def get_frame(ampl, *names, nonzero=None, tol=1e-9):
+    """
+    Fetches several entities over the same indexing set in one call.
+
+    Args:
+        ampl (AMPL): A solved AMPL instance.
+        *names (str): Variables or parameters sharing an indexing set.
+        nonzero (str, optional): Keep only the rows where this column is
+            nonzero (beyond tol), e.g. the arcs that carry flow.
+        tol (float): Zero tolerance for the nonzero filter.
+
+    Returns:
+        pandas.DataFrame: Indexed by the set members, one column per name.
+    """
+    df = ampl.get_data(*names).to_pandas()
+    df.columns = list(names)
+    if nonzero is not None:
+        df = df[np.abs(df[nonzero].to_numpy(dtype=float)) > tol]
+    return df
+
+
+def label_codes(*columns, normalize=None):
+    """
+    Maps the labels found in one or more columns to shared integer codes.
+
+    Args:
+        *columns (array-like): Label columns, e.g. the tail and head nodes.
+        normalize (callable, optional): Applied to every distinct label;
+            labels equal after normalizing get the same code.
+
+    Returns:
+        tuple: (list of code arrays, one per column; array of labels).
+    """
+    # pandas is only imported once there are results to code
+    import pandas as pd
+
+    values = np.concatenate([np.asarray(c, dtype=object) for c in columns])
+    codes, labels = pd.factorize(values)
+    labels = np.asarray(labels, dtype=object)
+    if normalize is not None:
+        # Raw labels that normalize to the same string (5 and 5.0) share a
+        # code; normalize runs once per distinct raw label
+        merged, labels = pd.factorize(np.array([normalize(v) for v in labels], dtype=object))
+        codes = merged[codes]
+        labels = np.asarray(labels, dtype=object)
+
+    split = np.cumsum([len(c) for c in columns])[:-1]
+    return np.split(codes, split), labels
@@ -0,0 +1,167 @@
+"""
+Process-pool runner for independent AMPL solves.
+
+A job names a model, a data file, optional parameter overrides and an
+optional output file. Jobs are spread across worker processes that each
+keep one AMPL instance alive, so consecutive jobs on the same model only
+reload data instead of restarting AMPL and re-translating the model.
+Results are returned in submission order and output files are written by
+the parent, which keeps the .amplout files identical to a serial run.
+
+AMPL is only started and loaded the first time a handler touches it, so
+handlers that answer from the solve cache never pay for it.
+"""
+
+import multiprocessing
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from tracing import span
+
+
+@dataclass(frozen=True)
+class AmplJob:
+    model_file: str
+    data_file: str
+    overrides: Dict[str, Any] = field(default_factory=dict)
+    output_file: Optional[str] = None
+    args: Tuple[Any, ...] = ()  # extra arguments for the job handler
+
+
+@dataclass
+class JobResult:
+    job: AmplJob
+    value: Any
+    output_lines: List[str]
+
+
+class WarmSession:
+    """One long-lived AMPL instance that loads whatever a job asks for."""
+
+    def __init__(self, options=None):
+        self.ampl = None
+        self._options = options or {}
+        self._loaded = None
+        self._overrides = {}
+
+    def _can_reuse(self, job):
+        if self._loaded != (job.model_file, job.data_file):
+            return False
+        # Previous overrides must be fully overwritten by this job's ones,
+        # otherwise the data has to be read again to drop them.
+        for name, value in self._overrides.items():
+            if isinstance(value, dict) or name not in job.overrides:
+                return False
+        return True
+
+    def prepare(self, job):
+        """Returns the AMPL instance with the job's model, data and overrides."""
+        if self.ampl is None:
+            from amplpy import AMPL
+
+            self.ampl = AMPL()
+            for name, value in self._options.items():
+                self.ampl.option[name] = value
+
+        if not self._can_reuse(job):
+            if self._loaded is not None and self._loaded[0] == job.model_file:
+                self.ampl.eval("reset data;")
+            else:
+                self.ampl.reset()
+                with span("read_model", bytes=os.path.getsize(job.model_file)):
+                    self.ampl.read(job.model_file)
+            with span("read_data", bytes=os.path.getsize(job.data_file)):
+                self.ampl.read_data(job.data_file)
+            self._loaded = (job.model_file, job.data_file)
+
+        for name, value in job.overrides.items():
+            self.ampl.param[name] = value
+        self._overrides = dict(job.overrides)
+        return self.ampl
+
+    def lazy(self, job):
+        """Returns a stand-in that prepares the job on first attribute access."""
+        return _LazyAmpl(self, job)
+
+    def close(self):
+        if self.ampl is not None:
+            self.ampl.close()
+
+
+class _LazyAmpl:
+    """Stands in for the job's AMPL instance until an attribute is needed."""
+
+    def __init__(self, session, job):
+        self._session = session
+        self._job = job
+        self._ampl = None
+
+    def __getattr__(self, name):
+        if self._ampl is None:
+            self._ampl = self._session.prepare(self._job)
+        return getattr(self._ampl, name)
+
+
+_session = None
+
+
+def _init_worker(options):
+    global _session
+    _session = WarmSession(options)
+
+
+def _run_job(handler, job):
+    value, output_lines = handler(_session.lazy(job), job)
+    return JobResult(job, value, output_lines)
+
+
+def default_workers():
+    """Worker count from AMPLHW_WORKERS, or the number of CPUs."""
+    return int(os.getenv("AMPLHW_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def run_jobs(handler, jobs, workers=None, options=None):
+    """
+    Runs every job and returns their results in submission order.
+
+    Args:
+        handler (callable): Module-level function ``handler(ampl, job)``
+            returning ``(value, output_lines)``. It receives an AMPL instance
+            with the job's model, data and overrides already loaded.
+        jobs (list): AmplJob instances.
+        workers (int, optional): Number of worker processes. Defaults to
+            default_workers(); 1 runs everything in this process.
+        options (dict, optional): AMPL options set once per worker.
+
+    Returns:
+        list: One JobResult per job. The output lines of jobs that name an
+              output file are written to it.
+    """
+    jobs = list(jobs)
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers == 1:
+        global _session
+        _init_worker(options)
+        try:
+            results = [_run_job(handler, job) for job in jobs]
+        finally:
+            _session.close()
+            _session = None
+    else:
+        with multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(options,)
+        ) as pool:
+            results = list(pool.imap(partial(_run_job, handler), jobs))
+
+    for result in results:
+        if result.job.output_file:
+            with span("write_output", lines=len(result.output_lines)):
+                with open(result.job.output_file, "w") as f:
+                    f.write("\n".join(result.output_lines))
+
+    return results
@@ -0,0 +1,34 @@
+"""
+Deferred matplotlib loading.
+
+Importing matplotlib.pyplot costs a few hundred milliseconds and picks a
+GUI backend, which runs that only solve or replay cached results do not
+need. The chart functions call pyplot() when they actually draw, so the
+scripts import quickly. The charts are only ever written to files, so
+without a display (or with AMPLHW_HEADLESS set) the Agg backend is
+selected before pyplot is first imported. An explicit MPLBACKEND always
+wins.
+"""
+
+import os
+import sys
+
+
+def headless():
+    """Whether no display is available to a GUI backend."""
+    if os.getenv("AMPLHW_HEADLESS"):
+        return True
+    if sys.platform.startswith(("linux", "freebsd")):
+        return not (os.getenv("DISPLAY") or os.getenv("WAYLAND_DISPLAY"))
+    return False
+
+
+def pyplot():
+    """Returns matplotlib.pyplot, importing it on first use."""
+    if "matplotlib.pyplot" not in sys.modules and not os.getenv("MPLBACKEND") and headless():
+        import matplotlib
+
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
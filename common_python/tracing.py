@@ -0,0 +1,165 @@
+"""
+Opt-in tracing of the phases of a solve.
+
+Set AMPLHW_TRACE to a file path (or "-" for stderr) and every span is
+appended to it as one JSON line:
+
+    {"name": "solve", "start": 1760000000.12, "duration": 0.031,
+     "peak_rss_kb": 81234, "pid": 4242, "parent": null,
+     "counts": {"variables": 12, "constraints": 9}}
+
+"start" is a Unix timestamp, "duration" is in seconds and "peak_rss_kb"
+is the largest resident set size of the process so far. When
+AMPLHW_TRACE is unset, span() hands back a shared no-op span, so an
+untraced run pays for one environment lookup per span.
+
+Spans can be opened with the span() context manager or by decorating a
+function with traced(). Worker processes append to the same file; each
+span is written as a single line, so lines from different processes do
+not interleave.
+"""
+
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_kb():
+    """Peak resident set size of this process in kB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _emit(record):
+    destination = os.environ.get("AMPLHW_TRACE")
+    line = json.dumps(record, default=str) + "\n"
+    if destination == "-":
+        sys.stderr.write(line)
+    else:
+        with open(destination, "a") as f:
+            f.write(line)
+
+
+# Names of the spans open in this process, innermost last
+_open_spans = []
+
+
+class Span:
+    """A traced phase; written out when the with block exits."""
+
+    __slots__ = ("name", "counts", "start", "_t0")
+
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = counts
+
+    def count(self, **counts):
+        """Attaches entity counts that are only known inside the span."""
+        self.counts.update(counts)
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        _open_spans.append(self.name)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._t0
+        _open_spans.pop()
+        record = {
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(duration, 6),
+            "peak_rss_kb": _peak_rss_kb(),
+            "pid": os.getpid(),
+            "parent": _open_spans[-1] if _open_spans else None,
+            "counts": self.counts,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _emit(record)
+        return False
+
+
+class _NullSpan:
+    """Stand-in returned while tracing is off. It is falsy, so counts that
+    are expensive to compute can be guarded with ``if s:``."""
+
+    __slots__ = ()
+
+    def count(self, **counts):
+        pass
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled():
+    """Whether AMPLHW_TRACE is set."""
+    return bool(os.environ.get("AMPLHW_TRACE"))
+
+
+def span(name, **counts):
+    """
+    Context manager tracing the enclosed block.
+
+    Args:
+        name (str): Phase name, e.g. "read_data" or "solve".
+        **counts: Entity counts known up front (rows, arcs, bytes, ...).
+
+    Returns:
+        Span: Use ``s.count(...)`` inside the block to add more counts.
+    """
+    if not os.environ.get("AMPLHW_TRACE"):
+        return _NULL_SPAN
+    return Span(name, counts)
+
+
+def traced(name=None):
+    """
+    Decorator tracing every call of a function as one span.
+
+    Args:
+        name (str): Span name. Defaults to the function's qualified name.
+    """
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def problem_size(ampl):
+    """Variable and constraint counts of the last problem AMPL generated."""
+    return {
+        "variables": int(ampl.get_value("_nvars")),
+        "constraints": int(ampl.get_value("_ncons")),
+    }
@@ -1,7 +1,50 @@
 # problem1.py
 
 import os
-from amplpy import AMPL
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import cache_key, cached_solve, record_from_ampl
+from tracing import problem_size, span
+
+# AMPLHW_SOLVER picks another solver, e.g. highs when no Gurobi license is available
+AMPL_OPTIONS = {"solver": os.getenv("AMPLHW_SOLVER", "gurobi")}
+
+
+def _solve_record(model_file, data_file):
+    """Solves the model in a new AMPL instance and returns its SolveRecord."""
+    from amplpy import AMPL
+
+    ampl = AMPL()
+
+    # Set solver and options
+    for name, value in AMPL_OPTIONS.items():
+        ampl.option[name] = value
+
+    # Read the model and data files
+    with span("read_model", bytes=os.path.getsize(model_file)):
+        ampl.read(model_file)
+    with span("read_data", bytes=os.path.getsize(data_file)):
+        ampl.read_data(data_file)
+
+    # Solve the model
+    print("Solving model...")
+    with span("solve") as s:
+        if os.getenv("AMPLHW_OUTPUT"):
+            ampl.eval(r"solve;")
+        else:
+            ampl.solve()
+        if s:
+            s.count(**problem_size(ampl))
+    print("Solve complete.\n")
+
+    return _extract_record(ampl)
+
+
+def _extract_record(ampl):
+    """Collects the results of a solved AMPL instance into a SolveRecord."""
+    return record_from_ampl(ampl, "Cost", ["x", "Tier_Costs"])
+
 
 def run_ampl_model(model_file, data_file):
     """
@@ -12,35 +55,40 @@ def run_ampl_model(model_file, data_file):
         model_file (str): Path to the AMPL model file.
         data_file (str): Path to the AMPL data file.
     """
-    ampl = AMPL()
-
-    # Set solver and options
-    ampl.option["solver"] = "gurobi"
+    key = cache_key(model_file, data_file, options=AMPL_OPTIONS)
+    record = cached_solve(key, lambda: _solve_record(model_file, data_file))
+    with span("postprocess") as s:
+        output_lines = format_results(record)
+        s.count(lines=len(output_lines))
 
-    # Read the model and data files
-    ampl.read(model_file)
-    ampl.read_data(data_file)
+    # --- Print to console ---
+    print("--- Results ---")
+    for line in output_lines:
+        print(line)
 
-    # Solve the model
-    print("Solving model...")
+    # --- Conditionally write to file ---
     if os.getenv("AMPLHW_OUTPUT"):
-        ampl.eval(r"solve;")
-    else:
-        ampl.solve()
-    print("Solve complete.\n")
+        output_filename = "problem1.amplout"
+        with span("write_output", lines=len(output_lines)):
+            with open(output_filename, "w") as f:
+                f.write("\n".join(output_lines))
+        print(f"\nOutput also written to {output_filename}")
 
+
+def format_results(record):
+    """Builds the purchase plan breakdown from a solve record."""
     # --- Build up the detailed output ---
     output_lines = []
 
     # Get objective value
-    objective_value = ampl.get_objective('Cost').value()
+    objective_value = record.objective
     output_lines.append(f"Objective value (Total Cost): ${objective_value:,.2f}")
     output_lines.append("-" * 30)
     output_lines.append("Purchase Plan:")
 
     # Get all necessary variables and parameters as dictionaries for easy access
-    x = ampl.get_variable("x").get_values().to_dict()
-    tier_costs = ampl.get_parameter("Tier_Costs").get_values().to_dict()
+    x = record.values["x"]
+    tier_costs = record.values["Tier_Costs"]
 
     # --- Supplier A Details ---
     total_A = x.get(('A', 1), 0) + x.get(('A', 2), 0)
@@ -71,17 +119,7 @@ def run_ampl_model(model_file, data_file):
             cost = tier_costs.get(('C', 2), 0)
             output_lines.append(f"      - Purchased in Tier 2: {int(round(x[('C', 2)]))} units @ ${cost:.2f}/unit")
 
-    # --- Print to console ---
-    print("--- Results ---")
-    for line in output_lines:
-        print(line)
-
-    # --- Conditionally write to file ---
-    if os.getenv("AMPLHW_OUTPUT"):
-        output_filename = "problem1.amplout"
-        with open(output_filename, "w") as f:
-            f.write("\n".join(output_lines))
-        print(f"\nOutput also written to {output_filename}")
+    return output_lines
 
 
 if __name__ == "__main__":
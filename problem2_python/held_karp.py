@@ -0,0 +1,170 @@
+"""
+Held-Karp dynamic program for the engine sequencing problem (Problem 2).
+
+The sequence starts and ends at the dummy engine 0 and visits every real
+engine once, so it is an asymmetric travelling salesman tour. For every
+set S of engines and every engine j in S, the program keeps the shortest
+switchover time of a sequence that leaves engine 0, visits exactly S and
+ends at j:
+
+    C[S, j] = min over i in S - {j} of C[S - {j}, i] + s[i, j]
+
+The sets are processed in layers of equal size. A layer stores its sets
+as bitmasks, one cost row and one parent row per set; only two cost
+layers are alive at a time, while the parents of every layer are kept to
+rebuild the sequence. Each layer is computed with one NumPy operation per
+end engine. Time grows like n^2 2^n and memory like n 2^n, so the solver
+refuses instances whose estimated footprint exceeds a budget instead of
+running out of memory.
+
+solve_model has the signature and return value of problem2.solve_model,
+so it is a drop-in replacement that does not need AMPL:
+
+    python held_karp.py [--data problem2.dat] [--max-mb 1024]
+"""
+
+import argparse
+import os
+import sys
+from math import comb
+
+import numpy as np
+
+from instance import read_engine_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import SolveRecord
+from tracing import span
+
+DEFAULT_MAX_MB = 1024
+
+
+def memory_estimate(n):
+    """
+    Peak bytes of held_karp for n real engines: the masks, their sizes, the
+    argsort order, the layers and the position index, the parents of every
+    layer, the two widest cost layers and one candidate block.
+    """
+    widest = comb(n, n // 2)
+    return 2**n * (8 + 1 + 8 + 8 + 4) + 2**n * n + 3 * widest * n * 8
+
+
+def _layers(n):
+    """The bitmasks of every set size and the position of each mask in its layer."""
+    masks = np.arange(2**n, dtype=np.int64)
+    size = np.zeros(2**n, dtype=np.uint8)
+    for bit in range(n):
+        size += ((masks >> bit) & 1).astype(np.uint8)
+    order = np.argsort(size, kind="stable")
+    bounds = np.searchsorted(size[order], np.arange(n + 2))
+    layers = [masks[order[bounds[k] : bounds[k + 1]]] for k in range(n + 1)]
+    position = np.empty(2**n, dtype=np.int32)
+    for layer in layers:
+        position[layer] = np.arange(len(layer), dtype=np.int32)
+    return layers, position
+
+
+def held_karp(setup, max_mb=DEFAULT_MAX_MB):
+    """
+    Finds the shortest sequence 0 -> all engines -> 0.
+
+    Args:
+        setup (array): Switchover times, shape (n + 1, n + 1), index 0
+            being the dummy engine (EngineInstance.setup).
+        max_mb (float): Memory budget in MiB.
+
+    Returns:
+        tuple: (total switchover time, index sequence [0, ..., 0])
+
+    Raises:
+        ValueError: If the estimated memory exceeds the budget.
+    """
+    n = len(setup) - 1
+    if n == 0:
+        return float(setup[0, 0]), [0, 0]
+    needed = memory_estimate(n)
+    if needed > max_mb * 2**20:
+        raise ValueError(
+            f"Held-Karp on {n} engines needs about {needed / 2**20:,.0f} MiB, over the budget of {max_mb:,.0f} MiB"
+        )
+
+    inner = setup[1:, 1:]  # engine j is bit j and index j + 1
+    layers, position = _layers(n)
+    # Layer 1 holds the single-engine sets, one row each
+    cost = np.full((n, n), np.inf)
+    cost[np.arange(n), np.arange(n)] = setup[0, 1:]
+    parents = [None, np.full((n, n), -1, dtype=np.int8)]
+
+    for k in range(2, n + 1):
+        layer = layers[k]
+        new_cost = np.full((len(layer), n), np.inf)
+        new_parent = np.full((len(layer), n), -1, dtype=np.int8)
+        for j in range(n):
+            rows = np.flatnonzero((layer >> j) & 1)
+            previous = position[layer[rows] ^ (1 << j)]
+            candidates = cost[previous] + inner[:, j]
+            best = np.argmin(candidates, axis=1)
+            new_cost[rows, j] = candidates[np.arange(len(rows)), best]
+            new_parent[rows, j] = best
+        cost = new_cost
+        parents.append(new_parent)
+
+    closing = cost[0] + setup[1:, 0]
+    j = int(np.argmin(closing))
+    total = float(closing[j])
+
+    sequence = []
+    mask = (1 << n) - 1
+    for k in range(n, 0, -1):
+        sequence.append(j + 1)
+        i = int(parents[k][position[mask], j])
+        mask ^= 1 << j
+        j = i
+    return total, [0] + sequence[::-1] + [0]
+
+
+def solve_model(model_file, data_file, max_mb=DEFAULT_MAX_MB):
+    """
+    Solves the engine sequencing instance exactly with held_karp.
+
+    Args:
+        model_file (str): Accepted for compatibility with
+            problem2.solve_model; the program only needs the data.
+        data_file (str): Path to the AMPL data file.
+        max_mb (float): Memory budget in MiB.
+
+    Returns:
+        tuple: A tuple containing the SolveRecord, the optimal sequence list,
+               and the list of output lines for display.
+    """
+    from problem2 import sequence_from_record
+
+    instance = read_engine_data(data_file)
+    with span("solve", engines=instance.size):
+        setup, indices = held_karp(instance.setup, max_mb)
+    s, p, t = instance.to_dicts()
+    sequence = instance.to_labels(indices)
+    record = SolveRecord(
+        status="solved",
+        objective=setup + float(instance.processing.sum()),
+        values={"v": {engine: k for k, engine in enumerate(sequence[:-1], 1)}, "s": s, "p": p, "t": t},
+    )
+    optimal_sequence, output_lines = sequence_from_record(record)
+    return record, optimal_sequence, output_lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Held-Karp solver for the Problem 2 engine sequence")
+    parser.add_argument("--data", default="problem2.dat")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB, help="memory budget in MiB (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        record, optimal_sequence, output = solve_model("problem2.mod", args.data, args.max_mb)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print("--- Results ---")
+    for line in output:
+        print(line)
@@ -0,0 +1,177 @@
+"""
+Dense arrays for the engine sequencing data (Problem 2).
+
+problem2.py keeps the instance as the dicts s, p and t read off a solve
+record. The heuristics and exact solvers work on NumPy arrays instead:
+engines are renumbered by position, with the dummy engine 0 always at
+index 0, so a sequence [0, e1, ..., en, 0] becomes an index array and the
+switchover time of a step is a single lookup setup[u, v].
+
+An instance can be built from the dicts (EngineInstance.from_dicts, or
+from_record for a SolveRecord) or read directly from a problem2.dat style
+file without AMPL (read_engine_data).
+
+evaluate_schedules scores a whole batch of sequences at once: the
+switchover and processing times of every step are gathered with one
+fancy index each, and the segment start times are a cumulative sum, so no
+Python code runs per engine. problem2.calculate_schedule_metrics is a
+wrapper around the same computation for a single sequence.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+
+@dataclass
+class EngineInstance:
+    engines: List[int]  # engine labels by index, engines[0] is the dummy engine 0
+    setup: np.ndarray  # switchover times, shape (n + 1, n + 1)
+    processing: np.ndarray  # processing times, shape (n + 1,)
+    types: List[str]  # engine types by index
+
+    @property
+    def size(self):
+        """Number of real engines, without the dummy engine."""
+        return len(self.engines) - 1
+
+    @classmethod
+    def from_dicts(cls, s, p, t):
+        """
+        Builds the arrays from the s, p and t dicts of problem2.extract_data.
+
+        Args:
+            s (dict): (i, j) -> switchover time from engine i to engine j.
+            p (dict): Engine -> processing time.
+            t (dict): Engine -> type.
+        """
+        engines = [0] + sorted(int(e) for e in p if int(e) != 0)
+        index = {e: k for k, e in enumerate(engines)}
+        setup = np.zeros((len(engines), len(engines)))
+        for (i, j), value in s.items():
+            setup[index[int(i)], index[int(j)]] = value
+        processing = np.array([p[e] for e in engines], dtype=float)
+        types = [t.get(e, "None") for e in engines]
+        return cls(engines, setup, processing, types)
+
+    @classmethod
+    def from_record(cls, record):
+        """Builds the arrays from a problem2 SolveRecord."""
+        return cls.from_dicts(record.values["s"], record.values["p"], record.values["t"])
+
+    def to_dicts(self):
+        """The instance as the (s, p, t) dicts used by problem2.py."""
+        s = {(i, j): self.setup[a, b].item() for a, i in enumerate(self.engines) for b, j in enumerate(self.engines)}
+        p = {e: self.processing[a].item() for a, e in enumerate(self.engines)}
+        t = dict(zip(self.engines, self.types))
+        return s, p, t
+
+    def to_indices(self, sequence):
+        """Engine labels -> index array."""
+        index = {e: k for k, e in enumerate(self.engines)}
+        return np.array([index[int(e)] for e in sequence], dtype=np.intp)
+
+    def to_labels(self, indices):
+        """Index array -> list of engine labels, as problem2.py expects."""
+        return [self.engines[k] for k in indices]
+
+    def setup_time(self, indices):
+        """Total switchover time of an index sequence."""
+        indices = np.asarray(indices)
+        return float(self.setup[indices[:-1], indices[1:]].sum())
+
+
+def read_engine_data(data_file):
+    """
+    Reads problem2.dat style data: the square param s table and the p and
+    t lists.
+
+    Returns:
+        EngineInstance: The instance.
+    """
+    with open(data_file) as f:
+        text = re.sub(r"#.*", "", f.read())
+
+    match = re.search(r"param\s+s\s*:(.*?):=(.*?);", text, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No param s table found in {data_file}")
+    columns = [int(c) for c in match.group(1).split()]
+    tokens = match.group(2).split()
+    width = len(columns) + 1
+    s = {}
+    for k in range(0, len(tokens), width):
+        i = int(tokens[k])
+        for j, value in zip(columns, tokens[k + 1 : k + width]):
+            s[i, j] = float(value)
+
+    lists = {}
+    for name in ("p", "t"):
+        body = re.search(rf"param\s+{name}\s*:=(.*?);", text, re.DOTALL)
+        if body is None:
+            raise ValueError(f"No param {name} found in {data_file}")
+        tokens = body.group(1).split()
+        lists[name] = dict(zip((int(e) for e in tokens[0::2]), tokens[1::2]))
+    p = {e: float(v) for e, v in lists["p"].items()}
+    return EngineInstance.from_dicts(s, p, lists["t"])
+
+
+@dataclass
+class ScheduleBatch:
+    setup: np.ndarray  # total switchover time per sequence, shape (batch,)
+    makespan: np.ndarray  # completion time of the last engine, shape (batch,)
+    # Segments, when requested: every step contributes a switchover segment
+    # (even columns) then a processing segment (odd columns), including the
+    # zero-length ones. Shape (batch, 2 * steps).
+    start: Optional[np.ndarray] = None
+    duration: Optional[np.ndarray] = None
+
+
+def schedule_from_steps(setup_steps, run_steps, segments=False):
+    """
+    Builds the schedules from the switchover and processing time of every
+    step.
+
+    Args:
+        setup_steps (array): Switchover time of step k of each sequence,
+            shape (batch, steps).
+        run_steps (array): Processing time of the engine reached by step k,
+            shape (batch, steps).
+        segments (bool): Also return the segment start times and durations.
+
+    Returns:
+        ScheduleBatch: Totals per sequence, and the segments if requested.
+    """
+    setup_steps, run_steps = np.asarray(setup_steps), np.asarray(run_steps)
+    total_setup = setup_steps.sum(axis=1)
+    batch = ScheduleBatch(total_setup, total_setup + run_steps.sum(axis=1))
+    if segments:
+        duration = np.stack([setup_steps, run_steps], axis=2).reshape(len(setup_steps), -1)
+        start = np.zeros_like(duration)
+        start[:, 1:] = np.cumsum(duration, axis=1)[:, :-1]
+        batch.start, batch.duration = start, duration
+    return batch
+
+
+def evaluate_schedules(sequences, setup, processing, segments=False):
+    """
+    Scores many sequences at once.
+
+    Args:
+        sequences (array): Index sequences, one per row, usually starting
+            and ending with 0, shape (batch, length).
+        setup (array): Switchover times, shape (n + 1, n + 1).
+        processing (array): Processing times, shape (n + 1,).
+        segments (bool): Also return the segment start times and durations;
+            segment 2k and 2k + 1 belong to engine sequences[:, k + 1].
+
+    Returns:
+        ScheduleBatch: Total switchover time and makespan per sequence.
+    """
+    sequences = np.atleast_2d(sequences)
+    return schedule_from_steps(
+        setup[sequences[:, :-1], sequences[:, 1:]],
+        processing[sequences[:, 1:]],
+        segments,
+    )
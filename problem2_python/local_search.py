@@ -0,0 +1,239 @@
+"""
+Local search for the engine sequencing problem (Problem 2).
+
+The MTZ model in problem2.mod stops being solvable beyond a few dozen
+engines. This module improves a starting sequence, by default the greedy
+one of problem2.get_greedy_sequence, with three moves on the asymmetric
+switchover matrix:
+
+- 2-opt: reverse the engines at positions i..j. Reversing flips the
+  direction of every switchover inside the segment, so the delta needs the
+  forward and backward cost of the segment; both come from prefix sums of
+  the current sequence in O(1).
+- Relocate: move one engine to another position.
+- Or-opt: move a block of 2 or 3 consecutive engines to another position,
+  in its own or in reversed order.
+
+The delta of every move of a kind is evaluated at once as a NumPy array
+and the best improving move is applied (variable neighbourhood descent:
+after an improvement the search restarts from 2-opt). The search stops at
+a local optimum or when the time budget runs out. The dummy engine 0 stays
+at both ends, so the result is a sequence that calculate_schedule_metrics
+and plot_gantt accept unchanged.
+
+    python local_search.py [--data problem2.dat] [--time-limit 1] [--mip]
+
+prints the greedy and the improved schedule, and with --mip the gap to the
+optimal objective of problem2.mod.
+"""
+
+import argparse
+import random
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from instance import EngineInstance, read_engine_data
+
+MOVES = ("2-opt", "relocate", "or-opt")
+
+
+@dataclass
+class LocalSearchResult:
+    sequence: list  # engine labels, starting and ending with 0
+    start_setup: float
+    setup: float
+    objective: float  # setup plus processing, the Time objective of problem2.mod
+    moves: dict = field(default_factory=dict)  # move -> times applied
+    seconds: float = 0.0
+    time_limit_reached: bool = False
+
+
+def _prefix_costs(setup, tour):
+    """Forward and backward switchover prefix sums of a tour."""
+    forward = np.concatenate([[0.0], np.cumsum(setup[tour[:-1], tour[1:]])])
+    backward = np.concatenate([[0.0], np.cumsum(setup[tour[1:], tour[:-1]])])
+    return forward, backward
+
+
+def best_two_opt(setup, tour, forward, backward):
+    """
+    The best 2-opt move: reversing tour[i..j] for 1 <= i < j <= n.
+
+    Returns:
+        tuple: (delta, i, j), delta >= 0 when no move improves.
+    """
+    n = len(tour) - 2
+    if n < 2:
+        return 0.0, 0, 0
+    pos = np.arange(1, n + 1)
+    i, j = pos[:, None], pos[None, :]
+    a, b, c, d = tour[i - 1], tour[i], tour[j], tour[j + 1]
+    delta = (
+        setup[a, c] + setup[b, d] - setup[a, b] - setup[c, d]
+        + (backward[j] - backward[i]) - (forward[j] - forward[i])
+    )
+    delta = np.where(j > i, delta, np.inf)
+    k = np.argmin(delta)
+    return float(delta.flat[k]), int(pos[k // n]), int(pos[k % n])
+
+
+def best_segment_move(setup, tour, forward, backward, length):
+    """
+    The best move of a block tour[i..i+length-1] to between tour[k] and
+    tour[k+1], in its own or in reversed order.
+
+    Returns:
+        tuple: (delta, i, k, reverse), delta >= 0 when no move improves.
+    """
+    n = len(tour) - 2
+    if n <= length:
+        return 0.0, 0, 0, False
+    i = np.arange(1, n - length + 2)[:, None]
+    k = np.arange(0, n + 1)[None, :]
+    a, first, last, b = tour[i - 1], tour[i], tour[i + length - 1], tour[i + length]
+    c, d = tour[k], tour[k + 1]
+    removed = setup[a, first] + setup[last, b] - setup[a, b]
+    inserted = setup[c, first] + setup[last, d] - setup[c, d]
+    valid = (k < i - 1) | (k >= i + length)
+    delta = np.where(valid, inserted - removed, np.inf)
+
+    reverse = False
+    if length > 1:
+        inside = (backward[i + length - 1] - backward[i]) - (forward[i + length - 1] - forward[i])
+        flipped = np.where(valid, setup[c, last] + setup[first, d] - setup[c, d] + inside - removed, np.inf)
+        if flipped.min() < delta.min():
+            delta, reverse = flipped, True
+    best = np.argmin(delta)
+    row, col = divmod(int(best), delta.shape[1])
+    return float(delta.flat[best]), int(i[row, 0]), int(k[0, col]), reverse
+
+
+def _move_segment(tour, i, length, k, reverse):
+    block = tour[i : i + length]
+    if reverse:
+        block = block[::-1]
+    rest = np.concatenate([tour[:i], tour[i + length :]])
+    # Positions after the block shift left once it is taken out
+    at = k + 1 if k < i else k + 1 - length
+    return np.concatenate([rest[:at], block, rest[at:]])
+
+
+def improve(instance, start, time_limit=1.0, max_block=3, tol=1e-9):
+    """
+    Runs the local search from an index sequence.
+
+    Args:
+        instance (EngineInstance): The instance.
+        start (array): Index sequence starting and ending with 0.
+        time_limit (float): Budget in seconds.
+        max_block (int): Longest block moved by Or-opt.
+        tol (float): Smallest improvement that counts.
+
+    Returns:
+        tuple: (index sequence, moves applied per kind, time limit reached)
+    """
+    setup = instance.setup
+    tour = np.asarray(start, dtype=np.intp)
+    moves = dict.fromkeys(MOVES, 0)
+    deadline = time.perf_counter() + time_limit
+    while True:
+        if time.perf_counter() > deadline:
+            return tour, moves, True
+        forward, backward = _prefix_costs(setup, tour)
+
+        delta, i, j = best_two_opt(setup, tour, forward, backward)
+        if delta < -tol:
+            tour = np.concatenate([tour[:i], tour[i : j + 1][::-1], tour[j + 1 :]])
+            moves["2-opt"] += 1
+            continue
+
+        for length in range(1, max_block + 1):
+            delta, i, k, reverse = best_segment_move(setup, tour, forward, backward, length)
+            if delta < -tol:
+                tour = _move_segment(tour, i, length, k, reverse)
+                moves["relocate" if length == 1 else "or-opt"] += 1
+                break
+        else:
+            return tour, moves, False
+
+
+def local_search(s, p, t, nodes, start=None, time_limit=1.0, max_block=3):
+    """
+    Improves an engine sequence with 2-opt, relocate and Or-opt moves.
+
+    Args:
+        s, p, t (dict): The instance, as returned by problem2.extract_data.
+        nodes (list): The real engines.
+        start (list, optional): Starting sequence [0, ..., 0]. Defaults to
+            problem2.get_greedy_sequence.
+        time_limit (float): Budget in seconds.
+        max_block (int): Longest block moved by Or-opt.
+
+    Returns:
+        LocalSearchResult: The improved sequence and its costs.
+    """
+    if start is None:
+        from problem2 import get_greedy_sequence
+
+        start = get_greedy_sequence(nodes, s)
+    return search_instance(EngineInstance.from_dicts(s, p, t), start, time_limit, max_block)
+
+
+def search_instance(instance, start, time_limit=1.0, max_block=3):
+    """local_search on an EngineInstance; start is a sequence of engine labels."""
+    t0 = time.perf_counter()
+    indices = instance.to_indices(start)
+    tour, moves, limit = improve(instance, indices, time_limit, max_block)
+    setup = instance.setup_time(tour)
+    return LocalSearchResult(
+        sequence=instance.to_labels(tour),
+        start_setup=instance.setup_time(indices),
+        setup=setup,
+        objective=setup + float(instance.processing[tour[1:]].sum()),
+        moves=moves,
+        seconds=time.perf_counter() - t0,
+        time_limit_reached=limit,
+    )
+
+
+def format_result(result, mip_objective=None):
+    """Builds the summary lines of a local search run."""
+    lines = [
+        f"Greedy setup time: {result.start_setup:,.2f}",
+        f"Local search setup time: {result.setup:,.2f}",
+        f"Objective value (Total Time): {result.objective:,.2f}",
+        "Moves applied: " + ", ".join(f"{m} {n}" for m, n in result.moves.items()),
+        f"Search time: {result.seconds:.3f} s" + (" (time limit reached)" if result.time_limit_reached else ""),
+        "Sequence: " + " -> ".join(map(str, result.sequence)),
+    ]
+    if mip_objective is not None:
+        gap = (result.objective - mip_objective) / mip_objective if mip_objective else 0.0
+        lines.append(f"MIP objective: {mip_objective:,.2f}, gap: {gap:.2%}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local search for the Problem 2 engine sequence")
+    parser.add_argument("--data", default="problem2.dat")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="search budget in seconds (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the greedy tie-breaks")
+    parser.add_argument("--mip", action="store_true", help="also solve problem2.mod and report the gap")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    instance = read_engine_data(args.data)
+    s, p, t = instance.to_dicts()
+    result = local_search(s, p, t, instance.engines[1:], time_limit=args.time_limit)
+
+    mip_objective = None
+    if args.mip:
+        from problem2 import solve_model
+
+        record, _, _ = solve_model("problem2.mod", args.data)
+        mip_objective = record.objective
+
+    print(f"--- Local search on {args.data} ({instance.size} engines) ---")
+    for line in format_result(result, mip_objective):
+        print(line)
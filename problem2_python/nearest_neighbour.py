@@ -0,0 +1,135 @@
+"""
+Multi-start nearest-neighbour heuristic for engine sequencing (Problem 2).
+
+problem2.get_greedy_sequence builds one sequence: from engine 0 it always
+moves to the unvisited engine with the shortest switchover, breaking ties
+with random.choice. This module runs many such constructions at once. A
+run is fixed by the first engine after engine 0 and by a seeded tie-break
+order, and all runs advance together. Each step is one argmin over the
+switchover rows of the current engines plus a penalty array: visited
+engines are penalised with inf, the others with a seeded random key
+scaled below half the smallest gap between distinct switchover times. The
+key only reorders tied engines. The first tie-break of every start has
+zero keys and takes the lowest index, like a deterministic greedy.
+
+A step costs O(runs * n), so a full pass is O(runs * n^2). The run count
+is capped so that this work stays under MAX_WORK, which keeps 2,000-engine
+instances well under a second. When the cap is below the number of start
+engines, the starts are sampled with the same seed.
+
+    python nearest_neighbour.py [--data problem2.dat] [--tie-breaks 8] [--seed 0]
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+from instance import EngineInstance, read_engine_data
+
+# Cap on runs * n^2, the element operations of one batch of constructions
+MAX_WORK = 2e8
+
+
+@dataclass
+class NearestNeighbourResult:
+    sequence: np.ndarray  # best index sequence [0, ..., 0]
+    setup: float  # its total switchover time
+    costs: np.ndarray  # total switchover time of every run
+    starts: np.ndarray  # first engine of every run
+
+
+def nearest_neighbour(setup, tie_breaks=8, seed=0, max_runs=None):
+    """
+    Runs the nearest-neighbour construction from every start engine and
+    several tie-break orders in parallel.
+
+    Args:
+        setup (array): Switchover times, shape (n + 1, n + 1), index 0
+            being the dummy engine.
+        tie_breaks (int): Tie-break orders per start engine.
+        seed (int): Seed of the tie-break keys and of the start sample.
+        max_runs (int, optional): Run limit. Defaults to the largest count
+            within MAX_WORK.
+
+    Returns:
+        NearestNeighbourResult: The best sequence and the cost of every run.
+    """
+    n = len(setup) - 1
+    if n == 0:
+        return NearestNeighbourResult(np.zeros(2, dtype=np.intp), float(setup[0, 0]), np.zeros(1), np.zeros(1, dtype=np.intp))
+    rng = np.random.default_rng(seed)
+    if max_runs is None:
+        max_runs = max(1, int(MAX_WORK // (n * n)))
+    starts = np.arange(1, n + 1)
+    if len(starts) > max_runs:
+        starts = np.sort(rng.choice(starts, max_runs, replace=False))
+    tie_breaks = max(1, min(tie_breaks, max_runs // len(starts)))
+    runs = len(starts) * tie_breaks
+
+    run_starts = np.repeat(starts, tie_breaks)
+    gaps = np.diff(np.unique(setup))
+    scale = gaps.min() / 2 if len(gaps) else 1.0
+    penalty = rng.random((runs, n + 1)) * scale
+    penalty[::tie_breaks] = 0.0
+
+    rows = np.arange(runs)
+    tours = np.zeros((runs, n + 2), dtype=np.intp)
+    tours[:, 1] = run_starts
+    penalty[:, 0] = np.inf
+    penalty[rows, run_starts] = np.inf
+    for step in range(2, n + 1):
+        nxt = np.argmin(setup[tours[:, step - 1]] + penalty, axis=1)
+        tours[:, step] = nxt
+        penalty[rows, nxt] = np.inf
+
+    costs = setup[tours[:, :-1], tours[:, 1:]].sum(axis=1)
+    k = int(np.argmin(costs))
+    return NearestNeighbourResult(tours[k], float(costs[k]), costs, run_starts)
+
+
+def nearest_neighbour_sequence(nodes, s, tie_breaks=8, seed=0, max_runs=None):
+    """
+    nearest_neighbour on the dicts of problem2.py, as a reproducible
+    replacement for get_greedy_sequence.
+
+    Args:
+        nodes (list): The real engines.
+        s (dict): (i, j) -> switchover time.
+
+    Returns:
+        tuple: The best sequence of engine labels [0, ..., 0] and the
+               NearestNeighbourResult.
+    """
+    instance = EngineInstance.from_dicts(s, {e: 0 for e in [0] + list(nodes)}, {})
+    result = nearest_neighbour(instance.setup, tie_breaks, seed, max_runs)
+    return instance.to_labels(result.sequence), result
+
+
+def format_distribution(result):
+    """Summary lines of the run costs."""
+    costs = result.costs
+    q = np.percentile(costs, [0, 10, 50, 90, 100])
+    return [
+        f"Runs: {len(costs)} ({len(np.unique(result.starts))} start engines)",
+        f"Best setup time: {result.setup:,.2f}",
+        f"Setup time percentiles: min {q[0]:,.2f}, p10 {q[1]:,.2f}, median {q[2]:,.2f}, p90 {q[3]:,.2f}, max {q[4]:,.2f}",
+        f"Mean {costs.mean():,.2f}, std {costs.std():,.2f}, distinct values {len(np.unique(costs))}",
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-start nearest neighbour for the Problem 2 engine sequence")
+    parser.add_argument("--data", default="problem2.dat")
+    parser.add_argument("--tie-breaks", type=int, default=8, help="tie-break orders per start engine (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-runs", type=int, help="run limit (default: as many as fit in MAX_WORK)")
+    args = parser.parse_args()
+
+    instance = read_engine_data(args.data)
+    result = nearest_neighbour(instance.setup, args.tie_breaks, args.seed, args.max_runs)
+
+    print(f"--- Nearest neighbour on {args.data} ({instance.size} engines) ---")
+    for line in format_distribution(result):
+        print(line)
+    print("Best sequence: " + " -> ".join(map(str, instance.to_labels(result.sequence))))
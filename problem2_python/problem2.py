@@ -2,42 +2,175 @@
 
 import os
 import random
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from amplpy import AMPL
+import sys
+import time
+from dataclasses import dataclass
+import numpy as np
+
+from instance import schedule_from_steps
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import cache_key, cached_solve, record_from_ampl
+from plotting import pyplot
+from tracing import problem_size, span, traced
 
 # UF Style Guide Colors
 UF_ORANGE = "#FA4616"
 UF_BLUE = "#0021A5"
 SETUP_COLOR = "#B0B0B0"  # Neutral Gray for setup
 
-def solve_model(model_file, data_file):
+# AMPLHW_SOLVER picks another solver, e.g. highs when no Gurobi license is available
+AMPL_OPTIONS = {"solver": os.getenv("AMPLHW_SOLVER", "gurobi")}
+
+# Gantt charts
+GANTT_DETAIL_ENGINES = 60  # plot_gantt hands larger schedules to render_gantt
+GANTT_ROWS_PER_PAGE = 60  # engine rows per page of a page-split PDF
+GANTT_MAX_LABELS = 400  # duration labels per figure or page at most
+RASTER_FORMATS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp")
+
+# Seed of the greedy tie-breaks, so the greedy chart is reproducible
+GREEDY_SEED = 0
+
+# AMPLHW_SUBTOURS=dfj replaces the MTZ constraints with subtour cuts added
+# as they are violated (see solve_with_subtour_cuts)
+SUBTOUR_MODES = ("mtz", "dfj")
+
+# Dantzig-Fulkerson-Johnson cuts: at most |S|-1 switchovers inside any
+# engine set S. CUT[k] is the k-th set cut off so far.
+DFJ_DECLARATIONS = r"""
+param n_cuts integer >= 0 default 0;
+set CUT {1..n_cuts} within E;
+subject to subtour_cut {k in 1..n_cuts}:
+    sum {i in CUT[k], j in CUT[k]} x[i,j] <= card(CUT[k]) - 1;
+"""
+
+@dataclass
+class SubtourRound:
+    subtours: int  # cycles in the solution of the round
+    cuts: int  # cuts added after the round
+    seconds: float
+
+def _solve(ampl):
+    """Solves the current model, tracing the solve."""
+    with span("solve") as s:
+        if os.getenv("AMPLHW_OUTPUT"):
+            ampl.eval(r"solve;")
+        else:
+            ampl.solve()
+        if s:
+            s.count(**problem_size(ampl))
+
+def find_subtours(successor):
+    """Splits a successor map into its cycles, the one through engine 0 first."""
+    cycles, seen = [], set()
+    for start in sorted(successor):
+        if start in seen:
+            continue
+        cycle, node = [], start
+        while node not in seen:
+            seen.add(node)
+            cycle.append(node)
+            node = successor[node]
+        cycles.append(cycle)
+    return cycles
+
+def solve_with_subtour_cuts(ampl, max_rounds=100):
     """
-    Runs the engine production AMPL model and returns the solved object
-    and processed results.
+    Solves problem2.mod without its MTZ constraints, adding a DFJ cut for
+    every subtour of the solution and solving again in the same session
+    until the switchovers form a single sequence.
 
     Args:
-        model_file (str): Path to the AMPL model file.
-        data_file (str): Path to the AMPL data file.
+        ampl (AMPL): Instance with problem2.mod and its data read.
+        max_rounds (int): Solve limit.
 
     Returns:
-        tuple: A tuple containing the solved AMPL object, the optimal sequence list,
-               and the list of output lines for display.
+        tuple: The list of SubtourRound and the tour [0, ..., 0], or None
+               if a solve failed or the round limit was reached.
     """
+    ampl.eval("drop no_sub_tours;")
+    ampl.eval(DFJ_DECLARATIONS)
+    rounds = []
+    n_cuts = 0
+    for _ in range(max_rounds):
+        t0 = time.perf_counter()
+        _solve(ampl)
+        if ampl.get_value("solve_result") != "solved":
+            return rounds, None
+        x = ampl.get_variable("x").get_values().to_dict()
+        successor = {int(i): int(j) for (i, j), value in x.items() if value > 0.5}
+        cycles = find_subtours(successor)
+        if len(cycles) > 1:
+            for cycle in cycles:
+                n_cuts += 1
+                members = ", ".join(map(str, cycle))
+                ampl.eval(f"let n_cuts := {n_cuts}; let CUT[{n_cuts}] := {{{members}}};")
+        rounds.append(SubtourRound(len(cycles), len(cycles) if len(cycles) > 1 else 0, time.perf_counter() - t0))
+        print(f"Round {len(rounds)}: {len(cycles)} subtour(s), {n_cuts} cuts in total, {rounds[-1].seconds:.2f} s")
+        if len(cycles) == 1:
+            return rounds, cycles[0] + [0]
+    return rounds, None
+
+def _solve_record(model_file, data_file, subtours="mtz"):
+    """Solves the model in a new AMPL instance and returns its SolveRecord."""
+    from amplpy import AMPL
+
     ampl = AMPL()
-    ampl.option["solver"] = "gurobi"
-    ampl.read(model_file)
-    ampl.read_data(data_file)
+    for name, value in AMPL_OPTIONS.items():
+        ampl.option[name] = value
+    with span("read_model", bytes=os.path.getsize(model_file)):
+        ampl.read(model_file)
+    with span("read_data", bytes=os.path.getsize(data_file)):
+        ampl.read_data(data_file)
 
     print("Solving model...")
-    if os.getenv("AMPLHW_OUTPUT"):
-        ampl.eval(r"solve;")
+    if subtours == "dfj":
+        rounds, tour = solve_with_subtour_cuts(ampl)
+        if tour is None:
+            raise RuntimeError(f"No single sequence after {len(rounds)} subtour rounds")
+        record = _extract_record(ampl)
+        # v is unconstrained without the MTZ rows, so the order comes from x
+        record.values["v"] = {engine: k for k, engine in enumerate(tour[:-1], 1)}
     else:
-        ampl.solve()
+        _solve(ampl)
+        record = _extract_record(ampl)
     print("Solve complete.\n")
+    return record
+
+def _extract_record(ampl):
+    """Collects the results of a solved AMPL instance into a SolveRecord."""
+    # The instance data is kept with the solution for the Gantt charts
+    return record_from_ampl(ampl, "Time", ["v", "s", "p", "t"])
+
+def solve_model(model_file, data_file, subtours="mtz"):
+    """
+    Runs the engine production AMPL model and returns the solve record
+    and processed results.
+
+    Args:
+        model_file (str): Path to the AMPL model file.
+        data_file (str): Path to the AMPL data file.
+        subtours (str): "mtz" solves the model as written, "dfj" replaces
+            its MTZ constraints with iterative subtour cuts.
 
-    objective_value = ampl.get_objective('Time').value()
-    visit_order = ampl.get_variable("v").get_values().to_dict()
+    Returns:
+        tuple: A tuple containing the SolveRecord, the optimal sequence list,
+               and the list of output lines for display.
+    """
+    if subtours not in SUBTOUR_MODES:
+        raise ValueError(f"Unknown subtour mode {subtours}; expected one of {', '.join(SUBTOUR_MODES)}")
+    options = AMPL_OPTIONS if subtours == "mtz" else {**AMPL_OPTIONS, "subtours": subtours}
+    key = cache_key(model_file, data_file, options=options)
+    record = cached_solve(key, lambda: _solve_record(model_file, data_file, subtours))
+    with span("postprocess") as s:
+        optimal_sequence, output_lines = sequence_from_record(record)
+        s.count(engines=len(optimal_sequence) - 2)
+    return record, optimal_sequence, output_lines
+
+def sequence_from_record(record):
+    """Reads the optimal sequence off the visit order of a solve record."""
+    objective_value = record.objective
+    visit_order = record.values["v"]
 
     # Determine the optimal sequence
     sorted_engines = sorted(
@@ -52,19 +185,27 @@ def solve_model(model_file, data_file):
     output_lines.append("-" * 30)
     seq_str = " -> ".join(map(str, optimal_sequence))
     output_lines.append(f"Optimal Production Sequence: {seq_str}")
-    return ampl, optimal_sequence, output_lines
+    return optimal_sequence, output_lines
 
-def extract_data(ampl):
-    """Extracts parameters s, p, t and node list from AMPL object."""
-    s = ampl.get_parameter('s').get_values().to_dict()
-    p = ampl.get_parameter('p').get_values().to_dict()
-    t = ampl.get_parameter('t').get_values().to_dict()
+def extract_data(record):
+    """Extracts parameters s, p, t and node list from a solve record."""
+    s = record.values['s']
+    p = record.values['p']
+    t = record.values['t']
     # Nodes are keys in p, excluding 0 (dummy)
     nodes = [int(i) for i in p.keys() if int(i) != 0]
     return s, p, t, nodes
 
-def get_greedy_sequence(nodes, s):
-    """Generates a sequence using a greedy algorithm based on shortest setup time."""
+def get_greedy_sequence(nodes, s, rng=random):
+    """
+    Generates a sequence using a greedy algorithm based on shortest setup time.
+
+    Args:
+        nodes (list): The real engines.
+        s (dict): (i, j) -> switchover time.
+        rng (random.Random, optional): Source of the tie-breaks; pass a
+            seeded random.Random for a reproducible sequence.
+    """
     unvisited = set(nodes)
     current = 0
     sequence = [0]
@@ -86,7 +227,7 @@ def get_greedy_sequence(nodes, s):
         if not candidates:
             break # Should not happen given connected graph logic
 
-        next_node = random.choice(candidates)
+        next_node = rng.choice(sorted(candidates))
         sequence.append(next_node)
         unvisited.remove(next_node)
         current = next_node
@@ -104,34 +245,32 @@ def get_comm_mil_sequence(nodes, t):
 
 def calculate_schedule_metrics(sequence, s, p):
     """Calculates total setup time and segments for plotting."""
-    total_setup = 0
-    current_time = 0
-    segments = [] # list of (start, duration, type ('setup' or 'run'), engine_id)
-
-    for i in range(len(sequence) - 1):
-        u, v = sequence[i], sequence[i+1]
-
-        # Setup
-        setup_time = s.get((u, v), 0)
-        if setup_time > 0:
-            segments.append((current_time, setup_time, 'setup', v))
-            total_setup += setup_time
-            current_time += setup_time
-
-        # Processing (only if not returning to 0, usually 0 has p=0 anyway)
-        proc_time = p.get(v, 0)
-        if proc_time > 0:
-            segments.append((current_time, proc_time, 'run', v))
-            current_time += proc_time
-
-    return total_setup, current_time, segments
+    steps = list(zip(sequence[:-1], sequence[1:]))
+    batch = schedule_from_steps(
+        np.array([[s.get(step, 0) for step in steps]]),
+        np.array([[p.get(v, 0) for _, v in steps]]),
+        segments=True,
+    )
+    # list of (start, duration, type ('setup' or 'run'), engine_id); zero
+    # length segments are left out
+    segments = [
+        (start, duration, "setup" if k % 2 == 0 else "run", steps[k // 2][1])
+        for k, (start, duration) in enumerate(zip(batch.start[0].tolist(), batch.duration[0].tolist()))
+        if duration > 0
+    ]
+    return batch.setup[0].item(), batch.makespan[0].item(), segments
 
 def plot_gantt(sequence, s, p, t, filename, title):
     """Generates and saves a Gantt chart with each engine on its own line."""
-    total_setup, total_time, segments = calculate_schedule_metrics(sequence, s, p)
-
     # Identify all engines involved (excluding 0)
     engines = sorted([n for n in t.keys() if n != 0])
+    if len(engines) > GANTT_DETAIL_ENGINES:
+        return render_gantt(sequence, s, p, t, filename, title)
+
+    import matplotlib.patches as mpatches
+
+    plt = pyplot()
+    total_setup, total_time, segments = calculate_schedule_metrics(sequence, s, p)
 
     # Create figure with dynamic height based on number of engines
     # Height: header + (rows * height_per_row)
@@ -200,16 +339,143 @@ def plot_gantt(sequence, s, p, t, filename, title):
     ax.legend(handles=patches, loc='upper right')
 
     plt.tight_layout()
-    plt.savefig(filename)
+    # Larger charts are traced by render_gantt
+    with span("write_output", engines=len(engines)):
+        plt.savefig(filename)
     plt.close()
     print(f"Generated chart: {filename}")
 
+def _gantt_figure(start, duration, row, color, engines, total_setup, x_max, title, max_labels):
+    """Draws one figure of a Gantt chart, one PolyCollection per colour."""
+    import matplotlib.patches as mpatches
+    from matplotlib.collections import PolyCollection
+
+    plt = pyplot()
+
+    n_rows = len(engines)
+    detailed = n_rows <= GANTT_DETAIL_ENGINES
+    fig_height = float(np.clip(n_rows * 0.8 + 2, 4, 40))
+    fig, ax = plt.subplots(figsize=(12, fig_height))
+
+    x0, x1 = start, start + duration
+    y0, y1 = row - 0.3, row + 0.3
+    verts = np.stack([np.column_stack(c) for c in ((x0, y0), (x0, y1), (x1, y1), (x1, y0))], axis=1)
+    for c in np.unique(color):
+        ax.add_collection(PolyCollection(
+            verts[color == c], facecolors=c, edgecolors="black", linewidths=0.5 if detailed else 0,
+        ))
+
+    # A label is drawn only if its text fits inside the bar and the row is
+    # tall enough for it; the longest bars win when there are too many
+    bar_points = duration / x_max * 0.88 * 12 * 72
+    row_points = (1 - 2 / fig_height) * fig_height * 72 / max(n_rows, 1)
+    is_setup = color == SETUP_COLOR
+    text = [f"{int(d)}" for d in duration]
+    fits = np.array([len(v) for v in text]) * 6 + 4 <= bar_points
+    fits &= np.where(is_setup, duration >= 1, duration >= 2) & (row_points >= 10)
+    shown = np.flatnonzero(fits)
+    shown = shown[np.argsort(-duration[shown], kind="stable")[:max_labels]]
+    for k in shown.tolist():
+        if is_setup[k]:
+            ax.text(start[k] + duration[k] / 2, row[k], text[k], ha='center', va='center', color='black', fontsize=8)
+        else:
+            ax.text(start[k] + duration[k] / 2, row[k], text[k],
+                    ha='center', va='center', color='white', fontsize=9, fontweight='bold')
+
+    ax.grid(True, axis='x', linestyle='--', linewidth=0.5, alpha=0.5)
+    if n_rows <= 2 * GANTT_DETAIL_ENGINES:
+        ax.set_yticks(range(n_rows))
+        ax.set_yticklabels([f"Engine {e}" for e in engines])
+    else:
+        ax.set_yticks([])
+        ax.set_ylabel(f"Engines {engines[0]} to {engines[-1]}")
+    ax.set_ylim(n_rows - 0.5, -0.5)
+    ax.set_xlim(0, x_max)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.set_title(f"{title}\nTotal Setup Time: {total_setup}", fontsize=14, pad=15)
+    patches = [
+        mpatches.Patch(color=UF_ORANGE, label='Commercial (C)'),
+        mpatches.Patch(color=UF_BLUE, label='Military (M)'),
+        mpatches.Patch(color=SETUP_COLOR, label='Setup')
+    ]
+    ax.legend(handles=patches, loc='upper right')
+    # Fixed margins instead of tight_layout, which measures every tick label
+    fig.subplots_adjust(left=0.1, right=0.98, bottom=0.8 / fig_height, top=1 - 1.2 / fig_height)
+    return fig
+
+@traced("write_output")
+def render_gantt(sequence, s, p, t, filename, title,
+                 rows_per_page=GANTT_ROWS_PER_PAGE, max_labels=GANTT_MAX_LABELS, dpi=100):
+    """
+    Gantt chart renderer for long schedules.
+
+    plot_gantt makes one broken_barh and one text call per segment. Here
+    all bars of a colour are one PolyCollection, duration labels are only
+    drawn where they fit inside their bar (at most max_labels per figure)
+    and the figure height is capped, so drawing time stays nearly flat in
+    the number of segments.
+
+    A raster filename (.png, .jpg, ...) gets one image with every engine.
+    A .pdf is split into pages of rows_per_page engines, all on the same
+    time axis. Other formats get one figure.
+
+    Args:
+        sequence (list): Engine sequence [0, ..., 0].
+        s, p, t (dict): The instance, as returned by extract_data.
+        filename (str): Output file.
+        title (str): Chart title.
+        rows_per_page (int): Engines per PDF page.
+        max_labels (int): Label cap per figure or page.
+        dpi (int): Resolution of raster output.
+
+    Returns:
+        int: The number of figures (pages) written.
+    """
+    plt = pyplot()
+    total_setup, total_time, segments = calculate_schedule_metrics(sequence, s, p)
+    engines = sorted([n for n in t.keys() if n != 0])
+    engine_rows = {e: i for i, e in enumerate(engines)}
+    segments = [seg for seg in segments if seg[3] != 0]
+
+    start = np.array([seg[0] for seg in segments], dtype=float)
+    duration = np.array([seg[1] for seg in segments], dtype=float)
+    row = np.array([engine_rows[seg[3]] for seg in segments], dtype=float)
+    type_colors = {'C': UF_ORANGE, 'M': UF_BLUE}
+    color = np.array([
+        SETUP_COLOR if seg[2] == 'setup' else type_colors.get(t.get(seg[3]), 'black') for seg in segments
+    ], dtype=object)
+    x_max = max(total_time, 1) * 1.05
+
+    ext = os.path.splitext(filename)[1].lower()
+    if ext != ".pdf" or len(engines) <= rows_per_page:
+        fig = _gantt_figure(start, duration, row, color, engines, total_setup, x_max, title, max_labels)
+        fig.savefig(filename, dpi=dpi if ext in RASTER_FORMATS else "figure")
+        plt.close(fig)
+        print(f"Generated chart: {filename}")
+        return 1
+
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    pages = range(0, len(engines), rows_per_page)
+    with PdfPages(filename) as pdf:
+        for number, first in enumerate(pages, 1):
+            on_page = (row >= first) & (row < first + rows_per_page)
+            fig = _gantt_figure(
+                start[on_page], duration[on_page], row[on_page] - first, color[on_page],
+                engines[first : first + rows_per_page], total_setup, x_max,
+                f"{title} (page {number} of {len(pages)})", max_labels,
+            )
+            pdf.savefig(fig)
+            plt.close(fig)
+    print(f"Generated chart: {filename} ({len(pages)} pages)")
+    return len(pages)
+
 if __name__ == "__main__":
     MODEL_FILE = "problem2.mod"
     DATA_FILE = "problem2.dat"
 
     # --- Solve the Model for the Optimal Solution ---
-    ampl, optimal_sequence, output = solve_model(MODEL_FILE, DATA_FILE)
+    record, optimal_sequence, output = solve_model(MODEL_FILE, DATA_FILE, os.getenv("AMPLHW_SUBTOURS", "mtz"))
 
     # --- Print to console ---
     print("--- Results ---")
@@ -220,19 +486,20 @@ if __name__ == "__main__":
     # --- Conditionally write to file ---
     if os.getenv("AMPLHW_OUTPUT"):
         output_filename = "problem2.amplout"
-        with open(output_filename, "w") as f:
-            f.write("\n".join(output))
+        with span("write_output", lines=len(output)):
+            with open(output_filename, "w") as f:
+                f.write("\n".join(output))
         print(f"\nOutput also written to {output_filename}")
 
     # --- Generate Gantt Charts ---
     print("\nGenerating Gantt Charts...")
-    s, p, t, nodes = extract_data(ampl)
+    s, p, t, nodes = extract_data(record)
 
     # 1. Optimal Sequence
     plot_gantt(optimal_sequence, s, p, t, "problem2_optimal_gantt.pdf", "Optimal Production Schedule")
 
     # 2. Greedy Sequence
-    greedy_seq = get_greedy_sequence(nodes, s)
+    greedy_seq = get_greedy_sequence(nodes, s, random.Random(GREEDY_SEED))
     plot_gantt(greedy_seq, s, p, t, "problem2_greedy_gantt.pdf", "Greedy Algorithm Schedule")
 
     # 3. Commercial First Sequence
@@ -0,0 +1,134 @@
+"""
+Flow decomposition for the multi-crew routing model (Problem 3.2).
+
+Splits an arc flow into weighted source-to-sink paths plus any leftover
+circulations. Each node keeps a pointer into its list of outgoing arcs
+that only moves forward once an arc is exhausted, so the whole arc list
+is scanned once and the running time is linear in the number of arcs
+plus the size of the returned paths and cycles. Fractional flows are
+handled by sending the bottleneck amount along every path or cycle found.
+"""
+
+
+def _path_cost(arcs, costs):
+    return sum(costs[a] for a in arcs)
+
+
+def decompose_flow(tails, heads, flows, costs, supply, demand, tol=1e-5):
+    """
+    Decomposes an arc flow into paths and cycles.
+
+    Args:
+        tails (list): Tail node of every arc.
+        heads (list): Head node of every arc.
+        flows (list): Flow on every arc. Arcs are followed in this order.
+        costs (list): Cost per unit of flow on every arc.
+        supply (dict): Source node -> flow leaving it, in the order the
+            sources should be decomposed.
+        demand (dict): Sink node -> flow absorbed by it.
+        tol (float): Flows at or below this amount are treated as zero.
+
+    Returns:
+        tuple: (paths, cycles). Paths are dicts with "start", "end", "flow",
+               "cost" (per unit) and "nodes"; cycles have "flow", "cost" and
+               "nodes", with the first node repeated at the end.
+
+    Raises:
+        ValueError: If the flow is not conserved, so a walk gets stuck.
+    """
+    remaining = [float(f) for f in flows]
+    out_arcs = {}
+    for a, (u, f) in enumerate(zip(tails, remaining)):
+        if f > tol:
+            out_arcs.setdefault(u, []).append(a)
+    pointer = dict.fromkeys(out_arcs, 0)
+    deficit = {n: float(d) for n, d in demand.items()}
+
+    paths = []
+    cycles = []
+
+    def next_arc(u):
+        """First outgoing arc of u that still carries flow, or None."""
+        arcs = out_arcs.get(u)
+        if arcs is None:
+            return None
+        k = pointer[u]
+        while k < len(arcs) and remaining[arcs[k]] <= tol:
+            k += 1
+        pointer[u] = k
+        return arcs[k] if k < len(arcs) else None
+
+    def cancel(arcs, amount):
+        for a in arcs:
+            remaining[a] -= amount
+
+    def walk(start, stop_at_sink):
+        """
+        Follows flow from start until it reaches a sink with remaining
+        demand (returning the arcs used) or, for circulations, until it
+        runs out of flow. Cycles met on the way are cancelled and recorded.
+        """
+        nodes = [start]
+        arcs = []
+        position = {start: 0}
+        while True:
+            u = nodes[-1]
+            if stop_at_sink and len(nodes) > 1 and deficit.get(u, 0.0) > tol:
+                return nodes, arcs
+
+            a = next_arc(u)
+            if a is None:
+                if stop_at_sink:
+                    raise ValueError(f"Flow is not conserved at node {u}")
+                # Rounding residue of a circulation: drop it and step back
+                del position[u]
+                nodes.pop()
+                if not arcs:
+                    return nodes, arcs
+                remaining[arcs.pop()] = 0.0
+                continue
+
+            v = heads[a]
+            if v in position:
+                k = position[v]
+                cycle_arcs = arcs[k:] + [a]
+                amount = min(remaining[c] for c in cycle_arcs)
+                cancel(cycle_arcs, amount)
+                cycles.append({
+                    "flow": amount,
+                    "cost": _path_cost(cycle_arcs, costs),
+                    "nodes": nodes[k:] + [v],
+                })
+                for n in nodes[k + 1:]:
+                    del position[n]
+                del nodes[k + 1:]
+                del arcs[k:]
+            else:
+                position[v] = len(nodes)
+                nodes.append(v)
+                arcs.append(a)
+
+    # Paths, one source at a time
+    for s, amount in supply.items():
+        excess = float(amount)
+        while excess > tol:
+            nodes, arcs = walk(s, stop_at_sink=True)
+            t = nodes[-1]
+            f = min([excess, deficit[t]] + [remaining[a] for a in arcs])
+            cancel(arcs, f)
+            excess -= f
+            deficit[t] -= f
+            paths.append({
+                "start": s,
+                "end": t,
+                "flow": f,
+                "cost": _path_cost(arcs, costs),
+                "nodes": nodes,
+            })
+
+    # Whatever flow is left forms circulations
+    for u in out_arcs:
+        while next_arc(u) is not None:
+            walk(u, stop_at_sink=False)
+
+    return paths, cycles
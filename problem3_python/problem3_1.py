@@ -1,38 +1,74 @@
+import argparse
 import os
-from amplpy import AMPL
+import sys
+import time
+import numpy as np
+from shortest_path import ShortestPathSolver
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import cache_key, cached_solve, record_from_ampl
+from ampl_extract import safe_str
+from ampl_jobs import AmplJob, default_workers, run_jobs
+from tracing import problem_size, span, traced
 
-def safe_str(val):
-    """Converts AMPL values to normalized strings (removing .0 for integers)."""
-    if isinstance(val, float) and val.is_integer():
-        return str(int(val))
-    return str(val)
+# Suppress solver output to keep console clean for the table
+# AMPLHW_SOLVER picks another solver, e.g. highs when no Gurobi license is available
+AMPL_OPTIONS = {"solver": os.getenv("AMPLHW_SOLVER", "gurobi"), "solver_msg": 0}
 
 
-def solve_model(model_file, data_file, crew_node, power_node):
+def open_session(model_file, data_file):
     """
-    Runs the AMPL model and returns the cost and path.
+    Starts an AMPL instance with the model and data already loaded, so that
+    several scenarios can be solved without paying the startup cost again.
     """
+    from amplpy import AMPL
+
     ampl = AMPL()
-    ampl.option["solver"] = "gurobi"
+    for name, value in AMPL_OPTIONS.items():
+        ampl.option[name] = value
+
+    with span("read_model", bytes=os.path.getsize(model_file)):
+        ampl.read(model_file)
+    with span("read_data", bytes=os.path.getsize(data_file)):
+        ampl.read_data(data_file)
+    return ampl
 
-    # Suppress solver output to keep console clean for the table
-    ampl.option["solver_msg"] = 0
 
-    ampl.read(model_file)
-    ampl.read_data(data_file)
+def scenario_key(model_file, data_file, crew_node, power_node):
+    """Cache key of one scenario: the model, the data and the b override."""
+    overrides = {"b": {crew_node: 1, power_node: -1}}
+    return cache_key(model_file, data_file, overrides, AMPL_OPTIONS)
 
+
+def _solve_record(ampl, crew_node, power_node):
+    """Solves one scenario on a loaded AMPL instance and returns its SolveRecord."""
+    # Clear the previous scenario before placing the new source and sink
+    ampl.eval("let {n in NODES} b[n] := 0;")
     ampl.getParameter("b").set(crew_node, 1)
     ampl.getParameter("b").set(power_node, -1)
 
-    if os.getenv("AMPLHW_OUTPUT"):
-        ampl.eval(r"solve;")
-    else:
-        ampl.solve()
+    with span("solve") as s:
+        if os.getenv("AMPLHW_OUTPUT"):
+            ampl.eval(r"solve;")
+        else:
+            ampl.solve()
+        if s:
+            s.count(**problem_size(ampl))
+
+    return _extract_record(ampl)
+
+
+def _extract_record(ampl):
+    """Collects the results of a solved AMPL instance into a SolveRecord."""
+    # Only the arcs carrying flow are needed to rebuild the path
+    return record_from_ampl(ampl, "Cost", frames={"flows": (("x", "i", "j"), "x")})
+
 
+@traced("postprocess")
+def route_from_record(record, crew_node, power_node):
+    """Rebuilds the crew's path from the arc flows of a solve record."""
     # Check if solved successfully
-    result = ampl.get_value("solve_result")
-    if result != "solved":
+    if record.status != "solved":
         return {
             "start": crew_node,
             "end": power_node,
@@ -40,23 +76,17 @@ def solve_model(model_file, data_file, crew_node, power_node):
             "path": "Infeasible/Error",
         }
 
-    objective_value = ampl.get_objective("Cost").value()
+    objective_value = record.objective
 
     # --- Path Reconstruction ---
-    # Get flow on arcs
-    x = ampl.get_variable("x").get_values().to_dict()
-
-    # Get arc topology
-    param_i = ampl.get_parameter("i").get_values().to_dict()
-    param_j = ampl.get_parameter("j").get_values().to_dict()
+    # Flow, tail and head of the arcs with nonzero flow
+    flows = record.values["flows"]
+    active = flows[np.abs(flows["x"].to_numpy(dtype=float)) > 0.5]  # Active arcs
 
     # Map tail -> head for active arcs
-    next_node_map = {}
-    for arc_id, flow in x.items():
-        if abs(flow) > 0.5:  # Active arc
-            u = safe_str(param_i[arc_id])
-            v = safe_str(param_j[arc_id])
-            next_node_map[u] = v
+    next_node_map = {
+        safe_str(u): safe_str(v) for u, v in zip(active["i"].tolist(), active["j"].tolist())
+    }
 
     # Trace the path
     path_nodes = []
@@ -66,7 +96,7 @@ def solve_model(model_file, data_file, crew_node, power_node):
     path_nodes.append(curr)
 
     # Limit iterations to avoid infinite loops in case of errors
-    max_iter = len(param_i) + 5
+    max_iter = len(flows) + 5
     count = 0
 
     while curr != target and count < max_iter:
@@ -90,10 +120,157 @@ def solve_model(model_file, data_file, crew_node, power_node):
     }
 
 
+def solve_scenario(ampl, crew_node, power_node, key=None):
+    """
+    Solves one (crew, power station) scenario on an already loaded AMPL
+    instance and returns the cost and path. With a cache key, a stored
+    result is replayed instead of solving.
+    """
+    record = cached_solve(key, lambda: _solve_record(ampl, crew_node, power_node))
+    return route_from_record(record, crew_node, power_node)
+
+
+def solve_model(model_file, data_file, crew_node, power_node):
+    """
+    Runs the AMPL model in a fresh instance and returns the cost and path.
+    """
+    key = scenario_key(model_file, data_file, crew_node, power_node)
+    record = cached_solve(
+        key, lambda: _solve_record(open_session(model_file, data_file), crew_node, power_node)
+    )
+    return route_from_record(record, crew_node, power_node)
+
+
+def _scenario_job(ampl, job):
+    """Job handler: solves one scenario on a worker's warm AMPL session."""
+    t0 = time.perf_counter()
+    key = scenario_key(job.model_file, job.data_file, *job.args)
+    res = solve_scenario(ampl, *job.args, key=key)
+    res["seconds"] = time.perf_counter() - t0
+    return res, []
+
+
+def solve_scenarios(model_file, data_file, scenarios, session=True, workers=1):
+    """
+    Solves every (crew, power station) pair and records the wall time spent
+    on each one under the "seconds" key.
+
+    Args:
+        model_file (str): Path to the AMPL model file.
+        data_file (str): Path to the AMPL data file.
+        scenarios (list): (crew_node, power_node) pairs to solve.
+        session (bool): Load the model and data once per worker and only
+            reset the supply/demand parameter between scenarios. When False,
+            every scenario starts its own AMPL instance.
+        workers (int): Number of worker processes sharing the scenarios in
+            session mode.
+
+    Returns:
+        list: One result dict per scenario, in the order given.
+    """
+    if session:
+        jobs = [AmplJob(model_file, data_file, args=(start, end)) for start, end in scenarios]
+        return [r.value for r in run_jobs(_scenario_job, jobs, workers, AMPL_OPTIONS)]
+
+    results = []
+    for start, end in scenarios:
+        t0 = time.perf_counter()
+        res = solve_model(model_file, data_file, start, end)
+        res["seconds"] = time.perf_counter() - t0
+        results.append(res)
+    return results
+
+
+def solve_scenarios_dijkstra(data_file, scenarios):
+    """
+    Answers every scenario with the Dijkstra backend. The arc table is read
+    once; "seconds" holds the time of each individual query.
+    """
+    with span("read_data", bytes=os.path.getsize(data_file)):
+        solver = ShortestPathSolver.from_data_file(data_file)
+
+    results = []
+    with span("solve", scenarios=len(scenarios)):
+        for start, end in scenarios:
+            t0 = time.perf_counter()
+            res = solver.solve(start, end)
+            res["seconds"] = time.perf_counter() - t0
+            results.append(res)
+    return results
+
+
+def cross_check(results, reference, tol=1e-6):
+    """
+    Compares the costs of two result lists scenario by scenario.
+
+    Returns:
+        list: Human readable lines for every scenario whose costs differ.
+    """
+    mismatches = []
+    for r, ref in zip(results, reference):
+        if abs(r["cost"] - ref["cost"]) > tol:
+            mismatches.append(
+                f"{r['start']} -> {r['end']}: dijkstra {r['cost']:.4f}, AMPL {ref['cost']:.4f}"
+            )
+    return mismatches
+
+
+def format_table(results, show_times=False):
+    """Builds the results table, optionally with a per-scenario time column."""
+    header = f"{'Start':<6} | {'End':<6} | {'Time':<6} | {'Travel Sequence'}"
+    if show_times:
+        header = f"{'Start':<6} | {'End':<6} | {'Time':<6} | {'Solve (ms)':<10} | {'Travel Sequence'}"
+    separator = "-" * 60
+
+    output_lines = []
+    output_lines.append(header)
+    output_lines.append(separator)
+
+    for r in results:
+        start_s = str(r["start"])
+        end_s = str(r["end"])
+        cost_s = f"{r['cost']:.1f}"
+        path_s = r["path"]
+
+        if show_times:
+            ms_s = f"{r['seconds'] * 1000:.1f}"
+            line = f"{start_s:<6} | {end_s:<6} | {cost_s:<6} | {ms_s:<10} | {path_s}"
+        else:
+            line = f"{start_s:<6} | {end_s:<6} | {cost_s:<6} | {path_s}"
+        output_lines.append(line)
+
+    return "\n".join(output_lines)
+
+
 if __name__ == "__main__":
     MODEL_FILE = "MCFP_3_1.mod"
     DATA_FILE = "MCFP_3_1.dat"
 
+    parser = argparse.ArgumentParser(description="Single-crew routing for Problem 3.1")
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="start a new AMPL instance for every scenario instead of reusing one session",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="worker processes for the AMPL backend (default: AMPLHW_WORKERS or CPU count)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["ampl", "dijkstra"],
+        default="ampl",
+        help="solve each scenario as an LP in AMPL or as a native shortest path query",
+    )
+    parser.add_argument(
+        "--cross-check",
+        action="store_true",
+        help="with --backend dijkstra, also solve in AMPL and compare the costs",
+    )
+    args = parser.parse_args()
+
     scenarios = [
         (1, "3p"),
         (18, "3p"),
@@ -109,39 +286,40 @@ if __name__ == "__main__":
         (18, 24),
     ]
 
-    results = []
-
     # Print a loading message if running interactively
     if not os.getenv("AMPLHW_OUTPUT"):
         print("Calculating optimal paths...")
 
-    for start, end in scenarios:
-        res = solve_model(MODEL_FILE, DATA_FILE, start, end)
-        results.append(res)
+    t0 = time.perf_counter()
+    if args.backend == "dijkstra":
+        results = solve_scenarios_dijkstra(DATA_FILE, scenarios)
+        mode = "dijkstra"
+    else:
+        results = solve_scenarios(
+            MODEL_FILE, DATA_FILE, scenarios, session=not args.fresh, workers=args.workers
+        )
+        mode = "fresh instance per scenario" if args.fresh else f"{args.workers} warm session(s)"
+    elapsed = time.perf_counter() - t0
 
     # --- Build Table ---
-    header = f"{'Start':<6} | {'End':<6} | {'Time':<6} | {'Travel Sequence'}"
-    separator = "-" * 60
-
-    output_lines = []
-    output_lines.append(header)
-    output_lines.append(separator)
-
-    for r in results:
-        start_s = str(r["start"])
-        end_s = str(r["end"])
-        cost_s = f"{r['cost']:.1f}"
-        path_s = r["path"]
-
-        line = f"{start_s:<6} | {end_s:<6} | {cost_s:<6} | {path_s}"
-        output_lines.append(line)
+    with span("format", scenarios=len(results)):
+        output_content = format_table(results)
 
-    output_content = "\n".join(output_lines)
+    print(format_table(results, show_times=True))
+    print(f"\nSolved {len(results)} scenarios in {elapsed:.2f}s ({mode})")
 
-    print(output_content)
+    if args.cross_check and args.backend == "dijkstra":
+        reference = solve_scenarios(MODEL_FILE, DATA_FILE, scenarios, workers=args.workers)
+        mismatches = cross_check(results, reference)
+        for line in mismatches:
+            print(f"Cost mismatch: {line}")
+        if mismatches:
+            raise SystemExit(1)
+        print("Cross-check passed: all costs match the AMPL objective.")
 
     if os.getenv("AMPLHW_OUTPUT"):
         output_filename = "problem3_1.amplout"
-        with open(output_filename, "w") as f:
-            f.write(output_content)
+        with span("write_output", bytes=len(output_content)):
+            with open(output_filename, "w") as f:
+                f.write(output_content)
         print(f"\nOutput also written to {output_filename}")
@@ -1,37 +1,98 @@
+import argparse
+import csv
 import os
-from amplpy import AMPL
+import sys
+import time
+from flow_decomposition import decompose_flow
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import cache_key, cached_solve, record_from_ampl
+from ampl_extract import label_codes, safe_str
+from ampl_jobs import AmplJob, run_jobs
+from tracing import problem_size, span, traced
 
-def safe_str(val):
-    """Converts AMPL values to normalized strings (removing .0 for integers)."""
-    if isinstance(val, float) and val.is_integer():
-        return str(int(val))
-    return str(val)
+# Suppress solver output to keep console clean for the table
+# AMPLHW_SOLVER picks another solver, e.g. highs when no Gurobi license is available
+AMPL_OPTIONS = {"solver": os.getenv("AMPLHW_SOLVER", "gurobi"), "solver_msg": 0}
+
+# Options that make a solver start from the current values of the
+# variables; solvers not listed here solve every crew count from scratch
+MIP_START_OPTIONS = {"gurobi": {"gurobi_options": "mipstart=1"}}
+
+
+def _load(model_file, data_file, num_crews):
+    """Starts an AMPL instance with the model, the data and the crew count loaded."""
+    from amplpy import AMPL
+
+    ampl = AMPL()
+    for name, value in AMPL_OPTIONS.items():
+        ampl.option[name] = value
+
+    with span("read_model", bytes=os.path.getsize(model_file)):
+        ampl.read(model_file)
+    with span("read_data", bytes=os.path.getsize(data_file)):
+        ampl.read_data(data_file)
+    
+    ampl.param["number_of_crews"] = num_crews
+    return ampl
+
+
+def _solve(ampl, **counts):
+    """Solves the loaded model, tracing the solve."""
+    with span("solve", **counts) as s:
+        if os.getenv("AMPLHW_OUTPUT"):
+            ampl.eval(r"solve;")
+        else:
+            ampl.solve()
+        if s:
+            s.count(**problem_size(ampl))
+
+
+def _solve_record(ampl):
+    """Solves a loaded AMPL instance and returns its SolveRecord."""
+    _solve(ampl)
+    return _extract_record(ampl)
+
+
+def _extract_record(ampl):
+    """Collects the results of a solved AMPL instance into a SolveRecord."""
+    return record_from_ampl(
+        ampl,
+        "TotalCost",
+        ["supply"],
+        sets=["POWERSTATIONS"],
+        frames={"flows": (("x", "i", "j", "c"), "x")},
+    )
+
+
+def crew_count_key(model_file, data_file, num_crews):
+    """Cache key of one crew count: the model, the data and the crew override."""
+    return cache_key(model_file, data_file, {"number_of_crews": num_crews}, AMPL_OPTIONS)
 
 
 def solve_model(model_file, data_file, num_crews):
     """
     Runs the AMPL model and returns the cost and path.
     """
-    ampl = AMPL()
-    ampl.option["solver"] = "gurobi"
+    key = crew_count_key(model_file, data_file, num_crews)
+    record = cached_solve(key, lambda: _solve_record(_load(model_file, data_file, num_crews)))
+    return paths_from_record(record)
 
-    # Suppress solver output to keep console clean for the table
-    ampl.option["solver_msg"] = 0
 
-    ampl.read(model_file)
-    ampl.read_data(data_file)
-    
-    ampl.param["number_of_crews"] = num_crews
+def solve_loaded(ampl, key=None):
+    """
+    Solves an AMPL instance that already holds the model, the data and the
+    crew count, and returns the cost and paths. With a cache key, a stored
+    result is replayed instead of solving.
+    """
+    return paths_from_record(cached_solve(key, lambda: _solve_record(ampl)))
 
-    if os.getenv("AMPLHW_OUTPUT"):
-        ampl.eval(r"solve;")
-    else:
-        ampl.solve()
 
+@traced("postprocess")
+def paths_from_record(record):
+    """Decomposes the arc flows of a solve record into one path per crew."""
     # Check if solved successfully
-    result = ampl.get_value("solve_result")
-    if result != "solved":
+    if record.status != "solved":
         return float("inf"), [{
             "start": "Error",
             "end": "Error",
@@ -39,108 +100,172 @@ def solve_model(model_file, data_file, num_crews):
             "path": "Infeasible/Error",
         }]
 
-    objective_value = ampl.get_objective("TotalCost").value()
+    objective_value = record.objective
     print(f"Objective Value: {objective_value}")
 
-    supply_var = ampl.get_variable("supply").get_values().to_dict()
+    supply_var = record.values["supply"]
 
     # Identify source nodes (crews) and their supply amount
     sources = {}
     for node, val in supply_var.items():
         if val > 1e-5: # Tolerance for float
-            sources[safe_str(node)] = int(round(val))
+            sources[safe_str(node)] = val
             print(f"Crew at {node} with supply {val}")
 
     # --- Path Reconstruction ---
-    # Get flow on arcs
-    x = ampl.get_variable("x").get_values().to_dict()
-
-    # Get arc topology and costs
-    param_i = ampl.get_parameter("i").get_values().to_dict()
-    param_j = ampl.get_parameter("j").get_values().to_dict()
-    param_c = ampl.get_parameter("c").get_values().to_dict()
-
-    power_stations_set = ampl.get_set("POWERSTATIONS").get_values().to_list()
-    power_stations = set(safe_str(p) for p in power_stations_set)
-
-    # Build adjacency with flow and costs
-    # adj[u][v] = {'flow': f, 'cost': c, 'arc_id': a}
-    adj = {}
-    for arc_id, flow in x.items():
-        if flow > 1e-5:
-            u = safe_str(param_i[arc_id])
-            v = safe_str(param_j[arc_id])
-            if u not in adj: adj[u] = {}
-            # Handle potential parallel edges? AMPL model has simple arcs, but let's be safe.
-            # We assume one arc from u to v.
-            adj[u][v] = {'flow': flow, 'cost': param_c[arc_id], 'arc_id': arc_id}
+    # Flow, tail, head and cost of the arcs with nonzero flow
+    flows = record.values["flows"]
+    (tails, heads), labels = label_codes(flows["i"], flows["j"], normalize=safe_str)
+    code = {label: k for k, label in enumerate(labels)}
+
+    # Every power station absorbs one unit of flow (see the balance constraint)
+    power_stations_set = record.values["POWERSTATIONS"]
+    demand = {code[safe_str(p)]: 1.0 for p in power_stations_set if safe_str(p) in code}
+    sources = {code[n]: val for n, val in sources.items() if n in code}
+
+    # Decompose flow into weighted paths and leftover circulations
+    flow_paths, cycles = decompose_flow(
+        tails.tolist(),
+        heads.tolist(),
+        flows["x"].tolist(),
+        flows["c"].tolist(),
+        sources,
+        demand,
+    )
 
     paths = []
+    for fp in flow_paths:
+        path_str = "->".join(labels[fp["nodes"]])
+        if abs(fp["flow"] - 1.0) > 1e-5:
+            path_str += f" (flow {fp['flow']:.2f})"
+        paths.append({
+            "start": labels[fp["start"]],
+            "end": labels[fp["end"]],
+            "cost": fp["cost"],
+            "path": path_str,
+        })
+
+    # Circulations carry no crew but are listed so they do not go unnoticed
+    for cycle in cycles:
+        paths.append({
+            "start": labels[cycle["nodes"][0]],
+            "end": labels[cycle["nodes"][-1]],
+            "cost": cycle["cost"],
+            "path": "->".join(labels[cycle["nodes"]]) + f" (circulation, flow {cycle['flow']:.2f})",
+        })
+
+    return objective_value, paths
+
+
+def _crew_count_job(ampl, job):
+    """Job handler: solves one crew count on a worker's warm AMPL session."""
+    key = crew_count_key(job.model_file, job.data_file, *job.args)
+    return solve_loaded(ampl, key), []
+
+
+def sweep_crew_counts(model_file, data_file, max_crews, tol=1e-6):
+    """
+    Solves the model for 1..max_crews crews on a single AMPL instance.
+
+    The crew count is changed in place and the previous solution, which is
+    still feasible with one more crew, is passed to the solver as a MIP
+    start when MIP_START_OPTIONS has options for it (only Gurobi). The
+    sweep stops at the first crew count that no longer lowers
+    TotalCost.
 
-    # Decompose flow into paths
-    for s, supply_amt in sources.items():
-        remaining_supply = supply_amt
-        while remaining_supply >= 0.9: # Treat as integer units
-            # Find a path from s to a power station
-            path_nodes = [s]
-            curr = s
-            path_cost = 0
-
-            # Simple DFS/Traversal to find a sink with available flow capacity
-            # Since this is a valid flow solution, a path must exist.
-            while curr not in power_stations:
-                if curr not in adj:
-                    path_nodes.append("(stuck)")
-                    break
-
-                # Pick next node with flow
-                next_node = None
-                for v, edge_data in adj[curr].items():
-                    if edge_data['flow'] > 1e-5:
-                        next_node = v
-                        break
-
-                if next_node:
-                    # Record move
-                    edge_data = adj[curr][next_node]
-                    path_cost += edge_data['cost']
-
-                    # Decrement flow to mark as used for this unit
-                    adj[curr][next_node]['flow'] -= 1.0
-                    # Clean up if flow is effectively 0
-                    if adj[curr][next_node]['flow'] < 1e-5:
-                        del adj[curr][next_node]
-
-                    curr = next_node
-                    path_nodes.append(curr)
-                else:
-                    path_nodes.append("(dead end)")
-                    break
-
-            paths.append({
-                "start": s,
-                "end": curr,
-                "cost": path_cost,
-                "path": "->".join(path_nodes)
+    Returns:
+        list: One dict per crew count with "crews", "cost", "gain" (cost
+              saved by the last crew added), "seconds" and "status".
+    """
+    ampl = _load(model_file, data_file, 1)
+    for name, value in MIP_START_OPTIONS.get(AMPL_OPTIONS["solver"], {}).items():
+        ampl.option[name] = value
+
+    rows = []
+    prev_cost = None
+    try:
+        for n_crews in range(1, max_crews + 1):
+            ampl.param["number_of_crews"] = n_crews
+
+            t0 = time.perf_counter()
+            _solve(ampl, crews=n_crews)
+            seconds = time.perf_counter() - t0
+
+            status = ampl.get_value("solve_result")
+            cost = ampl.get_objective("TotalCost").value() if status == "solved" else float("inf")
+            gain = prev_cost - cost if prev_cost is not None else None
+            rows.append({
+                "crews": n_crews,
+                "cost": cost,
+                "gain": gain,
+                "seconds": seconds,
+                "status": status,
             })
-            remaining_supply -= 1.0
 
-    return objective_value, paths
+            if gain is not None and gain <= tol:
+                break
+            prev_cost = cost
+    finally:
+        ampl.close()
+    return rows
+
+
+def format_sweep(rows):
+    """Builds the cost-vs-crews table of a sweep."""
+    lines = [f"{'Crews':<6} | {'Cost':<8} | {'Gain':<8} | {'Solve (s)':<9} | Status", "-" * 60]
+    for r in rows:
+        gain_s = "-" if r["gain"] is None else f"{r['gain']:.1f}"
+        lines.append(
+            f"{r['crews']:<6} | {r['cost']:<8.1f} | {gain_s:<8} | {r['seconds']:<9.3f} | {r['status']}"
+        )
+    return "\n".join(lines)
+
+
+def write_sweep_csv(rows, filename):
+    """Writes the sweep rows as CSV."""
+    with span("write_output", rows=len(rows)):
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["crews", "cost", "gain", "seconds", "status"])
+            writer.writeheader()
+            writer.writerows(rows)
 
 
 if __name__ == "__main__":
     MODEL_FILE = "MCFP_3_2.mod"
     DATA_FILE = "MCFP_3_2.dat"
+
+    parser = argparse.ArgumentParser(description="Multi-crew routing for Problem 3.2")
+    parser.add_argument(
+        "--sweep",
+        type=int,
+        metavar="K",
+        help="solve for 1..K crews on one warm-started model and print the cost curve",
+    )
+    parser.add_argument("--csv", help="also write the sweep table to this CSV file")
+    args = parser.parse_args()
+
+    if args.sweep:
+        rows = sweep_crew_counts(MODEL_FILE, DATA_FILE, args.sweep)
+        print(format_sweep(rows))
+        if args.csv:
+            write_sweep_csv(rows, args.csv)
+            print(f"\nSweep also written to {args.csv}")
+        sys.exit(0)
     
     crew_counts = [2, 3]
     combined_output = []
 
-    for n_crews in crew_counts:
-        # Print a loading message if running interactively
-        if not os.getenv("AMPLHW_OUTPUT"):
-            print(f"\n--- Calculating optimal paths for {n_crews} crews ---")
+    # Print a loading message if running interactively
+    if not os.getenv("AMPLHW_OUTPUT"):
+        print(f"\n--- Calculating optimal paths for {crew_counts} crews ---")
 
-        obj_val, all_paths = solve_model(MODEL_FILE, DATA_FILE, n_crews)
+    jobs = [
+        AmplJob(MODEL_FILE, DATA_FILE, overrides={"number_of_crews": n}, args=(n,))
+        for n in crew_counts
+    ]
+    for result in run_jobs(_crew_count_job, jobs, options=AMPL_OPTIONS):
+        n_crews = result.job.args[0]
+        obj_val, all_paths = result.value
 
         # --- Build Table Section ---
         header_text = f"Results for {n_crews} Crews"
@@ -173,6 +298,7 @@ if __name__ == "__main__":
 
     if os.getenv("AMPLHW_OUTPUT"):
         output_filename = "problem3_2.amplout"
-        with open(output_filename, "w") as f:
-            f.write(output_content)
+        with span("write_output", bytes=len(output_content)):
+            with open(output_filename, "w") as f:
+                f.write(output_content)
         print(f"\nOutput also written to {output_filename}")
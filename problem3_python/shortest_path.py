@@ -0,0 +1,148 @@
+"""
+Dijkstra backend for single-crew routing (Problem 3.1).
+
+With one source and one sink the min-cost flow model is a shortest path
+query, so the arc table of the .dat file is loaded once into a CSR
+adjacency and every scenario is answered without going through AMPL.
+"""
+
+import heapq
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_extract import safe_str
+
+
+def read_arc_table(data_file, set_name="ARCS"):
+    """
+    Reads the ``param: ARCS: c lb ub i j :=`` table from an AMPL data file.
+
+    Returns:
+        dict: Column name -> list of string tokens, plus the arc ids under
+              the set name.
+    """
+    with open(data_file) as f:
+        text = f.read()
+
+    match = re.search(
+        r"param\s*:\s*" + set_name + r"\s*:(.*?):=(.*?);", text, re.DOTALL
+    )
+    if match is None:
+        raise ValueError(f"No '{set_name}' table found in {data_file}")
+
+    columns = match.group(1).split()
+    tokens = match.group(2).split()
+    width = len(columns) + 1
+    if len(tokens) % width:
+        raise ValueError(f"Malformed '{set_name}' table in {data_file}")
+
+    table = {set_name: tokens[0::width]}
+    for k, name in enumerate(columns, start=1):
+        table[name] = tokens[k::width]
+    return table
+
+
+class ShortestPathSolver:
+    """
+    Shortest path oracle over a CSR adjacency built from the arc table.
+
+    Arcs with no capacity are left out. Shortest path trees are memoized per
+    source, so repeated crews only pay for one Dijkstra run.
+    """
+
+    def __init__(self, tails, heads, costs):
+        if np.any(costs < 0):
+            raise ValueError("Dijkstra needs non-negative arc costs")
+
+        self.nodes = sorted(set(tails) | set(heads))
+        self.node_index = {n: k for k, n in enumerate(self.nodes)}
+
+        u = np.array([self.node_index[t] for t in tails], dtype=np.int64)
+        v = np.array([self.node_index[h] for h in heads], dtype=np.int64)
+        order = np.argsort(u, kind="stable")
+
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=len(self.nodes)), out=self.indptr[1:])
+        self.indices = v[order]
+        self.weights = np.asarray(costs, dtype=float)[order]
+
+        # Plain lists are faster to walk than NumPy scalars inside the heap loop
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._weights = self.weights.tolist()
+        self._trees = {}
+
+    @classmethod
+    def from_data_file(cls, data_file):
+        """Builds the solver from the ``ARCS`` table (``c``, ``i``, ``j``, ``ub``)."""
+        table = read_arc_table(data_file)
+        ub = np.array(table["ub"], dtype=float)
+        if "lb" in table and np.any(np.array(table["lb"], dtype=float) > 0):
+            raise ValueError("Arcs with a positive lower bound need the LP backend")
+
+        keep = ub > 0
+        tails = [t for t, k in zip(table["i"], keep) if k]
+        heads = [h for h, k in zip(table["j"], keep) if k]
+        costs = np.array(table["c"], dtype=float)[keep]
+        return cls(tails, heads, costs)
+
+    def _tree(self, source):
+        """Returns the (dist, pred) lists of the shortest path tree from source."""
+        if source in self._trees:
+            return self._trees[source]
+
+        n = len(self.nodes)
+        dist = [float("inf")] * n
+        pred = [-1] * n
+        done = [False] * n
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+
+        self._trees[source] = (dist, pred)
+        return dist, pred
+
+    def solve(self, crew_node, power_node):
+        """
+        Returns the same {"start", "end", "cost", "path"} dict as
+        problem3_1.solve_model.
+        """
+        s = self.node_index.get(safe_str(crew_node))
+        t = self.node_index.get(safe_str(power_node))
+        dist, pred = self._tree(s) if s is not None else (None, None)
+
+        if t is None or dist is None or dist[t] == float("inf"):
+            return {
+                "start": crew_node,
+                "end": power_node,
+                "cost": float("inf"),
+                "path": "Infeasible/Error",
+            }
+
+        path = [t]
+        while path[-1] != s:
+            path.append(pred[path[-1]])
+
+        return {
+            "start": crew_node,
+            "end": power_node,
+            "cost": dist[t],
+            "path": "->".join(self.nodes[k] for k in reversed(path)),
+        }
@@ -0,0 +1,796 @@
+"""
+Branch and bound for the product mix model (Problem 4).
+
+The LP relaxation (relaxation.mod) is read once into a single AMPL
+session. Branching bounds on x are added to it as two parameters and two
+constraint families, so a node only changes those parameters before it
+is solved again: AMPL never re-reads or re-translates the model. The
+parent's basis is restored before each node is solved so the solver can
+warm start from it.
+
+The search itself only talks to the relaxation through solve(bounds,
+basis), so any other LP oracle with the same interface can drive it.
+parallel_branch_and_bound spreads the open nodes over a process pool
+with one oracle per worker.
+"""
+
+import heapq
+import json
+import math
+import multiprocessing
+import multiprocessing.util
+import queue
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Appended to the relaxation so that branching bounds can be changed in place
+BRANCH_DECLARATIONS = """
+param branch_lb {{{index_set}}} default -Infinity;
+param branch_ub {{{index_set}}} default Infinity;
+subject to BranchLo {{p in {index_set}}}: {var}[p] >= branch_lb[p];
+subject to BranchHi {{p in {index_set}}}: {var}[p] <= branch_ub[p];
+"""
+
+# A branching constraint of a node*.mod file, e.g. "subject to node01: x['WingSpar'] >= 169;"
+BRANCH_CONSTRAINT = re.compile(r"^\s*subject to\s+(node\d+)\s*:\s*(.+?)\s*;")
+
+# The bound in a branching constraint, e.g. "x['WingSpar'] >= 169"
+BRANCH_BOUND = re.compile(r"\w+\[\s*'(\w+)'\s*\]\s*(<=|>=)\s*([-+.\deE]+)")
+
+
+@dataclass
+class LPResult:
+    """Outcome of one node relaxation."""
+
+    status: str  # "optimal", "infeasible" or the solver's own result
+    objective: Optional[float] = None
+    x: Dict[Any, float] = field(default_factory=dict)
+    basis: Any = None  # opaque, handed back to the oracle for the children
+
+
+@dataclass
+class SearchNode:
+    """One solved node of the search tree."""
+
+    node_id: str
+    parent_id: Optional[str]
+    constraint: str  # e.g. "x['WingSpar'] >= 169", "Relaxation" at the root
+    bounds: Dict[Any, Tuple[float, float]]
+    result: LPResult
+    outcome: str = ""  # "branched", "integer", "bound" or "infeasible"
+
+
+@dataclass
+class SearchResult:
+    nodes: List[SearchNode]
+    incumbent: Optional[SearchNode]
+    lp_solves: int
+    skipped: Optional[int]  # open nodes dropped on their parent's bound without a solve
+    limit_reached: bool = False  # stopped at max_nodes with open nodes left
+
+
+def _ampl_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+class AmplRelaxation:
+    """
+    LP oracle on one AMPL session holding the relaxation and its data.
+
+    Args:
+        model_file (str): The LP relaxation, e.g. relaxation.mod.
+        data_file (str): Its data, e.g. problem4.dat.
+        options (dict): AMPL options such as the solver.
+        objective (str): Name of the objective.
+        var (str): The variable that must be integer.
+        index_set (str): The set indexing var.
+    """
+
+    def __init__(self, model_file, data_file, options=None, objective="Profit", var="x", index_set="P"):
+        from amplpy import AMPL
+
+        self.ampl = AMPL()
+        for name, value in (options or {}).items():
+            self.ampl.option[name] = value
+        self.ampl.option["solver_msg"] = 0
+        self.ampl.read(model_file)
+        self.ampl.read_data(data_file)
+        self.ampl.eval(BRANCH_DECLARATIONS.format(var=var, index_set=index_set))
+
+        self.var = var
+        self.objective = objective
+        self.names = self.ampl.get_set(index_set).get_values().to_list()
+        self.maximize = not self.ampl.get_objective(objective).minimization()
+
+        self._basis_entities = [name for name, _ in self.ampl.get_variables()] + [
+            name for name, _ in self.ampl.get_constraints()
+        ]
+        self._applied = {}
+
+    def add_constraints(self, declarations):
+        """Adds constraints, e.g. the root cuts of cuts.cut_constraints, to the relaxation."""
+        self.ampl.eval(declarations)
+        self._basis_entities = [name for name, _ in self.ampl.get_variables()] + [
+            name for name, _ in self.ampl.get_constraints()
+        ]
+
+    def _apply_bounds(self, bounds):
+        """Sets the branching bounds, touching only the entries that changed."""
+        changed = {p for p in self._applied.keys() | bounds.keys() if self._applied.get(p) != bounds.get(p)}
+        if not changed:
+            return
+        default = (-math.inf, math.inf)
+        self.ampl.param["branch_lb"] = {p: bounds.get(p, default)[0] for p in changed}
+        self.ampl.param["branch_ub"] = {p: bounds.get(p, default)[1] for p in changed}
+        self._applied = dict(bounds)
+
+    def _basis(self):
+        """Current sstatus of every variable and constraint."""
+        return [(name, self.ampl.get_data(f"{name}.sstatus").to_list()) for name in self._basis_entities]
+
+    def _restore_basis(self, basis):
+        statements = []
+        for name, rows in basis:
+            for row in rows:
+                # Scalar entities come back as bare values, indexed ones as tuples
+                *key, status = row if isinstance(row, tuple) else (row,)
+                subscript = f"[{', '.join(map(_ampl_literal, key))}]" if key else ""
+                statements.append(f"let {name}{subscript}.sstatus := '{status}';")
+        self.ampl.eval("\n".join(statements))
+
+    def solve(self, bounds, basis=None):
+        """
+        Solves the relaxation under the given branching bounds.
+
+        Args:
+            bounds (dict): Index -> (lower, upper) for the branched entries.
+            basis: The basis of the parent node, or None.
+
+        Returns:
+            LPResult: The node outcome, with its own basis for the children.
+        """
+        self._apply_bounds(bounds)
+        if basis is not None:
+            self._restore_basis(basis)
+        self.ampl.solve()
+
+        status = self.ampl.get_value("solve_result")
+        if status == "infeasible":
+            return LPResult("infeasible")
+        if status != "solved":
+            return LPResult(status)
+        return LPResult(
+            "optimal",
+            self.ampl.get_objective(self.objective).value(),
+            self.ampl.get_variable(self.var).get_values().to_dict(),
+            self._basis(),
+        )
+
+    def close(self):
+        self.ampl.close()
+
+
+def first_fractional(x, names, tol):
+    """The first index in set order whose value is not integral, or None."""
+    for p in names:
+        v = x.get(p, 0.0)
+        if abs(v - round(v)) > tol:
+            return p
+    return None
+
+
+# Rules accepted by branch_and_bound
+NODE_SELECTION = ("depth", "best-bound", "best-estimate", "hybrid")
+BRANCHING = ("first", "most-fractional", "pseudocost", "strong")
+
+
+@dataclass
+class _OpenNode:
+    parent: Optional[SearchNode]
+    bounds: Dict[Any, Tuple[float, float]]
+    constraint: str
+    basis: Any = None  # the parent's basis
+    bound: Optional[float] = None  # the parent's objective
+    estimate: Optional[float] = None  # guess of the best integer objective below
+    branch: Optional[Tuple[Any, bool, float]] = None  # (index, up, distance rounded)
+    result: Optional[LPResult] = None  # already solved by strong branching
+
+
+class NodeQueue:
+    """
+    Open nodes of the search, handed out in the order of a selection rule:
+
+    - "depth": last in, first out (the up branch first).
+    - "best-bound": the node whose parent has the best objective.
+    - "best-estimate": the node with the best pseudocost estimate of the
+      integer objective below it.
+    - "hybrid": depth first until an incumbent is found, then best bound.
+
+    Ties are broken depth first.
+    """
+
+    def __init__(self, rule, sign):
+        if rule not in NODE_SELECTION:
+            raise ValueError(f"Unknown node selection rule {rule!r}, expected one of {NODE_SELECTION}")
+        self.rule = rule
+        self.sign = sign
+        self._heap = []
+        self._count = 0
+        self._mode = "depth" if rule == "hybrid" else rule
+
+    def _key(self, node, seq):
+        if self._mode == "depth":
+            return (-seq,)
+        value = node.bound if self._mode == "best-bound" else node.estimate
+        return (-self.sign * value if value is not None else -math.inf, -seq)
+
+    def push(self, node):
+        self._count += 1
+        heapq.heappush(self._heap, (self._key(node, self._count), self._count, node))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[2]
+
+    def incumbent_found(self):
+        """Lets the hybrid rule switch from diving to best bound."""
+        if self._mode == "depth" and self.rule == "hybrid":
+            self._mode = "best-bound"
+            self._heap = [(self._key(node, seq), seq, node) for _, seq, node in self._heap]
+            heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class Pseudocosts:
+    """
+    Average objective loss per unit of rounding, per index and direction,
+    learned from the nodes solved so far. An index that has not been
+    branched on in a direction yet gets the average over all indices, or
+    1 before anything has been learned.
+    """
+
+    def __init__(self):
+        self._sum = {}
+        self._count = {}
+
+    def update(self, p, up, loss, distance):
+        if distance <= 0:
+            return
+        key = (p, up)
+        self._sum[key] = self._sum.get(key, 0.0) + max(loss, 0.0) / distance
+        self._count[key] = self._count.get(key, 0) + 1
+
+    def get(self, p, up):
+        key = (p, up)
+        if key in self._count:
+            return self._sum[key] / self._count[key]
+        seen = [k for k in self._count if k[1] == up]
+        if not seen:
+            return 1.0
+        return sum(self._sum[k] for k in seen) / sum(self._count[k] for k in seen)
+
+    def losses(self, p, value):
+        """Expected (down, up) objective loss of branching on p at value."""
+        f = value - math.floor(value)
+        return self.get(p, False) * f, self.get(p, True) * (1 - f)
+
+
+def fractional_entries(x, names, tol):
+    """(index, value) of the fractional entries, in set order."""
+    return [(p, x.get(p, 0.0)) for p in names if abs(x.get(p, 0.0) - round(x.get(p, 0.0))) > tol]
+
+
+def _product_score(down, up, eps=1e-6):
+    return max(down, eps) * max(up, eps)
+
+
+def choose_branch(rule, candidates, pseudocosts, strong=None):
+    """
+    Picks the entry to branch on among the fractional ones.
+
+    Args:
+        rule (str): One of BRANCHING.
+        candidates (list): (index, value) pairs, in set order.
+        pseudocosts (Pseudocosts): Learned losses, for "pseudocost".
+        strong (callable, optional): For "strong", maps (index, value) to
+            the (down, up) objective losses found by solving both children.
+
+    Returns:
+        The chosen index. Ties go to the first candidate in set order.
+    """
+    if rule == "first":
+        return candidates[0][0]
+    if rule == "most-fractional":
+        return max(candidates, key=lambda c: min(c[1] - math.floor(c[1]), math.ceil(c[1]) - c[1]))[0]
+    if rule == "pseudocost":
+        return max(candidates, key=lambda c: _product_score(*pseudocosts.losses(*c)))[0]
+    if rule == "strong":
+        return max(candidates, key=lambda c: _product_score(*strong(*c)))[0]
+    raise ValueError(f"Unknown branching rule {rule!r}, expected one of {BRANCHING}")
+
+
+def branch_and_bound(
+    oracle,
+    tol=1e-6,
+    prune=True,
+    on_node=None,
+    select="depth",
+    branching="first",
+    strong_candidates=8,
+    max_nodes=None,
+):
+    """
+    Branch and bound with selectable node selection and branching rules.
+
+    The defaults, depth first on the first fractional entry in set order
+    with the up branch (x >= ceil) before the down branch, follow the
+    order of the hand-built tree.
+
+    Args:
+        oracle: Relaxation with ``names``, ``maximize``, ``var`` and
+            ``solve(bounds, basis)`` (see AmplRelaxation).
+        tol (float): Integrality and objective comparison tolerance.
+        prune (bool): Drop nodes whose bound cannot beat the incumbent.
+            Without pruning only infeasible and integer nodes end a branch.
+        on_node (callable, optional): Called with every SearchNode as soon
+            as it has been solved, e.g. to stream a node log.
+        select (str): Node selection rule, one of NODE_SELECTION (see
+            NodeQueue).
+        branching (str): Branching rule, one of BRANCHING: the first
+            fractional entry, the most fractional one, the best pseudocost
+            product score, or strong branching, which solves both children
+            of the strong_candidates most fractional entries and keeps the
+            solved children of the chosen one.
+        strong_candidates (int): Entries tried by strong branching.
+        max_nodes (int, optional): Stop after this many nodes.
+
+    Returns:
+        SearchResult: The solved nodes in the order they were solved and
+                      the best integer node found.
+    """
+    if branching not in BRANCHING:
+        raise ValueError(f"Unknown branching rule {branching!r}, expected one of {BRANCHING}")
+    sign = 1.0 if oracle.maximize else -1.0
+
+    def beats(value, best):
+        return best is None or sign * (value - best.result.objective) > tol
+
+    nodes = []
+    incumbent = None
+    skipped = 0
+    count = 0
+    lp_solves = 0
+    pseudocosts = Pseudocosts()
+    limit_reached = False
+
+    def children(node, p):
+        """Bounds and constraint text of the (down, up) children on p."""
+        value = node.result.x[p]
+        lb, ub = node.bounds.get(p, (-math.inf, math.inf))
+        down, up = math.floor(value), math.ceil(value)
+        entry = f"{oracle.var}[{_ampl_literal(p)}]"
+        return (
+            ({**node.bounds, p: (lb, down)}, f"{entry} <= {down}", value - down),
+            ({**node.bounds, p: (up, ub)}, f"{entry} >= {up}", up - value),
+        )
+
+    queue = NodeQueue(select, sign)
+    queue.push(_OpenNode(None, {}, "Relaxation"))
+    while queue:
+        if max_nodes is not None and count >= max_nodes:
+            limit_reached = True
+            break
+        open_node = queue.pop()
+        if prune and open_node.bound is not None and not beats(open_node.bound, incumbent):
+            skipped += 1
+            continue
+
+        result = open_node.result
+        if result is None:
+            result = oracle.solve(open_node.bounds, open_node.basis)
+            lp_solves += 1
+            if open_node.branch is not None and result.status == "optimal":
+                p, up, distance = open_node.branch
+                pseudocosts.update(p, up, sign * (open_node.bound - result.objective), distance)
+
+        parent = open_node.parent
+        node = SearchNode(
+            node_id="relaxation" if parent is None else f"node{count:02d}",
+            parent_id=parent.node_id if parent is not None else None,
+            constraint=open_node.constraint,
+            bounds=open_node.bounds,
+            result=result,
+        )
+        count += 1
+        nodes.append(node)
+
+        if result.status != "optimal":
+            node.outcome = "infeasible"
+        elif prune and not beats(result.objective, incumbent):
+            node.outcome = "bound"
+        else:
+            candidates = fractional_entries(result.x, oracle.names, tol)
+            if not candidates:
+                node.outcome = "integer"
+                if beats(result.objective, incumbent):
+                    incumbent = node
+                    queue.incumbent_found()
+            else:
+                node.outcome = "branched"
+                solved = {}
+
+                def strong(p, value):
+                    nonlocal lp_solves
+                    losses = []
+                    for up, (bounds, _, distance) in zip((False, True), children(node, p)):
+                        child = oracle.solve(bounds, result.basis)
+                        lp_solves += 1
+                        solved[p, up] = child
+                        if child.status != "optimal":
+                            losses.append(math.inf)
+                            continue
+                        loss = sign * (result.objective - child.objective)
+                        pseudocosts.update(p, up, loss, distance)
+                        losses.append(loss)
+                    return tuple(losses)
+
+                if branching == "strong":
+                    candidates = sorted(
+                        candidates, key=lambda c: -min(c[1] - math.floor(c[1]), math.ceil(c[1]) - c[1])
+                    )[:strong_candidates]
+                p = choose_branch(branching, candidates, pseudocosts, strong)
+                # Cheapest rounding loss of the entries left fractional
+                others = sum(
+                    min(pseudocosts.losses(q, v)) for q, v in fractional_entries(result.x, oracle.names, tol) if q != p
+                )
+
+                # Pushed last, so the up branch is explored first depth first
+                for up, (bounds, constraint, distance) in zip((False, True), children(node, p)):
+                    estimate = result.objective - sign * (pseudocosts.get(p, up) * distance + others)
+                    queue.push(
+                        _OpenNode(
+                            node,
+                            bounds,
+                            constraint,
+                            basis=result.basis,
+                            bound=result.objective,
+                            estimate=estimate,
+                            branch=(p, up, distance),
+                            result=solved.get((p, up)),
+                        )
+                    )
+
+        if on_node is not None:
+            on_node(node)
+
+    return SearchResult(nodes, incumbent, lp_solves=lp_solves, skipped=skipped, limit_reached=limit_reached)
+
+
+def tighten(bounds, expression):
+    """
+    Returns a copy of bounds with one branching constraint added.
+
+    Args:
+        bounds (dict): Index -> (lower, upper).
+        expression (str): A branch such as "x['WingSpar'] >= 169".
+    """
+    p, sense, value = BRANCH_BOUND.fullmatch(expression).groups()
+    lb, ub = bounds.get(p, (-math.inf, math.inf))
+    if sense == ">=":
+        lb = max(lb, float(value))
+    else:
+        ub = min(ub, float(value))
+    return {**bounds, p: (lb, ub)}
+
+
+def child_id(parent_id, up):
+    """
+    Path-based id of a child node: "node-" followed by one letter per
+    branch from the root, "u" for up and "d" for down. The id only
+    depends on where the node sits in the tree, not on when it was solved.
+    """
+    path = "" if parent_id == "relaxation" else parent_id[len("node-"):]
+    return f"node-{path}{'u' if up else 'd'}"
+
+
+def tree_order(node_id):
+    """Sort key putting path-based ids in the order a serial search solves them."""
+    if node_id == "relaxation":
+        return ""
+    return node_id[len("node-"):].replace("u", "0").replace("d", "1")
+
+
+# Per worker state of parallel_branch_and_bound
+_worker_oracle = None
+_worker_incumbent = None
+
+
+def _init_node_worker(make_oracle, incumbent):
+    global _worker_oracle, _worker_incumbent
+    _worker_oracle = make_oracle()
+    _worker_incumbent = incumbent
+    # Runs when the worker exits after Pool.close, so its AMPL instance is
+    # shut down with it
+    multiprocessing.util.Finalize(None, _worker_oracle.close, exitpriority=10)
+
+
+def _solve_node(task, sign, tol, prune):
+    """
+    Worker: solves one open node unless the shared incumbent already
+    prunes it. Integer solutions that beat the incumbent are published
+    right away so that the other workers can prune against them.
+    """
+    node_id, bounds, basis, bound = task
+    if prune and bound is not None and sign * bound - _worker_incumbent.value <= tol:
+        return node_id, None
+
+    result = _worker_oracle.solve(bounds, basis)
+    if result.status == "optimal" and first_fractional(result.x, _worker_oracle.names, tol) is None:
+        with _worker_incumbent.get_lock():
+            if sign * result.objective - _worker_incumbent.value > tol:
+                _worker_incumbent.value = sign * result.objective
+    return node_id, result
+
+
+def parallel_branch_and_bound(make_oracle, workers, tol=1e-6, prune=True, on_node=None):
+    """
+    Branch and bound that solves open nodes on a pool of processes.
+
+    Each worker builds its own oracle with make_oracle. The incumbent
+    objective lives in shared memory: a worker that finds a better
+    integer solution stores it at once, and every worker checks it before
+    solving a node, so "bound < best" pruning happens across workers
+    without waiting for the parent process. Node ids are path-based (see
+    child_id), so the same node gets the same id in every run and a node
+    log can be replayed with read_search whatever order the nodes were
+    solved in. Which nodes are pruned can still differ between runs, since
+    it depends on when the incumbent improves.
+
+    Branching is the same as in branch_and_bound: first fractional entry,
+    up branch first, with open nodes taken from a stack.
+
+    Args:
+        make_oracle (callable): Picklable factory of a relaxation oracle,
+            e.g. functools.partial(AmplRelaxation, model, data, options).
+        workers (int): Number of worker processes. 1 solves everything in
+            this process.
+        tol, prune, on_node: As in branch_and_bound.
+
+    Returns:
+        SearchResult: The solved nodes in tree order (see tree_order). The
+                      stored nodes drop the basis once their children are
+                      queued.
+    """
+    global _worker_oracle, _worker_incumbent
+
+    oracle = make_oracle()
+    sign = 1.0 if oracle.maximize else -1.0
+    incumbent_value = multiprocessing.Value("d", -math.inf)
+    done = queue.SimpleQueue()
+    # A couple of nodes queued behind every worker keeps the pool busy; in
+    # this process one at a time keeps the order of branch_and_bound
+    capacity = 2 * workers if workers > 1 else 1
+
+    if workers > 1:
+        oracle.close()
+        pool = multiprocessing.Pool(workers, initializer=_init_node_worker, initargs=(make_oracle, incumbent_value))
+
+        def submit(task):
+            pool.apply_async(_solve_node, (task, sign, tol, prune), callback=done.put, error_callback=done.put)
+
+    else:
+        pool = None
+        _worker_oracle, _worker_incumbent = oracle, incumbent_value
+
+        def submit(task):
+            done.put(_solve_node(task, sign, tol, prune))
+
+    nodes = []
+    incumbent = None
+    skipped = 0
+    in_flight = {}
+
+    # Open nodes: (node id, parent, bounds, constraint text, parent basis, parent bound)
+    stack = [("relaxation", None, {}, "Relaxation", None, None)]
+    finished = False
+    try:
+        while stack or in_flight:
+            while stack and len(in_flight) < capacity:
+                node_id, parent, bounds, constraint, basis, bound = stack.pop()
+                if prune and bound is not None and sign * bound - incumbent_value.value <= tol:
+                    skipped += 1
+                    continue
+                in_flight[node_id] = (parent, bounds, constraint)
+                submit((node_id, bounds, basis, bound))
+
+            answer = done.get()
+            if isinstance(answer, BaseException):
+                raise answer
+            node_id, result = answer
+            parent, bounds, constraint = in_flight.pop(node_id)
+            if result is None:
+                skipped += 1
+                continue
+
+            node = SearchNode(node_id, parent.node_id if parent else None, constraint, bounds, result)
+            nodes.append(node)
+            p = first_fractional(result.x, oracle.names, tol) if result.status == "optimal" else None
+            if result.status != "optimal":
+                node.outcome = "infeasible"
+            elif p is None:
+                # The worker has already published it to the shared incumbent,
+                # so it is only compared with the ones seen here
+                if incumbent is None or sign * (result.objective - incumbent.result.objective) > tol:
+                    node.outcome = "integer"
+                    incumbent = node
+                else:
+                    node.outcome = "bound" if prune else "integer"
+            elif prune and sign * result.objective - incumbent_value.value <= tol:
+                node.outcome = "bound"
+            else:
+                node.outcome = "branched"
+                value = result.x[p]
+                lb, ub = bounds.get(p, (-math.inf, math.inf))
+                down, up = math.floor(value), math.ceil(value)
+                entry = f"{oracle.var}[{_ampl_literal(p)}]"
+                stack.append(
+                    (child_id(node_id, False), node, {**bounds, p: (lb, down)}, f"{entry} <= {down}",
+                     result.basis, result.objective)
+                )
+                stack.append(
+                    (child_id(node_id, True), node, {**bounds, p: (up, ub)}, f"{entry} >= {up}",
+                     result.basis, result.objective)
+                )
+            result.basis = None
+
+            if on_node is not None:
+                on_node(node)
+        finished = True
+    finally:
+        if pool is not None:
+            # Idle workers close their oracles on the way out; after an error
+            # nodes may still be running, so they are killed instead
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+        else:
+            oracle.close()
+            _worker_oracle = _worker_incumbent = None
+
+    nodes.sort(key=lambda n: tree_order(n.node_id))
+    return SearchResult(nodes, incumbent, lp_solves=len(nodes), skipped=skipped)
+
+
+class NodeLog:
+    """
+    Append-only JSON Lines log of solved nodes, one compact object per line:
+
+        {"id":"node01","parent":"relaxation","constraint":"x['WingSpar'] >= 169",
+         "z":6473861.67,"x":{"WingSpar":169.0,"WingRib":103.33},"status":"branched"}
+
+    "z" is null for infeasible nodes and "x" only lists nonzero entries.
+    "status" is "branched", "integer", "bound" or "infeasible". Every line
+    is flushed as it is written, so a log of an interrupted search is
+    still readable. visualize_tree.load_node_log reads it back.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "w")
+
+    def write(self, node_id, parent_id, constraint, z, x, status):
+        entry = {
+            "id": node_id,
+            "parent": parent_id,
+            "constraint": constraint,
+            "z": z,
+            "x": {str(k): v for k, v in x.items() if abs(v) > 1e-9},
+            "status": status,
+        }
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def write_node(self, node):
+        """Logs a SearchNode; usable as the on_node callback of branch_and_bound."""
+        r = node.result
+        self.write(node.node_id, node.parent_id, node.constraint, r.objective, r.x, node.outcome)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def branch_constraints(model_file):
+    """
+    Reads the branching constraints of a node*.mod file, in the order they
+    were added, as (name, expression) pairs from the ``subject to nodeNN:
+    ...;`` lines.
+    """
+    constraints = []
+    with open(model_file) as f:
+        for line in f:
+            match = BRANCH_CONSTRAINT.match(line)
+            if match:
+                expression = re.sub(r"\s*(<=|>=)\s*", r" \1 ", match.group(2))
+                constraints.append((match.group(1), expression))
+    return constraints
+
+
+def read_search(filename, maximize=True):
+    """
+    Replays a NodeLog as a SearchResult.
+
+    Nodes with path-based ids (parallel_branch_and_bound) are put in tree
+    order, so the replay is the same whatever order the workers finished
+    in; other logs keep their file order. A parent is always logged before
+    its children, which lets the bounds be rebuilt from the constraints.
+
+    Args:
+        filename (str): A log written by NodeLog.
+        maximize (bool): Direction of the objective, to pick the incumbent.
+
+    Returns:
+        SearchResult: The logged nodes. How many open nodes were pruned
+                      without a solve is not logged, so skipped is None.
+    """
+    nodes = []
+    bounds_of = {}
+    with open(filename) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            parent = entry["parent"]
+            bounds = tighten(bounds_of[parent], entry["constraint"]) if parent is not None else {}
+            bounds_of[entry["id"]] = bounds
+            z = entry["z"]
+            result = LPResult("infeasible") if z is None else LPResult("optimal", z, entry["x"])
+            nodes.append(SearchNode(entry["id"], parent, entry["constraint"], bounds, result, entry["status"]))
+
+    if all(n.node_id == "relaxation" or n.node_id.startswith("node-") for n in nodes):
+        nodes.sort(key=lambda n: tree_order(n.node_id))
+
+    sign = 1.0 if maximize else -1.0
+    incumbent = None
+    for node in nodes:
+        if node.outcome == "integer" and (
+            incumbent is None or sign * (node.result.objective - incumbent.result.objective) > 0
+        ):
+            incumbent = node
+    return SearchResult(nodes, incumbent, lp_solves=len(nodes), skipped=None)
+
+
+def format_search(search):
+    """Builds the per-node table of a search."""
+    lines = [f"{'Node':<10} | {'Parent':<10} | {'Branch':<26} | {'Z':>14} | {'Outcome':<10} | x", "-" * 100]
+    for node in search.nodes:
+        r = node.result
+        z = f"{r.objective:,.2f}" if r.objective is not None else "-"
+        x = ", ".join(f"{p}={v:.2f}" for p, v in r.x.items() if abs(v) > 0.001)
+        lines.append(
+            f"{node.node_id:<10} | {node.parent_id or '-':<10} | {node.constraint:<26} | {z:>14} | {node.outcome:<10} | {x}"
+        )
+    lines.append("-" * 100)
+    if search.incumbent is not None:
+        lines.append(f"Best integer solution: {search.incumbent.node_id}, Z = {search.incumbent.result.objective:,.2f}")
+    else:
+        lines.append("No integer solution found.")
+    if search.limit_reached:
+        lines.append("Node limit reached; the search is incomplete.")
+    if search.skipped is None:
+        lines.append(f"LP solves: {search.lp_solves}")
+    else:
+        lines.append(f"LP solves: {search.lp_solves}, open nodes pruned without a solve: {search.skipped}")
+    return lines
@@ -0,0 +1,268 @@
+"""
+Root cutting planes for the product mix model (Problem 4).
+
+relaxation.mod only has the aluminum (CtrAlum) and hours (CtrHour) rows,
+so its LP bound is weak and the tree has to do all the work. This module
+tightens the root relaxation in rounds:
+
+- Gomory mixed-integer (GMI) cuts, read off the optimal tableau rows of
+  the products whose LP value is fractional. The slacks of the rows are
+  continuous, since the hours and aluminum use per unit are not integer.
+- Mixed-integer rounding (MIR) cuts of the CtrAlum and CtrHour knapsack
+  rows, one per divisor taken from the row's own coefficients. The
+  products are general integers, not 0/1, so cover inequalities do not
+  apply directly; MIR is their analogue for general integer knapsacks.
+
+Every round adds the violated cuts and solves the LP again with
+dense_lp.solve_batch, until no cut is violated, the bound stops moving or
+the round limit is reached. The cuts are rows over x, so they can be added
+to DenseRelaxation or, as AMPL constraints, to AmplRelaxation.
+
+    python cuts.py [--data problem4.dat] [--rounds 10]
+
+prints the bound after every round and compares the branch and bound
+tree with and without the cuts.
+"""
+
+import argparse
+import math
+import sys
+import time
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from branch_and_bound import _ampl_literal, branch_and_bound
+from dense_lp import OPTIMAL, DenseRelaxation, solve_batch
+
+# Cuts whose largest and smallest coefficients differ more than this are
+# numerically unsafe and dropped
+MAX_DYNAMISM = 1e6
+
+
+@dataclass
+class Cut:
+    """The valid inequality coef . x <= rhs."""
+
+    kind: str  # "gmi" or "mir"
+    coef: np.ndarray
+    rhs: float
+
+    def violation(self, x):
+        """How far x is on the wrong side, scaled by the norm of the cut."""
+        return (self.coef @ x - self.rhs) / np.linalg.norm(self.coef)
+
+
+@dataclass
+class CutRounds:
+    cuts: List[Cut]
+    bounds: List[float]  # LP bound before the first round and after every round
+    added: List[int]  # cuts added before each of those solves
+    seconds: float
+
+
+def _frac(v, tol=1e-9):
+    f = v - math.floor(v)
+    return 0.0 if f < tol or f > 1 - tol else f
+
+
+def _clean(cut):
+    """Drops negligible coefficients and relaxes the rhs a hair for safety."""
+    coef = np.where(np.abs(cut.coef) < 1e-9, 0.0, cut.coef)
+    nonzero = np.abs(coef[coef != 0])
+    if len(nonzero) == 0 or nonzero.max() / nonzero.min() > MAX_DYNAMISM:
+        return None
+    return Cut(cut.kind, coef, cut.rhs + 1e-9 * max(1.0, abs(cut.rhs)))
+
+
+def optimal_basis(A, b, x, tol=1e-7):
+    """
+    A basis of the standard form [A I] (x, s) = b for the vertex x: every
+    positive variable, completed with slack columns first while the
+    columns stay independent.
+
+    Returns:
+        list: Column indices, x first (0..n-1) then slacks (n..n+m-1).
+    """
+    m, n = A.shape
+    M = np.hstack([A, np.eye(m)])
+    z = np.concatenate([x, b - A @ x])
+    basic = [j for j in range(n + m) if z[j] > tol]
+    for j in list(range(n, n + m)) + list(range(n)):
+        if len(basic) >= m:
+            break
+        if j not in basic and np.linalg.matrix_rank(M[:, basic + [j]]) == len(basic) + 1:
+            basic.append(j)
+    return basic
+
+
+def gmi_cuts(A, b, x, tol=1e-6, min_frac=1e-3):
+    """
+    GMI cuts from the tableau rows of the fractional basic products.
+
+    The tableau row x_i + sum_j a_j z_j = b_i (z nonbasic, at zero) gives
+    sum_j g_j z_j >= 1 with g_j = f_j/f0 or (1-f_j)/(1-f0) for integer
+    columns and a_j/f0 or -a_j/(1-f0) for continuous ones. The slacks are
+    then substituted by s = b - A x to get a row over x.
+    """
+    m, n = A.shape
+    basic = optimal_basis(A, b, x)
+    if len(basic) != m:
+        return []
+    M = np.hstack([A, np.eye(m)])
+    B_inv = np.linalg.inv(M[:, basic])
+    T = B_inv @ M
+    beta = B_inv @ b
+
+    nonbasic = np.ones(n + m, dtype=bool)
+    nonbasic[basic] = False
+    cuts = []
+    for r, j in enumerate(basic):
+        f0 = _frac(beta[r])
+        if j >= n or not min_frac < f0 < 1 - min_frac:
+            continue
+        g = np.zeros(n + m)
+        for k in np.flatnonzero(nonbasic):
+            a = T[r, k]
+            if k < n:
+                f = _frac(a)
+                g[k] = f / f0 if f <= f0 else (1 - f) / (1 - f0)
+            else:
+                g[k] = a / f0 if a >= 0 else -a / (1 - f0)
+        # g_x x + g_s (b - A x) >= 1  <=>  (g_s A - g_x) x <= g_s b - 1
+        g_x, g_s = g[:n], g[n:]
+        cut = _clean(Cut("gmi", g_s @ A - g_x, float(g_s @ b - 1)))
+        if cut is not None:
+            cuts.append(cut)
+    return cuts
+
+
+def mir_cuts(A, b, x, min_frac=1e-3):
+    """
+    MIR cuts of the knapsack rows a . x <= b with a >= 0: for every divisor
+    d among the row's coefficients of products used in x,
+
+        sum_j (floor(a_j/d) + max(0, f_j - f)/(1 - f)) x_j <= floor(b/d)
+
+    with f = frac(b/d) and f_j = frac(a_j/d).
+    """
+    cuts = []
+    for a, rhs in zip(A, b):
+        if (a < 0).any():
+            continue
+        for d in sorted({float(v) for v in a[(a > 0) & (x > 1e-9)]}):
+            alpha, beta = a / d, rhs / d
+            f = _frac(beta)
+            if not min_frac < f < 1 - min_frac:
+                continue
+            fj = np.array([_frac(v) for v in alpha])
+            coef = np.floor(alpha + 1e-9) + np.maximum(0.0, fj - f) / (1 - f)
+            cut = _clean(Cut("mir", coef, float(math.floor(beta))))
+            if cut is not None:
+                cuts.append(cut)
+    return cuts
+
+
+def root_cuts(oracle, max_rounds=10, min_improvement=1e-6, tol=1e-6):
+    """
+    Runs cut rounds on the root LP of a DenseRelaxation.
+
+    Args:
+        oracle (DenseRelaxation): The product mix LP (maximization).
+        max_rounds (int): Round limit.
+        min_improvement (float): Stop when a round improves the bound by
+            less than this, relative to the bound.
+        tol (float): Violation a cut needs to be added.
+
+    Returns:
+        CutRounds: The cuts, in the order they were added, and the bounds.
+    """
+    t0 = time.perf_counter()
+    n = len(oracle.names)
+    A, b = oracle.A, oracle.b
+    lower, upper = np.zeros((1, n)), np.full((1, n), np.inf)
+    cuts, bounds, added = [], [], [0]
+    for round_number in range(max_rounds + 1):
+        status, objective, x = solve_batch(oracle.c, A, b, lower, upper)
+        if status[0] != OPTIMAL:
+            break
+        bound, x = float(objective[0]), x[0]
+        bounds.append(bound)
+        if len(bounds) > 1 and bounds[-2] - bound < min_improvement * max(1.0, abs(bound)):
+            break
+        if round_number == max_rounds or all(_frac(v, tol) == 0 for v in x):
+            break
+
+        violated = [cut for cut in gmi_cuts(A, b, x) + mir_cuts(oracle.A, oracle.b, x) if cut.violation(x) > tol]
+        if not violated:
+            break
+        cuts.extend(violated)
+        added.append(len(violated))
+        A = np.vstack([A] + [cut.coef for cut in violated])
+        b = np.concatenate([b, [cut.rhs for cut in violated]])
+    return CutRounds(cuts, bounds, added[: len(bounds)], time.perf_counter() - t0)
+
+
+def cut_constraints(cuts, names, var="x", prefix="RootCut"):
+    """The cuts as AMPL constraint declarations, one per line."""
+    lines = []
+    for k, cut in enumerate(cuts, 1):
+        terms = " + ".join(f"{v:.12g}*{var}[{_ampl_literal(p)}]" for p, v in zip(names, cut.coef) if v != 0)
+        lines.append(f"subject to {prefix}{k:02d}: {terms} <= {cut.rhs:.12g};")
+    return "\n".join(lines)
+
+
+def format_rounds(rounds):
+    """Builds the bound per round table."""
+    lines = [f"{'Round':<6} | {'Cuts':>5} | {'LP bound':>16}", "-" * 32]
+    for k, (added, bound) in enumerate(zip(rounds.added, rounds.bounds)):
+        lines.append(f"{k:<6} | {added:>5} | {bound:>16,.2f}")
+    kinds = {kind: sum(c.kind == kind for c in rounds.cuts) for kind in ("gmi", "mir")}
+    lines.append(f"{len(rounds.cuts)} cuts ({kinds['gmi']} GMI, {kinds['mir']} MIR) in {rounds.seconds:.3f} s")
+    return lines
+
+
+def compare_trees(data_file, max_rounds=10, **search_options):
+    """
+    Runs branch and bound on the dense relaxation without and with root
+    cuts and reports the nodes saved and the time spent.
+
+    Returns:
+        list: Output lines.
+    """
+    plain = DenseRelaxation(data_file)
+    t0 = time.perf_counter()
+    without = branch_and_bound(plain, **search_options)
+    seconds_without = time.perf_counter() - t0
+
+    tightened = DenseRelaxation(data_file)
+    rounds = root_cuts(tightened, max_rounds)
+    tightened.add_cuts(rounds.cuts)
+    t0 = time.perf_counter()
+    with_cuts = branch_and_bound(tightened, **search_options)
+    seconds_with = time.perf_counter() - t0
+
+    lines = format_rounds(rounds)
+    lines.append("")
+    lines.append(f"{'Tree':<10} | {'Nodes':>7} | {'LP solves':>9} | {'Time (s)':>8} | Best Z")
+    for label, search, seconds in (("no cuts", without, seconds_without), ("root cuts", with_cuts, seconds_with)):
+        z = f"{search.incumbent.result.objective:,.2f}" if search.incumbent else "-"
+        lines.append(f"{label:<10} | {len(search.nodes):>7} | {search.lp_solves:>9} | {seconds:>8.3f} | {z}")
+    lines.append(
+        f"Nodes saved: {len(without.nodes) - len(with_cuts.nodes)}, "
+        f"time saved including the cut rounds: {seconds_without - seconds_with - rounds.seconds:.3f} s"
+    )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Root cuts for the Problem 4 relaxation")
+    parser.add_argument("--data", default="problem4.dat")
+    parser.add_argument("--rounds", type=int, default=10, help="cut round limit (default: %(default)s)")
+    args = parser.parse_args()
+
+    print(f"--- Root cuts on {args.data} ---")
+    for line in compare_trees(args.data, args.rounds):
+        print(line)
+    sys.exit(0)
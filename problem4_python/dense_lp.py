@@ -0,0 +1,331 @@
+"""
+Batched dense LP solver for the product mix node relaxations (Problem 4).
+
+Every node of the Problem 4 tree is the LP
+
+    maximize c.x  subject to  A x <= b,  lb <= x <= ub
+
+with the products, the aluminum and hours rows of relaxation.mod (its
+SlackAlum and SlackHours turn them into equalities) and the bounds added
+by branching. Going through AMPL costs far more than the
+arithmetic, so this module solves a whole batch of such LPs at once
+with a two-phase tableau simplex. Every LP in the batch pivots in the
+same NumPy operation; the ones that are done are masked out.
+
+Finite upper bounds become explicit rows, lower bounds are shifted into
+the right-hand side, and Bland's rule keeps degenerate nodes from
+cycling. DenseRelaxation wraps it as a relaxation oracle for
+branch_and_bound.
+
+    python dense_lp.py --validate ../ampl
+
+solves relaxation.mod and every node*.mod in one batch and compares the
+results with the .amplout files AMPL wrote under the given directory.
+"""
+
+import argparse
+import glob
+import math
+import os
+import re
+import sys
+
+import numpy as np
+
+from branch_and_bound import LPResult, branch_constraints, tighten
+
+# Stands in for an infinite upper bound inside the tableau
+BIG = 1e30
+
+# Final states of every LP in a batch
+OPTIMAL, INFEASIBLE, UNBOUNDED, ITERATION_LIMIT = "optimal", "infeasible", "unbounded", "iteration limit"
+
+
+def read_product_mix(data_file):
+    """
+    Reads problem4.dat style data: the set P, the per-product parameters
+    and the scalar parameters.
+
+    Returns:
+        tuple: (products, params) where params maps names to a dict per
+               product or to a float.
+    """
+    with open(data_file) as f:
+        text = re.sub(r"#.*", "", f.read())
+
+    match = re.search(r"set\s+P\s*:=(.*?);", text, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No set P found in {data_file}")
+    products = match.group(1).replace(",", " ").split()
+
+    params = {}
+    for name, body in re.findall(r"param\s+(\w+)\s*:=(.*?);", text, re.DOTALL):
+        tokens = body.split()
+        params[name] = {p: float(v) for p, v in zip(tokens[0::2], tokens[1::2])}
+    for name, value in re.findall(r"param\s+(\w+)\s+([-+.\deE]+)\s*;", text):
+        params[name] = float(value)
+    return products, params
+
+
+def solve_batch(c, A, b, lower, upper, max_iter=None, tol=1e-9):
+    """
+    Solves a batch of LPs  max c.x  s.t.  A x <= b,  lower <= x <= upper.
+
+    All LPs share c, A and b and differ in their bounds, as the nodes of a
+    branch-and-bound tree do.
+
+    Args:
+        c (array): Objective, shape (n,).
+        A (array): Constraint rows, shape (m, n).
+        b (array): Right-hand sides, shape (m,).
+        lower (array): Lower bounds, shape (batch, n). Must be finite.
+        upper (array): Upper bounds, shape (batch, n). May be inf.
+        max_iter (int, optional): Pivot limit per phase. Defaults to a
+            generous multiple of the tableau size.
+        tol (float): Pivoting tolerance.
+
+    Returns:
+        tuple: (status, objective, x) with status a list of strings, the
+               objective and x NumPy arrays (nan where not optimal).
+    """
+    c = np.asarray(c, dtype=float)
+    A = np.asarray(A, dtype=float)
+    b = np.asarray(b, dtype=float)
+    lower = np.atleast_2d(np.asarray(lower, dtype=float))
+    upper = np.atleast_2d(np.asarray(upper, dtype=float))
+    n_batch, n = lower.shape
+    m = len(b)
+
+    # Shift x = lower + y with y >= 0. The product mix has no free variables.
+    if not np.isfinite(lower).all():
+        raise ValueError("every variable needs a finite lower bound")
+    span = upper - lower
+
+    # Rows: A y <= b - A lower, then y <= upper - lower
+    rows = m + n
+    G = np.concatenate([np.broadcast_to(A, (n_batch, m, n)), np.broadcast_to(np.eye(n), (n_batch, n, n))], axis=1)
+    rhs = np.concatenate([b - lower @ A.T, np.where(np.isfinite(span), span, BIG)], axis=1)
+
+    # Columns: y, one slack per row, one artificial per row, then the rhs.
+    # Rows with a negative right-hand side are negated and start with their
+    # artificial in the basis; the others start with their slack.
+    n_cols = n + 2 * rows
+    negative = rhs < 0
+    sign = np.where(negative, -1.0, 1.0)
+    T = np.zeros((n_batch, rows + 2, n_cols + 1))
+    T[:, :rows, :n] = G * sign[:, :, None]
+    T[:, :rows, n : n + rows] = np.eye(rows) * sign[:, :, None]
+    T[:, :rows, n + rows : n + 2 * rows] = np.eye(rows) * negative[:, :, None]
+    T[:, :rows, -1] = rhs * sign
+    basis = np.where(negative, n + rows + np.arange(rows), n + np.arange(rows))
+
+    # Row rows: phase 2 reduced costs (c on y). Row rows + 1: phase 1,
+    # maximizing minus the sum of the artificials.
+    T[:, rows, :n] = c
+    T[:, rows, -1] = -(lower @ c)
+    T[:, rows + 1, :] = (T[:, :rows, :] * negative[:, :, None]).sum(axis=1)
+    T[:, rows + 1, n + rows : n + 2 * rows] = 0.0
+
+    allowed = np.zeros(n_cols, dtype=bool)
+    allowed[: n + rows] = True  # artificials never enter
+    if max_iter is None:
+        max_iter = 50 * (rows + n_cols)
+
+    status = np.full(n_batch, OPTIMAL, dtype=object)
+    active = negative.any(axis=1)
+    _pivot_until_optimal(T, basis, rows + 1, rows, allowed, active, status, max_iter, tol, phase1=True)
+    # The phase 1 right-hand side is what is left of the artificials
+    leftover = T[:, rows + 1, -1] > 1e-7 * (1 + np.abs(np.where(rhs < BIG / 2, rhs, 0)).max(axis=1))
+    status[(status == OPTIMAL) & leftover] = INFEASIBLE
+
+    active = status == OPTIMAL
+    _pivot_until_optimal(T, basis, rows, rows, allowed, active, status, max_iter, tol, phase1=False)
+
+    # Read the basic solution back
+    y = np.zeros((n_batch, n_cols))
+    np.put_along_axis(y, basis, T[:, :rows, -1], axis=1)
+    x = lower + y[:, :n]
+
+    ok = status == OPTIMAL
+    objective = np.where(ok, x @ c, np.nan)
+    x[~ok] = np.nan
+    return status.tolist(), objective, x
+
+
+def _pivot_until_optimal(T, basis, obj_row, rows, allowed, active, status, max_iter, tol, phase1):
+    """
+    Runs simplex pivots on the active LPs of a batch in place.
+
+    Entering column: the lowest index with a positive reduced cost.
+    Leaving row: the minimum ratio, ties broken by the lowest basic index
+    (Bland's rule). In phase 2 an artificial still basic at zero leaves
+    as soon as its row has any nonzero entry in the entering column, so
+    it can never become positive.
+    """
+    n_batch = T.shape[0]
+    n_artificial_from = T.shape[2] - 1 - rows
+    batch = np.arange(n_batch)
+
+    for _ in range(max_iter):
+        reduced = T[:, obj_row, :-1]
+        candidates = (reduced > tol) & allowed & active[:, None]
+        moving = candidates.any(axis=1)
+        if not moving.any():
+            return
+        active &= moving
+
+        idx = batch[active]
+        enter = candidates[idx].argmax(axis=1)
+        column = T[idx, :rows, enter]
+        rhs = T[idx, :rows, -1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(column > tol, rhs / column, np.inf)
+        if not phase1:
+            stuck = (basis[idx] >= n_artificial_from) & (np.abs(column) > tol)
+            ratio = np.where(stuck, 0.0, ratio)
+
+        best = ratio.min(axis=1)
+        # Only the stand-in row of an infinite upper bound limits the step
+        unbounded = best >= BIG / 2
+        if unbounded.any():
+            status[idx[unbounded]] = UNBOUNDED
+            active[idx[unbounded]] = False
+            keep = ~unbounded
+            idx, enter, ratio, best = idx[keep], enter[keep], ratio[keep], best[keep]
+            if len(idx) == 0:
+                continue
+
+        ties = ratio <= best[:, None] + tol * (1 + np.abs(best[:, None]))
+        leave = np.where(ties, basis[idx], np.iinfo(np.int64).max).argmin(axis=1)
+
+        # Pivot every selected LP on (leave, enter)
+        pivot_row = T[idx, leave, :] / T[idx, leave, enter][:, None]
+        factors = T[idx, :, enter]
+        T[idx] -= factors[:, :, None] * pivot_row[:, None, :]
+        T[idx, leave, :] = pivot_row
+        basis[idx, leave] = enter
+
+    status[active] = ITERATION_LIMIT
+
+
+class DenseRelaxation:
+    """
+    Relaxation oracle for branch_and_bound that solves the product mix LP
+    with solve_batch instead of AMPL. There is no basis to hand down, so
+    every node is solved from the slack basis.
+
+    Args:
+        data_file (str): problem4.dat style data.
+    """
+
+    def __init__(self, data_file):
+        products, params = read_product_mix(data_file)
+        self.names = products
+        self.maximize = True
+        self.var = "x"
+        self.c = np.array([params["sellValue"][p] for p in products])
+        self.A = np.array([[params["alum"][p] for p in products], [params["hours"][p] for p in products]])
+        self.b = np.array([params["maxAlum"], params["maxHour"]])
+
+    def bound_arrays(self, bounds_list):
+        """Lower and upper bound arrays for a list of branching bound dicts."""
+        lower = np.zeros((len(bounds_list), len(self.names)))
+        upper = np.full((len(bounds_list), len(self.names)), np.inf)
+        for k, bounds in enumerate(bounds_list):
+            for j, p in enumerate(self.names):
+                lb, ub = bounds.get(p, (-math.inf, math.inf))
+                lower[k, j] = max(lb, 0.0)
+                upper[k, j] = ub
+        return lower, upper
+
+    def solve_many(self, bounds_list):
+        """Solves several nodes in one batch and returns their LPResults."""
+        lower, upper = self.bound_arrays(bounds_list)
+        status, objective, x = solve_batch(self.c, self.A, self.b, lower, upper)
+        results = []
+        for k, s in enumerate(status):
+            if s != OPTIMAL:
+                results.append(LPResult(s))
+            else:
+                results.append(LPResult(OPTIMAL, float(objective[k]), dict(zip(self.names, x[k].tolist()))))
+        return results
+
+    def add_cuts(self, cuts):
+        """Appends cutting planes (rows coef . x <= rhs, see cuts.py) to the LP."""
+        if cuts:
+            self.A = np.vstack([self.A] + [cut.coef for cut in cuts])
+            self.b = np.concatenate([self.b, [cut.rhs for cut in cuts]])
+
+    def solve(self, bounds, basis=None):
+        return self.solve_many([bounds])[0]
+
+    def close(self):
+        pass
+
+
+def bounds_of_model(model_file):
+    """Branching bounds of a node*.mod file as index -> (lower, upper)."""
+    bounds = {}
+    for _, expression in branch_constraints(model_file):
+        bounds = tighten(bounds, expression)
+    return bounds
+
+
+def read_amplout(filename):
+    """Objective and production plan from a problem4 .amplout file."""
+    with open(filename) as f:
+        text = f.read()
+    match = re.search(r"Total Profit\): \$([\d,.-]+)", text)
+    if match is None:
+        return None, {}
+    plan = re.findall(r"Product (\w+): ([\d,.-]+) units", text)
+    return float(match.group(1).replace(",", "")), {p: float(v.replace(",", "")) for p, v in plan}
+
+
+def validate(data_file, model_files, output_dir, tol=0.01):
+    """
+    Solves the given models in one batch and compares them with the
+    .amplout files under output_dir (or output_dir/branchbound).
+
+    Returns:
+        tuple: (report lines, number of mismatches)
+    """
+    oracle = DenseRelaxation(data_file)
+    results = oracle.solve_many([bounds_of_model(f) for f in model_files])
+
+    lines = [f"{'Model':<16} | {'Dense Z':>14} | {'AMPL Z':>14} | Result", "-" * 64]
+    mismatches = 0
+    for model_file, result in zip(model_files, results):
+        name = os.path.basename(model_file).replace(".mod", ".amplout")
+        candidates = [os.path.join(output_dir, name), os.path.join(output_dir, "branchbound", name)]
+        output = next((c for c in candidates if os.path.exists(c)), None)
+        dense_z = f"{result.objective:,.2f}" if result.status == OPTIMAL else result.status
+        if output is None:
+            lines.append(f"{model_file:<16} | {dense_z:>14} | {'-':>14} | no AMPL output")
+            continue
+
+        ampl_z, ampl_x = read_amplout(output)
+        # No objective line, e.g. for a model AMPL found infeasible
+        ampl_s = "-" if ampl_z is None else f"{ampl_z:,.2f}"
+        if result.status != OPTIMAL:
+            # AMPL output does not record the solve status, only the values
+            lines.append(f"{model_file:<16} | {dense_z:>14} | {ampl_s:>14} | infeasible here")
+            continue
+        same = ampl_z is not None and abs(result.objective - ampl_z) <= tol
+        same = same and all(abs(result.x[p] - ampl_x.get(p, 0.0)) <= tol for p in oracle.names)
+        mismatches += not same
+        lines.append(f"{model_file:<16} | {dense_z:>14} | {ampl_s:>14} | {'ok' if same else 'MISMATCH'}")
+    return lines, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched dense LP solver for the Problem 4 nodes")
+    parser.add_argument("--validate", metavar="DIR", required=True, help="directory with the AMPL .amplout files")
+    parser.add_argument("--data", default="problem4.dat")
+    args = parser.parse_args()
+
+    models = ["relaxation.mod"] + sorted(glob.glob("node*.mod"))
+    report, mismatches = validate(args.data, models, args.validate)
+    print("\n".join(report))
+    sys.exit(1 if mismatches else 0)
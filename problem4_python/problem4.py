@@ -1,5 +1,32 @@
+import json
 import os
-from amplpy import AMPL
+import sys
+import tempfile
+from functools import partial
+
+from branch_and_bound import (
+    AmplRelaxation,
+    BRANCHING,
+    NODE_SELECTION,
+    NodeLog,
+    branch_and_bound,
+    branch_constraints,
+    format_search,
+    parallel_branch_and_bound,
+    read_search,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from ampl_cache import cache_key, cached_solve, record_from_ampl, record_from_dict, record_to_dict
+from ampl_jobs import AmplJob, WarmSession, run_jobs
+from tracing import problem_size, span
+
+# AMPLHW_SOLVER picks another solver, e.g. highs when no Gurobi license is available
+AMPL_OPTIONS = {"solver": os.getenv("AMPLHW_SOLVER", "gurobi")}
+
+# Inputs and results of the last solve of every model, see load_manifest
+MANIFEST_FILE = "problem4_manifest.json"
+MANIFEST_FORMAT = 1
 
 
 def run_ampl_model(model_file, data_file, output_filename=None):
@@ -13,63 +40,100 @@ def run_ampl_model(model_file, data_file, output_filename=None):
         output_filename (str, optional): Filename to write output to.
     """
     print(f"Running model: {model_file}...")
-    ampl = AMPL()
 
-    # Set solver and options
-    ampl.option["solver"] = "gurobi"
+    # AMPL is started and the files are read only if the solve is not cached
+    session = WarmSession(AMPL_OPTIONS)
+    ampl = session.lazy(AmplJob(model_file, data_file))
+
+    key = cache_key(model_file, data_file, options=AMPL_OPTIONS)
+    _, output_lines = solve_loaded(ampl, model_file, key)
+    session.close()
+
+    # --- Conditionally write to file ---
+    if os.getenv("AMPLHW_OUTPUT") and output_filename:
+        with span("write_output", lines=len(output_lines)):
+            with open(output_filename, "w") as f:
+                f.write("\n".join(output_lines))
+        print(f"Output also written to {output_filename}")
+
+
+def _solve_record(ampl):
+    """Solves a loaded AMPL instance and returns its SolveRecord."""
+    with span("solve") as s:
+        if os.getenv("AMPLHW_OUTPUT"):
+            ampl.eval(r"solve;")
+        else:
+            ampl.solve()
+        if s:
+            s.count(**problem_size(ampl))
+    return _extract_record(ampl)
+
+
+def _extract_record(ampl):
+    """Collects the results of a solved AMPL instance into a SolveRecord."""
+    return record_from_ampl(ampl, "Profit", ["x"], sets=["P"])
+
+
+def format_record(record):
+    """Builds the production plan breakdown from a solve record."""
+    output_lines = []
+    # Get objective value
+    try:
+        objective_value = record.objective
+        output_lines.append(
+            f"Objective value (Total Profit): ${objective_value:,.2f}"
+        )
+        output_lines.append("-" * 30)
+        output_lines.append("Production Plan:")
+
+        # Get variables and sets
+        x = record.values["x"]
+        products = record.values["P"]
 
-    # Read the model and data files
-    ampl.read(model_file)
-    ampl.read_data(data_file)
+        # Iterate through products
+        for p in products:
+            val = x[p]
+            if val > 0.001:
+                output_lines.append(f"  - Product {p}: {val:,.2f} units")
 
+        # output_lines.append("-" * 30)
+        # output_lines.append("Resource Usage (Slack):")
+
+        # slack_hours = ampl.get_variable("SlackHours").value()
+        # slack_alum = ampl.get_variable("SlackAlum").value()
+        #
+        # output_lines.append(f"  - Unused Hours: {slack_hours:,.2f}")
+        # output_lines.append(f"  - Unused Aluminum: {slack_alum:,.2f}")
+    except Exception as e:
+        output_lines.append(f"Error extracting results: {e}")
+
+    return output_lines
+
+
+def solve_loaded(ampl, model_file, key=None):
+    """
+    Solves an AMPL instance that already holds the model and data, prints
+    the results and returns the SolveRecord (None if the solve failed)
+    with the list of output lines. With a cache key, a stored result is
+    replayed instead of solving.
+    """
     # --- Build up the detailed output ---
     output_lines = []
 
     # Solve the model
     print("Solving model...")
-    solve_success = False
+    record = None
     try:
-        if os.getenv("AMPLHW_OUTPUT"):
-            ampl.eval(r"solve;")
-        else:
-            ampl.solve()
-        solve_success = True
+        record = cached_solve(key, lambda: _solve_record(ampl))
         print("Solve complete.\n")
     except Exception as e:
         print(f"Solve failed: {e}\n")
         output_lines.append(f"Status: Infeasible/Error - {str(e)}")
 
     # --- Build up the detailed output ---
-    if solve_success:
-        # Get objective value
-        try:
-            objective_value = ampl.get_objective("Profit").value()
-            output_lines.append(
-                f"Objective value (Total Profit): ${objective_value:,.2f}"
-            )
-            output_lines.append("-" * 30)
-            output_lines.append("Production Plan:")
-
-            # Get variables and sets
-            x = ampl.get_variable("x")
-            products = ampl.get_set("P")
-
-            # Iterate through products
-            for p in products:
-                val = x[p].value()
-                if val > 0.001:
-                    output_lines.append(f"  - Product {p}: {val:,.2f} units")
-
-            # output_lines.append("-" * 30)
-            # output_lines.append("Resource Usage (Slack):")
-
-            # slack_hours = ampl.get_variable("SlackHours").value()
-            # slack_alum = ampl.get_variable("SlackAlum").value()
-            #
-            # output_lines.append(f"  - Unused Hours: {slack_hours:,.2f}")
-            # output_lines.append(f"  - Unused Aluminum: {slack_alum:,.2f}")
-        except Exception as e:
-            output_lines.append(f"Error extracting results: {e}")
+    if record is not None:
+        with span("postprocess"):
+            output_lines.extend(format_record(record))
 
     # --- Print to console ---
     print(f"--- Results for {model_file} ---")
@@ -77,22 +141,351 @@ def run_ampl_model(model_file, data_file, output_filename=None):
         print(line)
     print("\n")
 
-    # --- Conditionally write to file ---
-    if os.getenv("AMPLHW_OUTPUT") and output_filename:
-        with open(output_filename, "w") as f:
-            f.write("\n".join(output_lines))
-        print(f"Output also written to {output_filename}")
+    return record, output_lines
+
+
+def _model_job(ampl, job):
+    """Job handler: solves one model on a worker's warm AMPL session."""
+    print(f"Running model: {job.model_file}...")
+    key = cache_key(job.model_file, job.data_file, options=AMPL_OPTIONS)
+    return solve_loaded(ampl, job.model_file, key)
+
+
+def log_node_models(log, records, tol=1e-6):
+    """
+    Writes the solved relaxation.mod and node*.mod models to a NodeLog.
+
+    A node's parent is the model whose branching constraints are its own
+    minus the last one, and that last constraint is the branch taken.
+    Constraints are matched by name: the hand-written models sometimes
+    restate an inherited bound with a different value.
+
+    Args:
+        log (NodeLog): The log to append to.
+        records (dict): Model file -> SolveRecord, relaxation.mod first.
+    """
+    constraints = {model_file: branch_constraints(model_file) for model_file in records}
+    paths = {model_file: tuple(name for name, _ in c) for model_file, c in constraints.items()}
+    by_path = {path: model_file for model_file, path in paths.items()}
+    parents = {path[:-1] for path in paths.values() if path}
+
+    for model_file, record in records.items():
+        path = paths[model_file]
+        node_id = model_file.replace(".mod", "")
+        parent_id = by_path[path[:-1]].replace(".mod", "") if path else None
+        constraint = constraints[model_file][-1][1] if path else "Relaxation"
+
+        if record is None or record.status != "solved":
+            log.write(node_id, parent_id, constraint, None, {}, "infeasible")
+            continue
+        x = record.values["x"]
+        if all(abs(v - round(v)) <= tol for v in x.values()):
+            status = "integer"
+        else:
+            status = "branched" if path in parents else "bound"
+        log.write(node_id, parent_id, constraint, record.objective, x, status)
+
+
+def _oracle_with_cuts(make_oracle, cuts, names):
+    """Builds an oracle and adds the root cuts to it; picklable for the workers."""
+    from cuts import cut_constraints
+
+    oracle = make_oracle()
+    if isinstance(oracle, AmplRelaxation):
+        oracle.add_constraints(cut_constraints(cuts, names, oracle.var))
+    else:
+        oracle.add_cuts(cuts)
+    return oracle
+
+
+def load_manifest(filename):
+    """
+    Reads the manifest of earlier solves: model file -> {"key", "output_lines",
+    "record"}. The key is the cache_key of the model text, the data and the
+    solver options, so an entry is only reused while all three are unchanged.
+    A missing or unreadable manifest is empty.
+    """
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("format") != MANIFEST_FORMAT:
+        return {}
+    return data["models"]
+
+
+def save_manifest(filename, models):
+    """Writes the manifest atomically, so an interrupted run keeps the old one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"format": MANIFEST_FORMAT, "models": models}, f, indent=1)
+    os.replace(tmp_path, filename)
+
+
+def select_models(names, model_files):
+    """
+    Resolves command line model names such as node07, node07.mod or
+    relaxation to model files, all of them when names is empty.
+    """
+    if not names:
+        return list(model_files)
+    selected = []
+    for name in names:
+        model_file = name if name.endswith(".mod") else f"{name}.mod"
+        if model_file not in model_files:
+            raise ValueError(f"Unknown model {name}; expected one of {', '.join(model_files)}")
+        if model_file not in selected:
+            selected.append(model_file)
+    return selected
+
+
+def explore_tree(
+    model_file,
+    data_file,
+    prune=True,
+    log_file=None,
+    oracle_name="ampl",
+    workers=None,
+    select="depth",
+    branching="first",
+    cut_rounds=0,
+):
+    """
+    Runs the automatic branch and bound on the relaxation, prints one line
+    per solved node and returns the lines. With log_file, every node is
+    also appended to a NodeLog as soon as it is solved. oracle_name "dense"
+    solves the node LPs with dense_lp instead of AMPL; it only knows the
+    product mix model, so model_file is then ignored. With workers, the
+    nodes are solved by parallel_branch_and_bound on that many processes;
+    otherwise select and branching pick the rules of branch_and_bound.
+    With cut_rounds, root cuts from cuts.py are added to the relaxation
+    before the search.
+    """
+    if oracle_name == "dense":
+        from dense_lp import DenseRelaxation
+
+        make_oracle = partial(DenseRelaxation, data_file)
+    else:
+        make_oracle = partial(AmplRelaxation, model_file, data_file, AMPL_OPTIONS)
+
+    cut_lines = []
+    if cut_rounds:
+        from cuts import format_rounds, root_cuts
+        from dense_lp import DenseRelaxation
+
+        with span("cuts") as s:
+            dense = DenseRelaxation(data_file)
+            rounds = root_cuts(dense, cut_rounds)
+            s.count(cuts=len(rounds.cuts))
+        cut_lines = format_rounds(rounds) + [""]
+        make_oracle = partial(_oracle_with_cuts, make_oracle, rounds.cuts, dense.names)
+
+    log = NodeLog(log_file) if log_file else None
+    try:
+        with span("solve") as s:
+            on_node = log.write_node if log else None
+            if workers is None:
+                oracle = make_oracle()
+                try:
+                    search = branch_and_bound(
+                        oracle, prune=prune, on_node=on_node, select=select, branching=branching
+                    )
+                finally:
+                    oracle.close()
+            else:
+                search = parallel_branch_and_bound(make_oracle, workers, prune=prune, on_node=on_node)
+            s.count(nodes=len(search.nodes), lp_solves=search.lp_solves)
+    finally:
+        if log is not None:
+            log.close()
+
+    output_lines = cut_lines + format_search(search)
+    print(f"--- Branch and bound on {model_file} ---")
+    for line in output_lines:
+        print(line)
+    return output_lines
 
 
 if __name__ == "__main__":
+    import argparse
     import glob
 
     DATA_FILE = "problem4.dat"
-    run_ampl_model("integer.mod", DATA_FILE, "integer.amplout")
-    run_ampl_model("relaxation.mod", DATA_FILE, "relaxation.amplout")
 
-    # Find and run all node*.mod files in lexicographical order
+    parser = argparse.ArgumentParser(description="Product mix for Problem 4")
+    parser.add_argument(
+        "models",
+        nargs="*",
+        help="models to solve, e.g. node07 relaxation (default: integer.mod, relaxation.mod and every node*.mod)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="solve the models even if the manifest says they are unchanged",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=MANIFEST_FILE,
+        help="input hashes and results of earlier solves (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="explore the tree of relaxation.mod automatically instead of solving the node*.mod models",
+    )
+    parser.add_argument(
+        "--no-prune",
+        action="store_true",
+        help="with --search, keep branching on nodes that cannot beat the incumbent",
+    )
+    parser.add_argument(
+        "--oracle",
+        choices=["ampl", "dense"],
+        default="ampl",
+        help="with --search, solve the node LPs through AMPL or with the NumPy solver in dense_lp.py",
+    )
+    parser.add_argument(
+        "--select",
+        choices=NODE_SELECTION,
+        default="depth",
+        help="with --search, the node selection rule (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--branching",
+        choices=BRANCHING,
+        default="first",
+        help="with --search, the branching rule (default: %(default)s, the order of the hand-built tree)",
+    )
+    parser.add_argument(
+        "--cuts",
+        type=int,
+        default=0,
+        metavar="ROUNDS",
+        help="with --search, add up to this many rounds of root cuts (GMI and MIR, see cuts.py) first",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="with --search, solve open nodes on this many processes sharing the incumbent",
+    )
+    parser.add_argument(
+        "--data",
+        default=DATA_FILE,
+        help="with --search, the product mix data to branch on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="LOG",
+        help="print the tree stored in a node log instead of solving anything",
+    )
+    parser.add_argument(
+        "--node-log",
+        default="node_log.jsonl" if os.getenv("AMPLHW_OUTPUT") else None,
+        help="write the solved tree as a JSON Lines node log (default with AMPLHW_OUTPUT: node_log.jsonl)",
+    )
+    args = parser.parse_args()
+    if args.workers is not None and (args.select, args.branching) != ("depth", "first"):
+        parser.error("--workers only supports the default --select and --branching rules")
+
+    if args.replay:
+        for line in format_search(read_search(args.replay)):
+            print(line)
+        sys.exit(0)
+
+    if args.search:
+        output_lines = explore_tree(
+            "relaxation.mod",
+            args.data,
+            prune=not args.no_prune,
+            log_file=args.node_log,
+            oracle_name=args.oracle,
+            workers=args.workers,
+            select=args.select,
+            branching=args.branching,
+            cut_rounds=args.cuts,
+        )
+        if os.getenv("AMPLHW_OUTPUT"):
+            output_filename = "branch_and_bound.amplout"
+            with span("write_output", lines=len(output_lines)):
+                with open(output_filename, "w") as f:
+                    f.write("\n".join(output_lines))
+            print(f"Output also written to {output_filename}")
+        sys.exit(0)
+
+    # Find all node*.mod files in lexicographical order
     node_models = sorted(glob.glob("node*.mod"))
-    for model_file in node_models:
-        output_file = model_file.replace(".mod", ".amplout")
-        run_ampl_model(model_file, DATA_FILE, output_file)
+    model_files = ["integer.mod", "relaxation.mod"] + node_models
+    try:
+        selected = select_models(args.models, model_files)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Models whose model text, data and solver options are unchanged since
+    # the manifest was written are not solved again
+    manifest = load_manifest(args.manifest)
+    keys = {model_file: cache_key(model_file, DATA_FILE, options=AMPL_OPTIONS) for model_file in model_files}
+    stale = [m for m in selected if args.force or manifest.get(m, {}).get("key") != keys[m]]
+    print(f"{len(stale)} of {len(selected)} models to solve, {len(selected) - len(stale)} unchanged.")
+
+    # The models are independent, so they are solved in parallel and the
+    # outputs are written in this order once all of them are done
+    write_output = bool(os.getenv("AMPLHW_OUTPUT"))
+    jobs = [
+        AmplJob(
+            model_file,
+            DATA_FILE,
+            output_file=model_file.replace(".mod", ".amplout") if write_output else None,
+        )
+        for model_file in stale
+    ]
+    results = run_jobs(_model_job, jobs, options=AMPL_OPTIONS) if jobs else []
+    records = {}
+    for result in results:
+        model_file = result.job.model_file
+        records[model_file] = result.value
+        # Failed solves are not recorded, so they are retried next time
+        if result.value is not None:
+            manifest[model_file] = {
+                "key": keys[model_file],
+                "output_lines": result.output_lines,
+                "record": record_to_dict(result.value),
+            }
+        if result.job.output_file:
+            print(f"Output also written to {result.job.output_file}")
+
+    for model_file in selected:
+        if model_file in records:
+            continue
+        output_lines = manifest[model_file]["output_lines"]
+        print(f"--- Results for {model_file} (unchanged) ---")
+        for line in output_lines:
+            print(line)
+        print("\n")
+        if write_output:
+            output_file = model_file.replace(".mod", ".amplout")
+            with span("write_output", lines=len(output_lines)):
+                with open(output_file, "w") as f:
+                    f.write("\n".join(output_lines))
+            print(f"Output also written to {output_file}")
+
+    if results:
+        save_manifest(args.manifest, manifest)
+
+    # The relaxation and the node models form the search tree; models not
+    # solved in this run come from the manifest
+    if args.node_log:
+        tree = {}
+        for model_file in model_files[1:]:
+            entry = manifest.get(model_file)
+            if model_file in records:
+                tree[model_file] = records[model_file]
+            elif entry is not None and entry["key"] == keys[model_file]:
+                tree[model_file] = record_from_dict(entry["record"])
+        if len(tree) < len(model_files) - 1:
+            print(f"Node log not written: {len(model_files) - 1 - len(tree)} tree models have no up-to-date result.")
+        else:
+            with span("write_output", nodes=len(tree)):
+                with NodeLog(args.node_log) as log:
+                    log_node_models(log, tree)
+            print(f"Node log written to {args.node_log}")
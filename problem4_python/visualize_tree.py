@@ -1,9 +1,15 @@
-import matplotlib.pyplot as plt
-import networkx as nx
-import random
+import json
+import math
+import numpy as np
+import os
+import re
+import sys
 from dataclasses import dataclass, field
 from typing import Dict, Optional, List
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common_python"))
+from plotting import pyplot
+
 
 @dataclass
 class BranchNode:
@@ -64,58 +70,207 @@ class BranchNode:
         return "#ADD8E6"  # Light Blue (Continuous)
 
 
-def hierarchy_pos(G, root=None, width=1.0, vert_gap=0.2, vert_loc=0, xcenter=0.5):
-    """
-    Positions nodes in a hierarchical layout, allocating width based on subtree size (number of leaves).
+def _sum_to_root(parent, values):
     """
-    if not nx.is_tree(G):
-        # Fallback for non-perfect trees
-        return nx.shell_layout(G)
+    For every node, the sum of values over the node and all its ancestors.
 
-    if root is None:
-        if isinstance(G, nx.DiGraph):
-            root = next(iter(nx.topological_sort(G)))
-        else:
-            root = random.choice(list(G.nodes))
-
-    def count_leaves(node):
-        children = list(G.successors(node))
-        if not children:
-            return 1
-        return sum(count_leaves(c) for c in children)
+    Uses pointer jumping: each round doubles the length of the path every
+    node has summed, so the loop runs log2(depth) times whatever the shape
+    of the tree.
+    """
+    total = values.copy()
+    ancestor = parent.copy()
+    for _ in range(len(parent).bit_length() + 1):
+        pending = ancestor >= 0
+        if not pending.any():
+            return total
+        total[pending] += total[ancestor[pending]]
+        ancestor[pending] = ancestor[ancestor[pending]]
+    raise ValueError("parent links contain a cycle")
+
+
+def tree_layout(parent, width=1.0, vert_gap=0.2, vert_loc=0, xcenter=0.5):
+    """
+    Positions the nodes of a forest in a hierarchical layout, allocating
+    width to every subtree in proportion to its number of leaves.
+
+    Nothing is recursive: depths come from one bottom-up pass over the
+    parent links, leaf counts from one pass over the nodes deepest first,
+    and positions from a second pass that accumulates each node's offset
+    within its siblings down from the root. The cost is O(n log depth)
+    and deep trees are not limited by Python's recursion limit.
+
+    Args:
+        parent (array-like): Index of each node's parent, -1 for roots.
+            Siblings are laid out in index order.
+        width (float): Horizontal span shared by all the roots.
+        vert_gap (float): Vertical distance between levels.
+        vert_loc (float): Vertical position of the roots.
+        xcenter (float): Horizontal center of the layout.
+
+    Returns:
+        tuple: (x, y) NumPy arrays with the coordinates of every node.
+
+    Raises:
+        ValueError: If the parent links contain a cycle.
+    """
+    parent = np.asarray(parent, dtype=np.int64)
+    n = len(parent)
+    has_parent = parent >= 0
+    roots = np.flatnonzero(~has_parent)
+
+    # Children of every node in CSR form: kids[start[u]:start[u + 1]]
+    kids = np.flatnonzero(has_parent)
+    kids = kids[np.argsort(parent[kids], kind="stable")]
+    n_kids = np.bincount(parent[has_parent], minlength=n)
+    start = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(n_kids, out=start[1:])
+
+    depth = _sum_to_root(parent, has_parent.astype(np.int64))
+
+    # Leaves below every node, children before their parents
+    leaves = (n_kids == 0).astype(np.int64).tolist()
+    links = parent.tolist()
+    for u in np.argsort(-depth, kind="stable").tolist():
+        p = links[u]
+        if p >= 0:
+            leaves[p] += leaves[u]
+    leaves = np.array(leaves, dtype=np.int64)
+
+    # Leaves before each node among its siblings (roots count as siblings)
+    before = np.zeros(n, dtype=np.int64)
+    sibling_leaves = np.cumsum(leaves[kids]) - leaves[kids]
+    before[kids] = sibling_leaves - sibling_leaves[start[parent[kids]]]
+    before[roots] = np.cumsum(leaves[roots]) - leaves[roots]
+
+    # Every leaf gets the same share of the width, so a node's left edge
+    # is the sum of the sibling offsets on its path from the root
+    unit = width / max(int(leaves[roots].sum()), 1)
+    offset = before * unit
+    offset[roots] += xcenter - width / 2
+    left = _sum_to_root(parent, offset)
+
+    x = left + leaves * unit / 2
+    y = vert_loc - depth * vert_gap
+    return x, y
 
-    def _hierarchy_pos(node, left, right, vert_loc, pos):
-        pos[node] = ((left + right) / 2, vert_loc)
-        children = list(G.successors(node))
-        if not children:
-            return pos
 
-        total_leaves = sum(count_leaves(c) for c in children)
+def hierarchy_pos(G, root=None, width=1.0, vert_gap=0.2, vert_loc=0, xcenter=0.5):
+    """
+    Positions nodes in a hierarchical layout, allocating width based on subtree size (number of leaves).
 
-        # Distribute width based on leaf count
-        current_left = left
-        width_per_leaf = (right - left) / total_leaves
+    Returns a dict of node -> (x, y) for the nodes reachable from root, or
+    for the whole graph when root is None. Graphs that are not forests are
+    laid out along a breadth-first spanning forest. See tree_layout.
+    """
+    import networkx as nx
+
+    if root is not None:
+        sources = [root]
+    elif G.is_directed():
+        sources = [u for u, d in G.in_degree() if d == 0] or [next(iter(G.nodes))]
+    else:
+        sources = [next(iter(c)) for c in nx.connected_components(G)]
+
+    index = {}
+    parents = []
+    for source in sources:
+        if source in index:
+            continue
+        index[source] = len(parents)
+        parents.append(-1)
+        for child, parent in nx.bfs_predecessors(G, source):
+            if child not in index:
+                index[child] = len(parents)
+                parents.append(index[parent])
 
-        for child in children:
-            child_leaves = count_leaves(child)
-            child_width = child_leaves * width_per_leaf
-            _hierarchy_pos(
-                child,
-                current_left,
-                current_left + child_width,
-                vert_loc - vert_gap,
-                pos,
-            )
-            current_left += child_width
+    x, y = tree_layout(parents, width, vert_gap, vert_loc, xcenter)
+    return {u: (x[k], y[k]) for u, k in index.items()}
 
-        return pos
 
-    return _hierarchy_pos(root, xcenter - width / 2, xcenter + width / 2, vert_loc, {})
+def iter_node_log(filename):
+    """Yields the entries of a JSON Lines node log one at a time."""
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
 
 
-def draw_tree():
+def load_node_log(filename, maximize=True, tol=1e-6):
+    """
+    Reads a node log written by branch_and_bound.NodeLog into BranchNodes.
+
+    The file is streamed twice instead of being held in memory: the first
+    pass only finds the best integer node, the second builds the nodes.
+    Nodes whose bound is below the best integer objective are then marked
+    as dominated. A node with an infeasible child holds the same integer
+    points as its other child, so it takes that child's bound when it is
+    tighter. Variables are listed in sorted order, as in bundled_nodes,
+    whatever order the solver reported them in. Node ids and variable
+    names are interned, so a large tree keeps one copy of each.
+
+    Args:
+        filename (str): Path of the node log.
+        maximize (bool): Whether larger objective values are better.
+        tol (float): Objective comparison tolerance.
+
+    Returns:
+        list: BranchNode entries in log order, parents before children.
+    """
+    sign = 1.0 if maximize else -1.0
+
+    best_id, best_z = None, None
+    for entry in iter_node_log(filename):
+        if entry["status"] == "integer" and (best_z is None or sign * (entry["z"] - best_z) > tol):
+            best_id, best_z = entry["id"], entry["z"]
+
+    # Nodes beaten by the best integer solution name it, e.g. "Node 32"
+    match = re.fullmatch(r"node0*(\d+)", best_id or "")
+    best_label = f"Node {match.group(1)}" if match else best_id
+
+    nodes = []
+    for entry in iter_node_log(filename):
+        parent_id = entry["parent"]
+        z = entry["z"]
+        node = BranchNode(
+            node_id=sys.intern(entry["id"]),
+            parent_id=sys.intern(parent_id) if parent_id is not None else None,
+            branch_constraint=entry["constraint"],
+            z_value=z,
+            x_values={sys.intern(k): entry["x"][k] for k in sorted(entry["x"])},
+            is_integer_solution=entry["status"] == "integer",
+        )
+        if entry["status"] == "infeasible":
+            node.pruned_reason = "Infeasible"
+        elif node.node_id == best_id:
+            node.pruned_reason = "Optimal Solution"
+        nodes.append(node)
+    if best_z is None:
+        return nodes
+
+    # Children come after their parents, so the bounds are settled bottom-up
+    children = {}
+    for node in nodes:
+        children.setdefault(node.parent_id, []).append(node)
+    bound = {}
+    for node in reversed(nodes):
+        if node.pruned_reason == "Infeasible":
+            bound[node.node_id] = -math.inf
+            continue
+        bound[node.node_id] = sign * node.z_value
+        kids = children.get(node.node_id, [])
+        if len(kids) == 2 and any(kid.pruned_reason == "Infeasible" for kid in kids):
+            bound[node.node_id] = min(bound[node.node_id], max(bound[kid.node_id] for kid in kids))
+        if node.pruned_reason is None and sign * best_z - bound[node.node_id] > tol:
+            node.is_dominated = True
+            node.pruned_reason = best_label
+    return nodes
+
+
+def bundled_nodes():
+    """Returns the search tree explored for the bundled Problem 4 data."""
     # AUTOMATICALLY GENERATED DATA
-    nodes_data = [
+    return [
         BranchNode(
             node_id="relaxation",
             parent_id=None,
@@ -494,6 +649,37 @@ def draw_tree():
         ),
     ]
 
+
+def _legend_handles():
+    from matplotlib.patches import Patch
+
+    return [
+        Patch(facecolor="#90EE90", edgecolor="black", label="Integer Solution"),
+        Patch(
+            facecolor="#ADD8E6", edgecolor="black", label="Candidate (Bound >= Best)"
+        ),
+        Patch(
+            facecolor="#FFB347", edgecolor="black", label="Suboptimal (Bound < Best)"
+        ),
+        Patch(facecolor="#E0E0E0", edgecolor="black", label="Infeasible"),
+    ]
+
+
+def draw_tree(nodes_data=None, output_file="binary_search_tree.pdf"):
+    """
+    Draws a branch-and-bound search tree and saves it as a PDF.
+
+    Args:
+        nodes_data (list): BranchNode entries, parents before children.
+            Defaults to the tree of the bundled data.
+        output_file (str): Path of the PDF to write.
+    """
+    import networkx as nx
+
+    plt = pyplot()
+    if nodes_data is None:
+        nodes_data = bundled_nodes()
+
     # Create Graph
     G = nx.DiGraph()
     node_map = {n.node_id: n for n in nodes_data}
@@ -510,10 +696,12 @@ def draw_tree():
     try:
         # We calculate a vertical layout first, then rotate it.
         # width=total_vertical_span_in_rotated_view
-        pos = hierarchy_pos(G, root="relaxation", width=25.0, vert_gap=0.2)
+        index = {n.node_id: k for k, n in enumerate(nodes_data)}
+        parent = [index.get(n.parent_id, -1) for n in nodes_data]
+        xs, ys = tree_layout(parent, width=25.0, vert_gap=0.2)
         # Rotate to horizontal: x_new = -y_old (depth), y_new = x_old (spread)
-        pos = {u: (-y * 20, x) for u, (x, y) in pos.items()}
-    except Exception:
+        pos = {n.node_id: (-ys[k] * 20, xs[k]) for k, n in enumerate(nodes_data)}
+    except ValueError:
         pos = nx.spring_layout(G, k=0.9, iterations=50)
 
     # Draw
@@ -538,28 +726,206 @@ def draw_tree():
 
         ax.text(x, y, label, ha="center", va="center", size=9, bbox=bbox_props)
 
-    # Custom Legend
-    from matplotlib.patches import Patch
-
-    legend_elements = [
-        Patch(facecolor="#90EE90", edgecolor="black", label="Integer Solution"),
-        Patch(
-            facecolor="#ADD8E6", edgecolor="black", label="Candidate (Bound >= Best)"
-        ),
-        Patch(
-            facecolor="#FFB347", edgecolor="black", label="Suboptimal (Bound < Best)"
-        ),
-        Patch(facecolor="#E0E0E0", edgecolor="black", label="Infeasible"),
-    ]
-    ax.legend(handles=legend_elements, loc="upper right", fontsize=12)
+    ax.legend(handles=_legend_handles(), loc="upper right", fontsize=12)
 
     ax.set_title("Branch and Bound Search Tree (Problem 4)")
     plt.axis("off")
 
-    output_file = "binary_search_tree.pdf"
     plt.savefig(output_file, format="pdf", bbox_inches="tight")
+    plt.close(fig)
     print(f"Tree visualization saved to {output_file}")
 
 
+# Limits of render_tree
+MAX_LABELS = 300  # a figure or tile showing more nodes than this has no labels
+TILE_NODES = 5000  # nodes per tile of SVG output
+
+
+def _subtree_pruned(parent, pruned):
+    """
+    For every node, whether it and every node below it is pruned, and how
+    many nodes its subtree holds. Children are folded into their parents
+    deepest first, as in tree_layout.
+    """
+    depth = _sum_to_root(parent, (parent >= 0).astype(np.int64))
+    all_pruned = pruned.tolist()
+    size = [1] * len(parent)
+    links = parent.tolist()
+    for u in np.argsort(-depth, kind="stable").tolist():
+        p = links[u]
+        if p >= 0:
+            all_pruned[p] = all_pruned[p] and all_pruned[u]
+            size[p] += size[u]
+    return np.array(all_pruned, dtype=bool), np.array(size, dtype=np.int64)
+
+
+def collapse_pruned(nodes_data):
+    """
+    Replaces every fully pruned subtree, where the node and all its
+    descendants are infeasible or dominated, by its topmost node.
+
+    Args:
+        nodes_data (list): BranchNode entries, parents before children.
+
+    Returns:
+        tuple: (nodes, hidden) with the nodes kept, in the same order, and
+               a NumPy array of how many descendants each of them hides.
+    """
+    index = {n.node_id: k for k, n in enumerate(nodes_data)}
+    parent = np.array([index.get(n.parent_id, -1) for n in nodes_data], dtype=np.int64)
+    pruned = np.array([n.pruned_reason == "Infeasible" or n.is_dominated for n in nodes_data], dtype=bool)
+    all_pruned, size = _subtree_pruned(parent, pruned)
+
+    # A node disappears as soon as its parent heads a fully pruned subtree
+    has_parent = parent >= 0
+    hidden = np.zeros(len(nodes_data), dtype=bool)
+    hidden[has_parent] = all_pruned[parent[has_parent]]
+    keep = np.flatnonzero(~hidden)
+    return [nodes_data[k] for k in keep], np.where(all_pruned[keep], size[keep] - 1, 0)
+
+
+def _render_window(px, py, parent, colors, hidden, labels, select, output_file, dpi, title, max_labels):
+    """Draws the selected nodes and the edges touching them into one file."""
+    from matplotlib.collections import LineCollection
+
+    plt = pyplot()
+    # Leaves stack vertically; a labelled leaf needs about an inch, an
+    # unlabelled one a point or two. The cap keeps a raster image under a
+    # few tens of megapixels.
+    shown = np.flatnonzero(select)
+    with_labels = labels is not None and len(shown) <= max_labels
+    has_child = np.zeros(len(parent), dtype=bool)
+    has_child[parent[parent >= 0]] = True
+    leaves = int((select & ~has_child).sum())
+    height = float(np.clip(leaves * (0.9 if with_labels else 0.02), 8, 60))
+    fig, ax = plt.subplots(figsize=(20, height))
+
+    # Edges with at least one end in the window, clipped by the axes
+    child = np.flatnonzero((parent >= 0) & (select | select[np.maximum(parent, 0)]))
+    segments = np.stack(
+        [np.column_stack([px[parent[child]], py[parent[child]]]), np.column_stack([px[child], py[child]])],
+        axis=1,
+    )
+    ax.add_collection(LineCollection(segments, colors="gray", linewidths=0.4, zorder=1))
+
+    # Marker area shrinks with the number of nodes on screen
+    area = float(np.clip(4e4 / max(len(shown), 1), 0.5, 80))
+    plain = shown[hidden[shown] == 0]
+    summary = shown[hidden[shown] > 0]
+    ax.scatter(px[plain], py[plain], s=area, c=colors[plain], edgecolors="black", linewidths=0.2, zorder=2)
+    ax.scatter(
+        px[summary], py[summary], s=area * 3, c=colors[summary], marker=">", edgecolors="black",
+        linewidths=0.3, zorder=2,
+    )
+
+    if with_labels:
+        bbox_props = dict(boxstyle="round,pad=0.3", ec="black", alpha=0.9)
+        for k in shown.tolist():
+            text = labels[k] + (f"\n(+{hidden[k]} pruned)" if hidden[k] else "")
+            ax.text(px[k], py[k], text, ha="center", va="center", size=6, bbox={**bbox_props, "fc": colors[k]}, zorder=3)
+
+    ys = py[shown] if len(shown) else py
+    pad_y = max((ys.max() - ys.min()) * 0.02, 1e-3)
+    pad_x = max((px.max() - px.min()) * 0.02, 1e-3)
+    ax.set_xlim(px.min() - pad_x, px.max() + pad_x)
+    ax.set_ylim(ys.min() - pad_y, ys.max() + pad_y)
+    ax.legend(handles=_legend_handles(), loc="upper right", fontsize=10)
+    ax.set_title(title)
+    ax.axis("off")
+    fig.savefig(output_file, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+
+
+def render_tree(
+    nodes_data,
+    output_file="binary_search_tree.png",
+    collapse=False,
+    max_labels=MAX_LABELS,
+    tile_nodes=TILE_NODES,
+    dpi=100,
+):
+    """
+    Level-of-detail renderer for large search trees.
+
+    Unlike draw_tree, which draws one text box per node, every node is a
+    point of a single scatter (PathCollection) and all edges are one
+    LineCollection, so the cost per node is small and the figure size is
+    capped. Node labels are only drawn on figures (or tiles) showing at
+    most max_labels nodes.
+
+    A .png output is one raster image. A .svg output is split into tiles of
+    about tile_nodes nodes each along the spread of the tree, written as
+    <name>_tile01.svg, <name>_tile02.svg, ... so each file stays small
+    enough for a browser; small tiles get labels. Any other extension is
+    written as a single figure in that format.
+
+    Args:
+        nodes_data (list): BranchNode entries, parents before children.
+        output_file (str): Path of the image, or the base path of the tiles.
+        collapse (bool): Draw every fully pruned subtree as one summary
+            node (a triangle) instead of all its nodes.
+        max_labels (int): Label threshold, see above.
+        tile_nodes (int): Nodes per SVG tile.
+        dpi (int): Resolution of raster output.
+
+    Returns:
+        list: The files written.
+    """
+    if collapse:
+        nodes_data, hidden = collapse_pruned(nodes_data)
+    else:
+        hidden = np.zeros(len(nodes_data), dtype=np.int64)
+
+    index = {n.node_id: k for k, n in enumerate(nodes_data)}
+    parent = np.array([index.get(n.parent_id, -1) for n in nodes_data], dtype=np.int64)
+    xs, ys = tree_layout(parent, width=1.0, vert_gap=1.0)
+    # Depth runs left to right and the leaves are spread vertically, as in draw_tree
+    px, py = -ys, xs
+    colors = np.array([node.color for node in nodes_data])
+    n = len(nodes_data)
+    base, ext = os.path.splitext(output_file)
+    tiled = ext.lower() == ".svg" and n > tile_nodes
+    # Labels are only built when some figure can show them
+    labels = [node.label for node in nodes_data] if n <= max_labels or (tiled and tile_nodes <= max_labels) else None
+    title = f"Branch and Bound Search Tree ({n:,} nodes{', pruned subtrees collapsed' if collapse else ''})"
+
+    if not tiled:
+        select = np.ones(n, dtype=bool)
+        _render_window(px, py, parent, colors, hidden, labels, select, output_file, dpi, title, max_labels)
+        print(f"Tree visualization saved to {output_file}")
+        return [output_file]
+
+    order = np.argsort(py, kind="stable")
+    written = []
+    for t, lo in enumerate(range(0, n, tile_nodes), 1):
+        select = np.zeros(n, dtype=bool)
+        select[order[lo : lo + tile_nodes]] = True
+        tile_file = f"{base}_tile{t:02d}{ext}"
+        _render_window(px, py, parent, colors, hidden, labels, select, tile_file, dpi, f"{title}, tile {t}", max_labels)
+        written.append(tile_file)
+    print(f"Tree visualization saved to {len(written)} tiles {base}_tile*{ext}")
+    return written
+
+
 if __name__ == "__main__":
-    draw_tree()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Draw the Problem 4 search tree")
+    parser.add_argument("node_log", nargs="?", help="node log to draw (default: the bundled tree)")
+    parser.add_argument(
+        "--output",
+        default="binary_search_tree.pdf",
+        help="output file; .png and .svg use the level-of-detail renderer for large trees",
+    )
+    parser.add_argument("--collapse-pruned", action="store_true", help="draw fully pruned subtrees as one node")
+    parser.add_argument("--max-labels", type=int, default=MAX_LABELS, help="label figures with at most this many nodes")
+    parser.add_argument("--tile-nodes", type=int, default=TILE_NODES, help="nodes per SVG tile")
+    args = parser.parse_args()
+
+    # With a node log argument the tree is drawn from it, otherwise from
+    # the bundled data
+    nodes = load_node_log(args.node_log) if args.node_log else bundled_nodes()
+    if args.output.lower().endswith((".png", ".svg")) or args.collapse_pruned:
+        render_tree(nodes, args.output, args.collapse_pruned, args.max_labels, args.tile_nodes)
+    else:
+        draw_tree(nodes, args.output)